@@ -1,18 +1,23 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
 
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,QGroupBox, 
-                            QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, 
-                            QFileDialog, QDateEdit, QTabWidget, QScrollArea, QHeaderView, QComboBox, QMessageBox,QProgressDialog)
-from PyQt5.QtCore import Qt, QDate, QSettings, QTimer
-from PyQt5.QtGui import QIcon, QPixmap, QColor
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+                            QLabel, QLineEdit, QPushButton, QTableView, 
+                            QFileDialog, QDateEdit, QTabWidget, QScrollArea, QHeaderView, QComboBox, QMessageBox,QProgressDialog,
+                            QSpinBox, QCheckBox)
+from PyQt5.QtCore import Qt, QDate, QSettings, QThread, QTimer
+from PyQt5.QtGui import QIcon, QPixmap
 
-from widgets import NumericTableWidgetItem
+from widgets import SummaryTableModel
 from data_handler import DataHandler
 from utils import DateUtils
 from export_handler import ExportHandler
+from ingest_cache import IngestCache
+from workers import DataLoadWorker
+from folder_watcher import FolderWatcher
+from perf_log import PerfLog
+from diagnostics_dialog import DiagnosticsDialog
+from time_series_tab import TimeSeriesTab
+from sales_aggregator import SLIP_CASH, SLIP_CASHLESS, SLIP_RED
 
 
 class SalesAnalysisApp(QMainWindow):
@@ -41,8 +46,21 @@ class SalesAnalysisApp(QMainWindow):
         self.main_layout.addWidget(self.scroll_area)
         
         # データ保存用変数
-        self.csv_data = None
         self.last_summary = None 
+        self.summary_range = None  # last_summaryの日付範囲 (開始, 終了)
+        self.sales_store = None  # 取り込んだCSVフォルダのストア（明細と日別集計）
+        self.loaded_range = None  # 最後に検索した日付範囲 (開始, 終了)
+        self.loaded_folder = None  # sales_storeに取り込んだCSVフォルダ
+        
+        # バックグラウンド読み込み
+        self.load_thread = None
+        self.load_worker = None
+        self.load_progress = None
+        
+        # CSVフォルダの監視（新しいCSVが届いたら表示中の集計を更新する）
+        self.folder_watcher = FolderWatcher(self)
+        self.folder_watcher.changed.connect(self._refresh_from_folder)
+        self.refresh_pending = False  # 読み込み中に届いた変更
         
         # 初期ソート設定
         self.sort_column = 0  # 商品コード列を初期ソート
@@ -52,21 +70,18 @@ class SalesAnalysisApp(QMainWindow):
         self.sort_column_r = 0  # 伝票別テーブル用初期ソート（商品コード列）
         self.sort_order_r = Qt.AscendingOrder  # 昇順
         
-        self.column_indices = {
-            "date_column_index": 13,  # 取引日付の列インデックス
-            "group_num_idx": 18,      # 集計G番号
-            "group_name_idx": 19,     # 集計G名称
-            "product_code_idx": 16,   # 商品コード/メニュー番号
-            "product_name_idx": 17,   # 論理口座名称/メニュー名
-            "count_idx": 9,           # 枚数/数量
-            "amount_idx": 11,         # 金額
-            "amount_sign_idx": 10,    # 金額符号（金額・枚数）
-            "card_deduction_idx": 12  # カード減算額
-        }
+        self.column_indices = dict(DataHandler.COLUMN_INDICES)
         
         # エクスポートハンドラの初期化
         self.export_handler = ExportHandler() 
         
+        # CSVフォルダごとのストアの保存先（設定ファイルと同じ場所）
+        self.cache_dir = IngestCache.default_cache_dir(self.settings)
+        
+        # 処理時間の記録（キャッシュと同じ場所の logs に書き出し、診断パネルで表示）
+        PerfLog.configure(PerfLog.default_log_dir(self.cache_dir))
+        self.diagnostics_dialog = None
+        
         # UIの初期化
         self.init_ui()
     
@@ -115,9 +130,36 @@ class SalesAnalysisApp(QMainWindow):
             self.folder_path.setText(self.last_folder_path)
         browse_button = QPushButton("参照...")
         browse_button.clicked.connect(self.browse_folder)
+        
+        # CSV解析の並列数（1の場合は順番に読み込む）
+        workers_label = QLabel("並列読み込み数:")
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, os.cpu_count() or 1)
+        self.workers_input.setValue(int(self.settings.value("ingest_workers", 1)))
+        self.workers_input.valueChanged.connect(self.save_ingest_workers)
+        
+        # CSV解析エンジン（pyarrowがインストールされている場合のみ選択可能）
+        engine_label = QLabel("CSV解析:")
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItems(DataHandler.available_csv_engines())
+        saved_engine = self.settings.value("csv_engine", DataHandler.CSV_ENGINE)
+        if self.engine_combo.findText(saved_engine) >= 0:
+            self.engine_combo.setCurrentText(saved_engine)
+        self.engine_combo.currentTextChanged.connect(self.save_csv_engine)
+        
+        # フォルダ監視（検索後に届いたCSVを自動で取り込む）
+        self.watch_checkbox = QCheckBox("フォルダ監視")
+        self.watch_checkbox.setChecked(self.settings.value("watch_folder", False, type=bool))
+        self.watch_checkbox.toggled.connect(self.save_watch_folder)
+        
         folder_layout.addWidget(folder_label)
         folder_layout.addWidget(self.folder_path)
         folder_layout.addWidget(browse_button)
+        folder_layout.addWidget(workers_label)
+        folder_layout.addWidget(self.workers_input)
+        folder_layout.addWidget(engine_label)
+        folder_layout.addWidget(self.engine_combo)
+        folder_layout.addWidget(self.watch_checkbox)
         control_layout.addLayout(folder_layout)
         
         # 日付検索エリア
@@ -173,6 +215,9 @@ class SalesAnalysisApp(QMainWindow):
         export_layout.addWidget(self.export_type)
         export_layout.addWidget(export_button)
         export_layout.addStretch()
+        diagnostics_button = QPushButton("診断...")
+        diagnostics_button.clicked.connect(self.show_diagnostics)
+        export_layout.addWidget(diagnostics_button)
         
         control_layout.addLayout(export_layout)
         
@@ -233,10 +278,11 @@ class SalesAnalysisApp(QMainWindow):
         product_layout = QVBoxLayout(self.product_tab)
         
         # 商品別テーブルを作成
-        self.product_table = QTableWidget()
-        self.product_table.setColumnCount(4)
-        self.product_table.setHorizontalHeaderLabels(["商品コード", "商品名称", "枚数", "金額"])
+        self.product_model = SummaryTableModel(["商品コード", "商品名称", "枚数", "金額"], self)
+        self.product_table = QTableView()
+        self.product_table.setModel(self.product_model)
         self.product_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.product_table.horizontalHeader().setSectionsClickable(True)
         self.product_table.horizontalHeader().sectionClicked.connect(self.sort_product_table)
         product_layout.addWidget(self.product_table)
 
@@ -245,10 +291,11 @@ class SalesAnalysisApp(QMainWindow):
         group_layout = QVBoxLayout(self.group_tab)
         
         # グループ別テーブルを作成
-        self.group_table = QTableWidget()
-        self.group_table.setColumnCount(4)
-        self.group_table.setHorizontalHeaderLabels(["グループ番号", "グループ名称", "枚数", "金額"])
+        self.group_model = SummaryTableModel(["グループ番号", "グループ名称", "枚数", "金額"], self)
+        self.group_table = QTableView()
+        self.group_table.setModel(self.group_model)
         self.group_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.group_table.horizontalHeader().setSectionsClickable(True)
         self.group_table.horizontalHeader().sectionClicked.connect(self.sort_group_table)
         group_layout.addWidget(self.group_table)
 
@@ -280,10 +327,11 @@ class SalesAnalysisApp(QMainWindow):
         receipt_layout.addLayout(receipt_control_layout)
 
         # 伝票別詳細テーブル（ソート機能追加）
-        self.receipt_detail_table = QTableWidget()
-        self.receipt_detail_table.setColumnCount(4)
-        self.receipt_detail_table.setHorizontalHeaderLabels(["商品コード", "商品名称", "枚数", "金額"])
+        self.receipt_detail_model = SummaryTableModel(["商品コード", "商品名称", "枚数", "金額"], self)
+        self.receipt_detail_table = QTableView()
+        self.receipt_detail_table.setModel(self.receipt_detail_model)
         self.receipt_detail_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.receipt_detail_table.horizontalHeader().setSectionsClickable(True)
         self.receipt_detail_table.horizontalHeader().sectionClicked.connect(self.sort_receipt_table)  # 新規追加
         receipt_layout.addWidget(self.receipt_detail_table)
 
@@ -292,11 +340,15 @@ class SalesAnalysisApp(QMainWindow):
         self.tab_widget.addTab(self.group_tab, "グループ別")
         self.tab_widget.addTab(self.receipt_tab, "伝票別")
 
+        # 売上推移タブ
+        self.time_series_tab = TimeSeriesTab()
+        self.tab_widget.addTab(self.time_series_tab, "売上推移")
+
         self.scroll_layout.addWidget(self.tab_widget)
     
     def export_data(self):
         """選択したフォーマットでデータをエクスポート"""
-        if self.csv_data is None or self.csv_data.empty:
+        if self.sales_store is None:
             QMessageBox.information(self, "エクスポート", "エクスポートするデータがありません")
             return
         
@@ -326,24 +378,13 @@ class SalesAnalysisApp(QMainWindow):
             start_date_str = DataHandler.date_to_string(self.start_date.date())
             end_date_str = DataHandler.date_to_string(self.end_date.date())
             
-            # 列名を取得して日付列のインデックスを確認
-            column_names = self.csv_data.columns.tolist()
-            date_column_index = 13  # 取引日付の列インデックス
-            date_column_name = self.csv_data.columns[date_column_index]
-            
-            # データ型を確認して強制的に文字列に変換
-            date_data = self.csv_data[date_column_name].astype(str)
-            
             progress.setLabelText("表示データを準備中...")
             progress.setValue(60)
             
-            # 日付フィルタリング
-            filtered_data = self.csv_data[
-                (date_data >= start_date_str) & 
-                (date_data <= end_date_str)
-            ]
+            # 日付範囲の集計結果（表示中の範囲であれば再集計しない）
+            summary = self._get_summary(start_date_str, end_date_str)
             
-            if filtered_data.empty:
+            if summary is None:
                 progress.close()
                 QMessageBox.information(self, "エクスポート", "エクスポートするデータがありません")
                 return
@@ -353,7 +394,7 @@ class SalesAnalysisApp(QMainWindow):
             
             # エクスポート実行
             success = self.export_handler.export_data(
-                filtered_data, 
+                summary, 
                 shop_name, 
                 self.start_date.date(),  # 開始日
                 self.end_date.date(),    # 終了日
@@ -372,10 +413,55 @@ class SalesAnalysisApp(QMainWindow):
             progress.close()
             QMessageBox.warning(self, "エクスポートエラー", f"エクスポート中にエラーが発生しました:\n{str(e)}")
 
+    def _get_summary(self, start_date_str, end_date_str):
+        """日付範囲の集計結果を返す（該当データがない場合はNone）
+        
+        表示中の範囲はその集計結果を使い、それ以外はストアから取得する
+        （ストアは最近の範囲の集計結果を保持しているため、同じ範囲に戻った場合は集計し直さない）
+        """
+        if self.last_summary is not None and self.summary_range == (start_date_str, end_date_str):
+            return self.last_summary
+        
+        if self.sales_store is None:
+            return None
+        
+        summary = self.sales_store.summary(start_date_str, end_date_str)
+        if summary is None or summary.is_empty:
+            return None
+        return summary
+
+    def show_diagnostics(self):
+        """診断パネル（処理時間の記録）を表示"""
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+        self.diagnostics_dialog.activateWindow()
+    
     def save_shop_name(self):
         """店舗名を設定ファイルに保存"""
         self.settings.setValue("shop_name", self.shop_input.text())
     
+    def save_ingest_workers(self):
+        """CSV解析の並列数を設定ファイルに保存"""
+        self.settings.setValue("ingest_workers", self.workers_input.value())
+    
+    def save_csv_engine(self):
+        """CSV解析エンジンを設定ファイルに保存"""
+        self.settings.setValue("csv_engine", self.engine_combo.currentText())
+    
+    def save_watch_folder(self):
+        """フォルダ監視の設定を保存して監視を開始・停止"""
+        self.settings.setValue("watch_folder", self.watch_checkbox.isChecked())
+        self._update_folder_watch()
+    
+    def _update_folder_watch(self):
+        """検索済みのフォルダを監視する（フォルダ監視がオフの場合は停止）"""
+        if self.watch_checkbox.isChecked() and self.sales_store is not None:
+            self.folder_watcher.watch(self.loaded_folder)
+        else:
+            self.folder_watcher.stop()
+    
     def browse_folder(self):
         """CSVフォルダを選択"""
         folder = QFileDialog.getExistingDirectory(self, "CSVフォルダを選択")
@@ -409,351 +495,283 @@ class SalesAnalysisApp(QMainWindow):
         if not folder_path:
             return
         
+        # 読み込み中は新しい検索を受け付けない
+        if self.load_thread is not None:
+            return
+        
+        start_date_str = DataHandler.date_to_string(self.start_date.date())
+        end_date_str = DataHandler.date_to_string(self.end_date.date())
+        print(f"検索日付範囲: {start_date_str} から {end_date_str}")
+        
         # プログレスダイアログを作成
         progress = QProgressDialog("CSVデータを読み込み中...", "キャンセル", 0, 100, self)
         progress.setWindowTitle("データ読み込み")
         progress.setWindowModality(Qt.WindowModal)
         progress.setMinimumDuration(0)  # すぐに表示
-        progress.setCancelButton(None)  # キャンセルボタンを無効化
-        progress.setValue(0)  # この行を追加
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.setValue(0)
+        progress.canceled.connect(self._cancel_data_loading)
         progress.show()
-
-        self.repaint()
-        QTimer.singleShot(100, lambda: self._perform_data_loading(progress))
-
-    def _perform_data_loading(self, progress):
+        self.load_progress = progress
+        
+        # 同じフォルダの検索では取込済みのストアを使う（保持している集計結果と日別集計を再利用する）
+        sales_store = None
+        if self.loaded_folder is not None and os.path.abspath(folder_path) == os.path.abspath(self.loaded_folder):
+            sales_store = self.sales_store
+        
+        # 取込と集計はワーカースレッドで実行する
+        self.load_thread = QThread(self)
+        self.load_worker = DataLoadWorker(
+            folder_path, start_date_str, end_date_str, self.cache_dir,
+            workers=self.workers_input.value(),
+            sales_store=sales_store,
+            column_indices=self.column_indices,
+            engine=self.engine_combo.currentText()
+        )
+        self.load_worker.moveToThread(self.load_thread)
+        self.load_thread.started.connect(self.load_worker.run)
+        self.load_worker.progress.connect(self._on_load_progress)
+        self.load_worker.finished.connect(self._on_data_loaded)
+        self.load_worker.failed.connect(self._on_load_failed)
+        self.load_worker.cancelled.connect(self._on_load_cancelled)
+        self.load_thread.start()
+
+    def _cancel_data_loading(self):
+        """読み込みのキャンセルを要求"""
+        if self.load_worker is not None:
+            self.load_progress.setLabelText("キャンセルしています...")
+            self.load_worker.cancel()
+
+    def _on_load_progress(self, value, message):
+        """ワーカーからの進捗をダイアログに反映"""
+        if self.load_progress is not None and not self.load_progress.wasCanceled():
+            self.load_progress.setLabelText(message)
+            self.load_progress.setValue(value)
+
+    def _finish_data_loading(self):
+        """ワーカースレッドとプログレスダイアログを片付ける"""
+        if self.load_progress is not None:
+            self.load_progress.close()
+            self.load_progress = None
+        if self.load_thread is not None:
+            self.load_thread.quit()
+            self.load_thread.wait()
+            self.load_thread.deleteLater()
+            self.load_worker.deleteLater()
+            self.load_thread = None
+            self.load_worker = None
+        
+        # 読み込み中に届いた変更はこのあと取り込む
+        if self.refresh_pending:
+            self.refresh_pending = False
+            QTimer.singleShot(0, self._refresh_from_folder)
+
+    def closeEvent(self, event):
+        """ウィンドウを閉じる際に読み込み中のワーカーを停止"""
+        self.folder_watcher.stop()
+        self.refresh_pending = False
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+            self._finish_data_loading()
+        super().closeEvent(event)
+
+    def _on_load_cancelled(self):
+        """読み込みがキャンセルされた"""
+        print("データ読み込みをキャンセルしました")
+        self._finish_data_loading()
+
+    def _on_load_failed(self, message):
+        """読み込み中にエラーが発生した"""
+        self._finish_data_loading()
+        QMessageBox.critical(self, "エラー", f"データ処理中にエラーが発生しました:\n{message}")
+
+    def _on_data_loaded(self, result):
+        """ワーカーの読み込み結果をテーブルに表示"""
+        if result is None:
+            self._finish_data_loading()
+            return
+        
         try:
-            progress.setLabelText("CSVファイルを読み込んでいます...")
-            progress.setValue(20)
-            self.repaint()
-
-            # CSVデータ読み込み
-            all_data = DataHandler.load_csv_data(self.folder_path.text())
-            if all_data is None:
-                progress.close()
-                return
-            
-            progress.setLabelText("データをフィルタリング中...")
-            progress.setValue(40)
-            self.repaint()
-            
-            # CSVデータを保存
-            self.csv_data = all_data
-            
-            # 日付範囲での絞り込み
-            start_date_str = DataHandler.date_to_string(self.start_date.date())
-            end_date_str = DataHandler.date_to_string(self.end_date.date())
-            
-            print(f"検索日付範囲: {start_date_str} から {end_date_str}")
-            
-            progress.setLabelText("表示データを準備中...")
-            progress.setValue(60)
-            self.repaint()
-            
-            # 日付列名を取得
-            date_column_index = self.column_indices["date_column_index"]
-            
-            if len(all_data.columns) <= date_column_index:
-                print(f"警告: 予想される取引日付の列が存在しません。列数: {len(all_data.columns)}")
-                progress.close()
-                return
-            
-            date_column_name = all_data.columns[date_column_index]
-            print(f"取引日付の列: {date_column_name}")
-            
-            # 日付データをフィルタリング
-            filtered_data = DataHandler.filter_data_by_date(all_data, start_date_str, end_date_str, date_column_name)
-            
-            progress.setLabelText("テーブルデータを準備中...")
-            progress.setValue(80)
-            self.repaint()
-            
-            if filtered_data.empty:
-                progress.close()
+            self.load_progress.setLabelText("テーブルデータを準備中...")
+            self.load_progress.setValue(90)
+            
+            # ストアと検索範囲を保存
+            self.sales_store = result["sales_store"]
+            self.time_series_tab.set_sales_store(self.sales_store)
+            self.loaded_range = result["loaded_range"]
+            self.loaded_folder = self.load_worker.folder_path
+            start_date_str, end_date_str = self.loaded_range
+            summary_data = result["summary"]
+            
+            # 検索したフォルダを監視する（フォルダ監視がオンの場合）
+            self._update_folder_watch()
+            
+            if summary_data is None:
+                self._finish_data_loading()
                 QMessageBox.information(self, "検索結果", "フィルター条件に合致するデータがありません")
                 # テーブルをクリア
-                self.product_table.setRowCount(0)
-                self.group_table.setRowCount(0)
-                self.receipt_detail_table.setRowCount(0)  # 追加
-                self.total_count_label.setText("合計枚数: 0")
-                self.total_amount_label.setText("合計金額: 0円")
+                self._clear_summary()
                 return
             
-            # 集計データ作成
-            summary_data = DataHandler.create_summary(filtered_data, self.column_indices)
+            self._show_summary(summary_data)
             
-            # 集計データを保存（詳細表示のために必要）
-            self.last_summary = summary_data
+            self.load_progress.setValue(100)
+            self._finish_data_loading()
             
+        except Exception as e:
+            self._finish_data_loading()
+            import traceback
+            print(f"データ処理エラー: {e}")
+            print(traceback.format_exc())
+            QMessageBox.critical(self, "エラー", f"データ処理中にエラーが発生しました:\n{str(e)}")
+            return
+
+        # 売上推移タブに日付範囲を設定
+        self.time_series_tab.set_date_filter(start_date_str, end_date_str)
+    
+    def _show_summary(self, summary_data):
+        """集計結果を各テーブルと合計表示に反映する"""
+        # 集計データを保存（伝票別表示とエクスポートで再利用）
+        self.last_summary = summary_data
+        self.summary_range = self.loaded_range
+        
+        with PerfLog.span("populate_tables", rows=len(summary_data)):
             # 商品別テーブルに表示
-            self.display_product_table(summary_data["product_summary"])
+            self.display_product_table(summary_data.product_summary)
             
             # グループ別テーブルに表示
-            self.display_group_table(summary_data["group_summary"])
+            self.display_group_table(summary_data.group_summary)
 
             # 伝票別詳細テーブルに表示（修正）
             self.update_receipt_detail()
-            
-            progress.setValue(100)
-            
-            # 合計表示
-            self.total_count_label.setText(f"合計枚数: {summary_data['total_count']}")
-            self.total_amount_label.setText(f"合計金額: {summary_data['total_amount']:,}円")
-            self.cashless_count_label.setText(f"【 キャッシュレス枚数: {summary_data['cashless_count']}")
-            self.cashless_amount_label.setText(f"キャッシュレス金額: {summary_data['cashless_amount']:,}円 】")
-            print(f"集計完了: 合計枚数={summary_data['total_count']}, 合計金額={summary_data['total_amount']}, " +
-                f"キャッシュレス枚数={summary_data['cashless_count']}, キャッシュレス金額={summary_data['cashless_amount']}")
-            
-            progress.close()
-            
-        except Exception as e:
-            progress.close()
-            import traceback
-            print(f"データ処理エラー: {e}")
-            print(traceback.format_exc())
-            QMessageBox.critical(self, "エラー", f"データ処理中にエラーが発生しました:\n{str(e)}")
+        
+        # 合計表示
+        self.total_count_label.setText(f"合計枚数: {summary_data.total_count}")
+        self.total_amount_label.setText(f"合計金額: {summary_data.total_amount:,}円")
+        self.cashless_count_label.setText(f"【 キャッシュレス枚数: {summary_data.cashless_count}")
+        self.cashless_amount_label.setText(f"キャッシュレス金額: {summary_data.cashless_amount:,}円 】")
+        print(f"集計完了: 合計枚数={summary_data.total_count}, 合計金額={summary_data.total_amount}, " +
+            f"キャッシュレス枚数={summary_data.cashless_count}, キャッシュレス金額={summary_data.cashless_amount}")
+    
+    def _clear_summary(self):
+        """集計結果の表示をクリア"""
+        self.last_summary = None
+        self.summary_range = None
+        self.product_model.clear()
+        self.group_model.clear()
+        self.receipt_detail_model.clear()
+        self.time_series_tab.clear()
+        self.total_count_label.setText("合計枚数: 0")
+        self.total_amount_label.setText("合計金額: 0円")
+    
+    def _refresh_from_folder(self):
+        """監視中のフォルダの新規・変更CSVだけを取り込み、表示中の集計を更新する
 
-        # TimeSeriesTabに日付範囲を設定
-        if hasattr(self, 'time_series_tab'):
-            self.time_series_tab.set_date_filter(start_date_str, end_date_str)
+        プログレスダイアログは出さず、取込済みのストアに差分だけを取り込む
+        """
+        if self.sales_store is None or not self.folder_watcher.is_watching:
+            return
+        
+        # 検索や前回の取込が終わってから取り込む
+        if self.load_thread is not None:
+            self.refresh_pending = True
+            return
+        
+        print(f"フォルダの変更を検出しました: {self.loaded_folder}")
+        start_date_str, end_date_str = self.loaded_range
+        self.load_thread = QThread(self)
+        self.load_worker = DataLoadWorker(
+            self.loaded_folder, start_date_str, end_date_str, self.cache_dir,
+            sales_store=self.sales_store,
+            engine=self.engine_combo.currentText()
+        )
+        self.load_worker.moveToThread(self.load_thread)
+        self.load_thread.started.connect(self.load_worker.run)
+        self.load_worker.finished.connect(self._on_folder_refreshed)
+        self.load_worker.failed.connect(self._on_refresh_failed)
+        self.load_worker.cancelled.connect(self._finish_data_loading)
+        self.load_thread.start()
+    
+    def _on_folder_refreshed(self, result):
+        """フォルダ監視による取込結果を表示に反映（検索範囲の日付が変わった場合のみ）"""
+        self._finish_data_loading()
+        # 取込で置き換えられたファイルを監視し直す
+        self.folder_watcher.sync()
+        if result is None:
+            return
+        
+        start_date_str, end_date_str = result["loaded_range"]
+        if not any(start_date_str <= date_str <= end_date_str for date_str in result["changed_dates"]):
+            return
+        
+        if result["summary"] is None:
+            self._clear_summary()
+        else:
+            self._show_summary(result["summary"])
+            self.time_series_tab.refresh()
+    
+    def _on_refresh_failed(self, message):
+        """フォルダ監視による取込でエラーが発生した（次の変更で再度取り込む）"""
+        self._finish_data_loading()
+        print(f"フォルダ監視の取込エラー: {message}")
             
     def display_product_table(self, product_summary):
         """商品別テーブルにデータを表示"""
-        self.product_table.setRowCount(0)
+        self.product_model.set_summary(product_summary)
         
-        for _, row in product_summary.iterrows():
-            row_position = self.product_table.rowCount()
-            self.product_table.insertRow(row_position)
-            
-            # 商品コード
-            try:
-                product_code = str(row.iloc[0])
-                if product_code.isdigit():
-                    self.product_table.setItem(row_position, 0, NumericTableWidgetItem(int(product_code)))
-                else:
-                    self.product_table.setItem(row_position, 0, QTableWidgetItem(product_code))
-            except:
-                self.product_table.setItem(row_position, 0, QTableWidgetItem(str(row.iloc[0])))
-                
-            # 商品名称
-            self.product_table.setItem(row_position, 1, QTableWidgetItem(str(row.iloc[1])))
-            
-            # 枚数
-            count_value = int(row.iloc[2])
-            count_item = NumericTableWidgetItem(count_value, str(count_value))
-            count_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.product_table.setItem(row_position, 2, count_item)
-            
-            # 金額
-            amount_value = int(row.iloc[3])
-            amount_item = NumericTableWidgetItem(amount_value, f"{amount_value:,}")
-            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.product_table.setItem(row_position, 3, amount_item)
-        
-        # ソートがある場合は適用
+        # ソートがある場合は適用（ヘッダーのソート方向表示はモデルが行う）
         if self.sort_column is not None:
-            self.product_table.sortItems(self.sort_column, self.sort_order)
-            # ヘッダーにソート方向表示を更新
-            self._update_header_sort_indicators(self.product_table, self.sort_column)
+            self.product_model.sort(self.sort_column, self.sort_order)
     
     def display_group_table(self, group_summary):
         """集計グループ別テーブルにデータを表示"""
-        self.group_table.setRowCount(0)
-        
-        for _, row in group_summary.iterrows():
-            row_position = self.group_table.rowCount()
-            self.group_table.insertRow(row_position)
-            
-            # グループ番号
-            try:
-                group_num = str(row.iloc[0])
-                if group_num.isdigit():
-                    self.group_table.setItem(row_position, 0, NumericTableWidgetItem(int(group_num)))
-                else:
-                    self.group_table.setItem(row_position, 0, QTableWidgetItem(group_num))
-            except:
-                self.group_table.setItem(row_position, 0, QTableWidgetItem(str(row.iloc[0])))
-                
-            # グループ名称
-            self.group_table.setItem(row_position, 1, QTableWidgetItem(str(row.iloc[1])))
-            
-            # 枚数
-            count_value = int(row.iloc[2])
-            count_item = NumericTableWidgetItem(count_value, str(count_value))
-            count_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.group_table.setItem(row_position, 2, count_item)
-            
-            # 金額
-            amount_value = int(row.iloc[3])
-            amount_item = NumericTableWidgetItem(amount_value, f"{amount_value:,}")
-            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.group_table.setItem(row_position, 3, amount_item)
+        self.group_model.set_summary(group_summary)
         
         # ソートがある場合は適用
         if self.sort_column_g is not None:
-            self.group_table.sortItems(self.sort_column_g, self.sort_order_g)
-            # ヘッダーにソート方向表示を更新
-            self._update_header_sort_indicators(self.group_table, self.sort_column_g, is_group=True)
+            self.group_model.sort(self.sort_column_g, self.sort_order_g)
 
     
     def update_receipt_detail(self):
         """選択された伝票種別の詳細を表示"""
-        if self.csv_data is None or self.csv_data.empty:
+        if self.sales_store is None:
             return
             
-        self.receipt_detail_table.setRowCount(0)
+        self.receipt_detail_model.clear()
         
         # 日付でフィルタリングされたデータを取得
         start_date_str = DataHandler.date_to_string(self.start_date.date())
         end_date_str = DataHandler.date_to_string(self.end_date.date())
         
-        # 日付列名を取得
-        date_column_index = self.column_indices["date_column_index"]
-        date_column_name = self.csv_data.columns[date_column_index]
-        
-        # データ型を確認して強制的に文字列に変換
-        date_data = self.csv_data[date_column_name].astype(str)
-        
-        # 日付フィルタリング
-        filtered_data = self.csv_data[
-            (date_data >= start_date_str) & 
-            (date_data <= end_date_str)
-        ]
-        
-        if filtered_data.empty:
-            return
-        
-        # 列インデックスを取得
-        amount_idx = self.column_indices["amount_idx"]
-        count_idx = self.column_indices["count_idx"]
-        amount_sign_idx = self.column_indices["amount_sign_idx"]
-        card_deduction_idx = self.column_indices["card_deduction_idx"]
-        product_code_idx = self.column_indices["product_code_idx"]
-        product_name_idx = self.column_indices["product_name_idx"]
-        
-        # 列名を取得
-        amount_col = filtered_data.columns[amount_idx]
-        count_col = filtered_data.columns[count_idx]
-        amount_sign_col = filtered_data.columns[amount_sign_idx]
-        card_deduction_col = filtered_data.columns[card_deduction_idx]
-        product_code_col = filtered_data.columns[product_code_idx]
-        product_name_col = filtered_data.columns[product_name_idx]
-        
-        # データ型を数値に変換（エラーハンドリング付き）
-        try:
-            filtered_data[amount_col] = pd.to_numeric(filtered_data[amount_col], errors='coerce').fillna(0)
-            filtered_data[count_col] = pd.to_numeric(filtered_data[count_col], errors='coerce').fillna(0)
-            filtered_data[amount_sign_col] = pd.to_numeric(filtered_data[amount_sign_col], errors='coerce').fillna(0)
-            filtered_data[card_deduction_col] = pd.to_numeric(filtered_data[card_deduction_col], errors='coerce').fillna(0)
-        except Exception as e:
-            print(f"データ変換エラー: {e}")
-            return
+        # 日付範囲の集計結果から伝票種別の商品別集計を取り出す
+        summary = self._get_summary(start_date_str, end_date_str)
         
-        # 選択された伝票種別に応じてデータを絞り込み
         receipt_type = self.receipt_type_combo.currentText()
+        slip = {
+            "現金売上": SLIP_CASH,
+            "キャッシュレス決済": SLIP_CASHLESS,
+            "赤伝処理": SLIP_RED
+        }.get(receipt_type)
         
-        if receipt_type == "現金売上":
-            # 現金売上: 金額符号=0 且つ カード減算額=0
-            target_data = filtered_data[
-                (filtered_data[amount_sign_col] == 0) & 
-                (filtered_data[card_deduction_col] == 0)
-            ]
-        elif receipt_type == "キャッシュレス決済":
-            # キャッシュレス決済: 金額符号=0 且つ カード減算額≠0
-            target_data = filtered_data[
-                (filtered_data[amount_sign_col] == 0) & 
-                (filtered_data[card_deduction_col] != 0)
-            ]
-        elif receipt_type == "赤伝処理":
-            # 赤伝処理: 金額符号=1
-            target_data = filtered_data[filtered_data[amount_sign_col] == 1]
-        else:
+        if summary is None or slip is None:
             return
         
-        if target_data.empty:
-            return
+        product_summary = summary.slip_products(slip)
         
-        # 商品別に集計
-        product_summary = target_data.groupby([product_code_col, product_name_col]).agg({
-            count_col: 'sum',
-            amount_col: 'sum'
-        }).reset_index()
+        # 合計表示を更新
+        total_count = summary.slip_totals[slip]['数量']
+        total_amount = summary.slip_totals[slip]['金額']
+        self.receipt_total_count_label.setText(f"合計枚数: {total_count}")
+        self.receipt_total_amount_label.setText(f"合計金額: {total_amount:,}円")
         
-        # テーブルに表示
-        for _, row in product_summary.iterrows():
-            row_position = self.receipt_detail_table.rowCount()
-            self.receipt_detail_table.insertRow(row_position)
-            
-            # 商品コード
-            try:
-                product_code = str(row.iloc[0])
-                if product_code.isdigit():
-                    self.receipt_detail_table.setItem(row_position, 0, NumericTableWidgetItem(int(product_code)))
-                else:
-                    self.receipt_detail_table.setItem(row_position, 0, QTableWidgetItem(product_code))
-            except:
-                self.receipt_detail_table.setItem(row_position, 0, QTableWidgetItem(str(row.iloc[0])))
-                
-            # 商品名称
-            self.receipt_detail_table.setItem(row_position, 1, QTableWidgetItem(str(row.iloc[1])))
-            
-            # 枚数
-            count_value = int(row.iloc[2])
-            count_item = NumericTableWidgetItem(count_value, str(count_value))
-            count_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            
-            # 赤伝処理の場合は赤文字で表示
-            if receipt_type == "赤伝処理":
-                count_item.setForeground(QColor(255, 0, 0))
-                count_item.setText(f"({count_value})")
-            
-            self.receipt_detail_table.setItem(row_position, 2, count_item)
-            
-            # 金額
-            amount_value = int(row.iloc[3])
-            amount_item = NumericTableWidgetItem(amount_value, f"{amount_value:,}")
-            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            
-            # 赤伝処理の場合は赤文字で表示
-            if receipt_type == "赤伝処理":
-                amount_item.setForeground(QColor(255, 0, 0))
-                amount_item.setText(f"({amount_value:,})")
-            
-            self.receipt_detail_table.setItem(row_position, 3, amount_item)
+        with PerfLog.span("populate_receipt_table", rows=len(product_summary)):
+            # テーブルに表示（赤伝処理の場合は赤文字・括弧付きで表示）
+            self.receipt_detail_model.set_summary(product_summary, is_red_slip=(slip == SLIP_RED))
 
-        # 合計計算と表示更新（新規追加）
-            total_count = 0
-            total_amount = 0
-            
-            for row in range(self.receipt_detail_table.rowCount()):
-                count_item = self.receipt_detail_table.item(row, 2)
-                amount_item = self.receipt_detail_table.item(row, 3)
-                
-                if count_item and amount_item:
-                    # NumericTableWidgetItemから数値を取得
-                    if hasattr(count_item, 'numeric_value'):
-                        count_value = count_item.numeric_value
-                    else:
-                        count_text = count_item.text().replace('(', '').replace(')', '').replace(',', '')
-                        count_value = int(count_text) if count_text.isdigit() else 0
-                    
-                    if hasattr(amount_item, 'numeric_value'):
-                        amount_value = amount_item.numeric_value
-                    else:
-                        amount_text = amount_item.text().replace('(', '').replace(')', '').replace(',', '')
-                        amount_value = int(amount_text) if amount_text.replace('-', '').isdigit() else 0
-                    
-                    total_count += count_value
-                    total_amount += amount_value
-            
-            # 合計表示を更新
-            self.receipt_total_count_label.setText(f"合計枚数: {total_count}")
-            self.receipt_total_amount_label.setText(f"合計金額: {total_amount:,}円")
-            
-            # ソートがある場合は適用（新規追加）
+            # ソートがある場合は適用
             if self.sort_column_r is not None:
-                self.receipt_detail_table.sortItems(self.sort_column_r, self.sort_order_r)
-                self._update_header_sort_indicators(self.receipt_detail_table, self.sort_column_r, is_receipt=True)              
+                self.receipt_detail_model.sort(self.sort_column_r, self.sort_order_r)
     
     def sort_product_table(self, column_index):
         """商品別テーブルのソート処理"""
@@ -765,11 +783,8 @@ class SalesAnalysisApp(QMainWindow):
             self.sort_column = column_index
             self.sort_order = Qt.AscendingOrder
         
-        # ソート適用
-        self.product_table.sortItems(column_index, self.sort_order)
-        
-        # ヘッダーにソート方向表示
-        self._update_header_sort_indicators(self.product_table, column_index)
+        # ソート適用（ヘッダーのソート方向表示も更新される）
+        self.product_model.sort(column_index, self.sort_order)
     
     def sort_group_table(self, column_index):
         """集計グループ別テーブルのソート処理"""
@@ -781,11 +796,8 @@ class SalesAnalysisApp(QMainWindow):
             self.sort_column_g = column_index
             self.sort_order_g = Qt.AscendingOrder
         
-        # ソート適用
-        self.group_table.sortItems(column_index, self.sort_order_g)
-        
-        # ヘッダーにソート方向表示
-        self._update_header_sort_indicators(self.group_table, column_index, is_group=True)
+        # ソート適用（ヘッダーのソート方向表示も更新される）
+        self.group_model.sort(column_index, self.sort_order_g)
     
     def sort_receipt_table(self, column_index):
         """伝票別テーブルのソート処理"""
@@ -797,25 +809,5 @@ class SalesAnalysisApp(QMainWindow):
             self.sort_column_r = column_index
             self.sort_order_r = Qt.AscendingOrder
         
-        # ソート適用
-        self.receipt_detail_table.sortItems(column_index, self.sort_order_r)
-        
-        # ヘッダーにソート方向表示
-        self._update_header_sort_indicators(self.receipt_detail_table, column_index, is_receipt=True)
-
-    def _update_header_sort_indicators(self, table, active_column, is_group=False, is_receipt=False):
-        """テーブルヘッダーにソート方向を表示"""
-        if is_receipt:
-            sort_order = self.sort_order_r
-        elif is_group:
-            sort_order = self.sort_order_g
-        else:
-            sort_order = self.sort_order
-        
-        for i in range(table.columnCount()):
-            header_text = table.horizontalHeaderItem(i).text().split(" ")[0]
-            if i == active_column:
-                direction = "▼" if sort_order == Qt.DescendingOrder else "▲"
-                table.setHorizontalHeaderItem(i, QTableWidgetItem(f"{header_text} {direction}"))
-            else:
-                table.setHorizontalHeaderItem(i, QTableWidgetItem(header_text))
\ No newline at end of file
+        # ソート適用（ヘッダーのソート方向表示も更新される）
+        self.receipt_detail_model.sort(column_index, self.sort_order_r)
@@ -0,0 +1,297 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from PyQt5.QtCore import QDate, QSettings
+
+from data_handler import DataHandler
+from export_handler import ExportHandler
+from ingest_cache import IngestCache
+from sales_store import SalesStore
+from perf_log import PerfLog
+
+
+class BatchExporter:
+    """GUIを使わずに店舗・期間ごとの帳票（Excel/PDF）を出力する
+
+    CSVフォルダはストアに1回だけ取り込み、帳票ごとの集計はストアの日別集計を合算して作成する
+    """
+
+    FILE_EXTENSIONS = {"excel": ".xlsx", "pdf": ".pdf"}
+    DATE_FORMAT = "yyyy-MM-dd"
+
+    def __init__(self, cache_dir=None, workers=1, engine=None):
+        """engine: CSV解析エンジン（省略時はDataHandler.CSV_ENGINE）"""
+        if cache_dir is None:
+            cache_dir = IngestCache.default_cache_dir(QSettings("KBSeries", "SalesAnalysis"))
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.engine = engine
+        self.export_handler = ExportHandler()
+        self._stores = {}  # CSVフォルダ -> 取込済みのストア
+
+    @staticmethod
+    def parse_date(date_str):
+        """YYYY-MM-DD / YYYY/MM/DD / YYYYMMDD 形式の文字列をQDateに変換（不正な場合はNone）"""
+        for date_format in ("yyyy-MM-dd", "yyyy/MM/dd", "yyyyMMdd"):
+            date = QDate.fromString(date_str, date_format)
+            if date.isValid():
+                return date
+        return None
+
+    @staticmethod
+    def load_manifest(manifest_path):
+        """店舗一覧ファイルを読み込み、(店舗名, CSVフォルダ) の一覧を返す
+
+        JSON: [{"shop": "本店", "folder": "D:/KB/honten"}, ...]
+        CSV: 1列目=店舗名, 2列目=CSVフォルダ（見出し行 shop,folder は省略可、UTF-8またはShift-JIS）
+        フォルダの相対パスは店舗一覧ファイルの場所を基準にする
+        """
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+        if manifest_path.lower().endswith('.json'):
+            with open(manifest_path, 'r', encoding='utf-8-sig') as f:
+                rows = [(entry["shop"], entry["folder"]) for entry in json.load(f)]
+        else:
+            try:
+                with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+                    lines = list(csv.reader(f))
+            except UnicodeDecodeError:
+                with open(manifest_path, 'r', encoding='cp932', newline='') as f:
+                    lines = list(csv.reader(f))
+            rows = [
+                (line[0].strip(), line[1].strip()) for line in lines
+                if len(line) >= 2 and line[0].strip() and line[0].strip().lower() != "shop"
+            ]
+
+        return [(shop_name, os.path.join(base_dir, folder_path)) for shop_name, folder_path in rows]
+
+    @staticmethod
+    def split_periods(start_date, end_date, split="none"):
+        """日付範囲を帳票1件ごとの (開始日, 終了日) に分ける
+
+        split: "none"=範囲全体で1件, "day"=1日ごと, "month"=1か月ごと
+        """
+        if split == "none":
+            return [(start_date, end_date)]
+
+        periods = []
+        period_start = start_date
+        while period_start <= end_date:
+            if split == "day":
+                period_end = period_start
+            else:
+                period_end = QDate(period_start.year(), period_start.month(), period_start.daysInMonth())
+                if period_end > end_date:
+                    period_end = end_date
+            periods.append((period_start, period_end))
+            period_start = period_end.addDays(1)
+        return periods
+
+    def _open_store(self, folder_path):
+        """CSVフォルダをストアに取り込む（同じ実行中は1フォルダにつき1回だけ）"""
+        key = os.path.abspath(folder_path)
+        sales_store = self._stores.get(key)
+        if sales_store is None:
+            sales_store = SalesStore.for_folder(folder_path, self.cache_dir)
+            sales_store.compile(folder_path, workers=self.workers, engine=self.engine)
+            self._stores[key] = sales_store
+        return sales_store
+
+    def export_store(self, folder_path, shop_name, start_date, end_date, output_dir,
+                     formats=("excel",), split="none"):
+        """1店舗分の帳票を出力し、(出力ファイル, 成否) の一覧を返す"""
+        results = []
+        sales_store = self._open_store(folder_path)
+        if sales_store.columns is None:
+            print(f"有効なCSVファイルが見つかりませんでした: {folder_path}")
+            return results
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        for period_start, period_end in self.split_periods(start_date, end_date, split):
+            # 期間内の日別集計を合算する（明細は読まない）
+            summary = sales_store.summary(
+                DataHandler.date_to_string(period_start), DataHandler.date_to_string(period_end)
+            )
+            report = self.export_handler.report_names(shop_name, period_start, period_end)
+
+            if summary.is_empty:
+                print(f"データなし: {shop_name} {report['date_range']}")
+                continue
+
+            for export_format in formats:
+                file_path = os.path.join(output_dir, report["file_name"] + self.FILE_EXTENSIONS[export_format])
+                with PerfLog.span(f"export_{export_format}", shop=shop_name):
+                    if export_format == "excel":
+                        success = self.export_handler.excel_exporter.export_to_excel(
+                            summary, file_path, report["shop_name"], report["title"], report["date_range"]
+                        )
+                    else:
+                        success = self.export_handler.pdf_exporter.export_to_pdf(
+                            summary, file_path, report["shop_name"], report["title"], report["date_range"]
+                        )
+                print(f"{'出力完了' if success else '出力失敗'}: {file_path}")
+                results.append((file_path, success))
+
+        return results
+
+    def run_store(self, shop_name, folder_path, start_date, end_date, output_dir,
+                  formats=("excel",), split="none"):
+        """1店舗分の帳票を出力し、店舗ごとの集計結果（出力結果・所要秒数・エラー）を返す"""
+        started = time.perf_counter()
+        error = None
+        results = []
+        try:
+            if not os.path.isdir(folder_path):
+                raise FileNotFoundError(f"CSVフォルダが見つかりません: {folder_path}")
+            results = self.export_store(folder_path, shop_name, start_date, end_date, output_dir, formats, split)
+        except Exception as e:
+            error = str(e)
+            print(f"店舗の出力エラー: {shop_name}, エラー: {e}")
+            print(traceback.format_exc())
+
+        return {
+            "shop": shop_name,
+            "folder": folder_path,
+            "results": results,
+            "elapsed": time.perf_counter() - started,
+            "error": error
+        }
+
+
+# プロセスプールの各プロセスで使い回すBatchExporter
+_process_exporter = None
+
+
+def _run_store_task(task):
+    """プロセスプールで1フォルダ分（同じフォルダを使う店舗すべて）の帳票を出力する
+
+    引数と戻り値はpickle可能な値だけにする
+    """
+    global _process_exporter
+    if _process_exporter is None:
+        # 店舗単位で並列に処理するため、各プロセス内のCSV解析は並列化しない
+        _process_exporter = BatchExporter(task["cache_dir"], workers=1, engine=task["engine"])
+
+    start_date = QDate.fromString(task["start"], BatchExporter.DATE_FORMAT)
+    end_date = QDate.fromString(task["end"], BatchExporter.DATE_FORMAT)
+    return [
+        _process_exporter.run_store(
+            shop_name, task["folder"], start_date, end_date, task["output"], task["formats"], task["split"]
+        )
+        for shop_name in task["shops"]
+    ]
+
+
+def print_store_summary(store_results):
+    """店舗ごとの出力件数・所要時間・成否を表示"""
+    print("店舗別の結果:")
+    for store_result in store_results:
+        succeeded = sum(1 for _, success in store_result["results"] if success)
+        failed = len(store_result["results"]) - succeeded
+        status = "OK" if store_result["error"] is None and failed == 0 else "NG"
+        line = f"  [{status}] {store_result['shop']}: 出力 {succeeded} 件, 失敗 {failed} 件, {store_result['elapsed']:.2f}秒"
+        if store_result["error"] is not None:
+            line += f" ({store_result['error']})"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="CSVフォルダから売上日計表・月計表をGUIなしで出力します",
+        epilog="例: python batch_export.py --store 本店 D:\\KB\\honten --store 駅前店 D:\\KB\\ekimae "
+               "--start 2025-04-01 --end 2025-04-30 --split day --format all --output reports\n"
+               "    python batch_export.py --manifest shops.csv --start 2025-04-01 --processes 4 --output reports",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--folder", help="CSVフォルダ（--shopと組み合わせて1店舗を指定）")
+    parser.add_argument("--shop", default="KB Series", help="店舗名（--folderと組み合わせて使用）")
+    parser.add_argument("--store", nargs=2, action="append", default=[], metavar=("SHOP", "FOLDER"),
+                        help="店舗名とCSVフォルダ（複数指定可）")
+    parser.add_argument("--manifest", help="店舗名とCSVフォルダの一覧ファイル（CSVまたはJSON）")
+    parser.add_argument("--start", required=True, help="開始日 (YYYY-MM-DD)")
+    parser.add_argument("--end", help="終了日 (YYYY-MM-DD、省略時は開始日)")
+    parser.add_argument("--split", choices=["none", "day", "month"], default="none",
+                        help="帳票の単位（none=期間全体, day=日ごと, month=月ごと）")
+    parser.add_argument("--format", choices=["excel", "pdf", "all"], default="excel", help="出力形式")
+    parser.add_argument("--output", default=".", help="出力先フォルダ")
+    parser.add_argument("--workers", type=int, default=1, help="CSVの並列読み込み数（--processesが1の場合）")
+    parser.add_argument("--processes", type=int, default=1, help="店舗を並列に処理するプロセス数")
+    parser.add_argument("--cache-dir", help="取込キャッシュの保存先（省略時はGUIと共有）")
+    parser.add_argument("--engine", choices=DataHandler.CSV_ENGINES, default=DataHandler.CSV_ENGINE,
+                        help="CSV解析エンジン（pyarrowはマルチスレッドで解析）")
+    parser.add_argument("--perf-log", help="処理時間のログの保存先フォルダ（省略時はキャッシュの保存先の logs、"
+                                           "--processesが2以上の場合は各プロセス内の処理は記録しない）")
+    args = parser.parse_args(argv)
+
+    stores = [(shop, folder) for shop, folder in args.store]
+    if args.manifest:
+        stores.extend(BatchExporter.load_manifest(args.manifest))
+    if args.folder:
+        stores.append((args.shop, args.folder))
+    if not stores:
+        parser.error("--folder, --store または --manifest を指定してください")
+
+    start_date = BatchExporter.parse_date(args.start)
+    end_date = BatchExporter.parse_date(args.end) if args.end else start_date
+    if start_date is None or end_date is None or start_date > end_date:
+        parser.error("日付範囲が不正です")
+
+    formats = ("excel", "pdf") if args.format == "all" else (args.format,)
+    processes = min(max(1, args.processes), len(stores))
+    
+    cache_dir = args.cache_dir or IngestCache.default_cache_dir(QSettings("KBSeries", "SalesAnalysis"))
+    PerfLog.configure(args.perf_log or PerfLog.default_log_dir(cache_dir))
+
+    started = time.perf_counter()
+    if processes > 1:
+        # 帳票の作成（reportlab/openpyxl）はCPU負荷が高いため、店舗ごとに別プロセスで処理する
+        # 同じフォルダのストアを複数のプロセスから同時に更新しないよう、フォルダ単位でまとめる
+        shops_by_folder = {}
+        for store_position, (shop_name, folder_path) in enumerate(stores):
+            shops_by_folder.setdefault(os.path.abspath(folder_path), []).append((store_position, shop_name))
+        tasks = [
+            {
+                "shops": [shop_name for _, shop_name in shop_entries],
+                "folder": folder_path,
+                "start": start_date.toString(BatchExporter.DATE_FORMAT),
+                "end": end_date.toString(BatchExporter.DATE_FORMAT),
+                "output": args.output,
+                "formats": formats,
+                "split": args.split,
+                "cache_dir": cache_dir,
+                "engine": args.engine
+            }
+            for folder_path, shop_entries in shops_by_folder.items()
+        ]
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks))) as executor:
+            store_results = [None] * len(stores)
+            for shop_entries, task_results in zip(shops_by_folder.values(), executor.map(_run_store_task, tasks)):
+                # 店舗一覧の順に並べ直す
+                for (store_position, _), store_result in zip(shop_entries, task_results):
+                    store_results[store_position] = store_result
+    else:
+        exporter = BatchExporter(args.cache_dir, max(1, args.workers), engine=args.engine)
+        store_results = []
+        for shop_name, folder_path in stores:
+            print(f"店舗: {shop_name} ({folder_path})")
+            store_results.append(exporter.run_store(
+                shop_name, folder_path, start_date, end_date, args.output, formats, args.split
+            ))
+
+    print_store_summary(store_results)
+
+    results = [result for store_result in store_results for result in store_result["results"]]
+    failed = [file_path for file_path, success in results if not success]
+    failed_stores = [store_result for store_result in store_results if store_result["error"] is not None]
+    print(f"出力 {len(results) - len(failed)} 件, 失敗 {len(failed)} 件 ({time.perf_counter() - started:.2f}秒)")
+    return 1 if failed or failed_stores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
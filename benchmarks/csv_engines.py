@@ -0,0 +1,59 @@
+"""CSV解析エンジンの比較
+
+実際の券売機CSVフォルダを、解析エンジン（pandas / pyarrow）と読み込む列（全列 / 集計で使う列のみ）の
+組み合わせごとに読み込み、所要時間を表示する
+
+例: python benchmarks/csv_engines.py --folder D:\\KB\\honten --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_handler import DataHandler
+
+
+def read_folder(csv_files, usecols, engine):
+    """フォルダ内のCSVをすべて読み込み、(行数, 所要秒数) を返す"""
+    start_time = time.perf_counter()
+    rows = 0
+    for file_path in csv_files:
+        rows += len(DataHandler.read_csv_file(file_path, usecols, engine))
+    return rows, time.perf_counter() - start_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSV解析エンジンの読み込み時間を比較します")
+    parser.add_argument("--folder", required=True, help="券売機のCSVフォルダ")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最速の回を表示）")
+    parser.add_argument("--engine", choices=DataHandler.CSV_ENGINES, action="append",
+                        help="比較するエンジン（複数指定可、省略時は使用可能なすべて）")
+    args = parser.parse_args(argv)
+
+    csv_files = DataHandler.find_csv_files(args.folder)
+    if not csv_files:
+        parser.error(f"CSVファイルが見つかりません: {args.folder}")
+
+    total_bytes = sum(os.path.getsize(file_path) for file_path in csv_files)
+    encodings = sorted({DataHandler.sniff_encoding(file_path) for file_path in csv_files})
+    print(f"CSV: {len(csv_files)} ファイル, {total_bytes / 1024 / 1024:.1f} MB, 文字コード: {', '.join(encodings)}")
+
+    engines = args.engine or DataHandler.available_csv_engines()
+    projections = (("全列", None), ("集計列のみ", DataHandler.column_projection()))
+
+    print(f"{'エンジン':<10}{'読み込む列':<12}{'行数':>10}{'最速(秒)':>10}{'MB/秒':>10}")
+    for engine in engines:
+        for label, usecols in projections:
+            timings = []
+            for _ in range(max(1, args.repeat)):
+                rows, elapsed = read_folder(csv_files, usecols, engine)
+                timings.append(elapsed)
+            best = min(timings)
+            print(f"{engine:<10}{label:<12}{rows:>10}{best:>10.3f}{total_bytes / 1024 / 1024 / best:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""券売機（KBシリーズ）の集計用CSV（*Count*.csv）を合成データで作成する
+
+取引日付ごとに券売機1台につき1ファイル（KB<機番>_<YYMMDD>_Count.csv）を作成する
+列の並びは DataHandler.COLUMN_INDICES と同じで、文字コードは Shift_JIS
+
+例: python benchmarks/generate_csv.py --output bench_data --rows 100000 --days 30 --machines 3
+"""
+import os
+import sys
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 券売機CSVの列（9: 枚数, 10: 金額符号, 11: 金額, 12: カード減算額, 13: 取引日付,
+# 16: 商品コード, 17: 論理口座名称, 18: 集計G番号, 19: 集計G名称）
+COLUMNS = [
+    "レコード区分", "機番", "店舗コード", "端末番号", "伝票番号", "取引番号", "明細番号", "券種", "予備1",
+    "枚数", "金額符号", "金額", "カード減算額", "取引日付", "取引時刻", "予備2",
+    "商品コード", "論理口座名称", "集計Ｇ番号", "集計Ｇ名称", "備考"
+]
+
+# 商品の単価の候補
+UNIT_PRICES = np.array([150, 300, 450, 500, 680, 800, 950, 1200])
+
+
+def generate(output_dir, rows, days=30, machines=2, products=60, groups=8, red_ratio=0.02,
+             cashless_ratio=0.3, blank_group_ratio=0.01, start_date=date(2025, 4, 1), seed=0):
+    """合成CSVをoutput_dirに作成し、作成したファイルのパス一覧を返す
+
+    rows: 全ファイルの合計行数（日付と券売機に均等に振り分ける）
+    red_ratio: 赤伝（金額符号=1）の割合
+    cashless_ratio: 赤伝以外のうちキャッシュレス決済（カード減算額≠0）の割合
+    blank_group_ratio: 集計G名称が空白の行の割合（帳票では「その他」に集計される）
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 商品マスタ（商品コード, 名称, 集計G番号, 集計G名称, 単価）
+    product_codes = np.array([f"{code:04d}" for code in range(1, products + 1)], dtype=object)
+    product_names = np.array([f"メニュー{code}" for code in range(1, products + 1)], dtype=object)
+    product_groups = rng.integers(1, groups + 1, size=products)
+    group_nums = np.array([f"{group:02d}" for group in product_groups], dtype=object)
+    group_names = np.array([f"グループ{group}" for group in product_groups], dtype=object)
+    unit_prices = rng.choice(UNIT_PRICES, size=products)
+    # 売れ筋に偏りを持たせる
+    weights = 1.0 / np.arange(1, products + 1)
+    weights /= weights.sum()
+
+    file_count = days * machines
+    file_rows = np.full(file_count, rows // file_count)
+    file_rows[:rows % file_count] += 1
+
+    paths = []
+    for file_index in range(file_count):
+        day = start_date + timedelta(days=file_index // machines)
+        machine = file_index % machines
+        n = int(file_rows[file_index])
+
+        product = rng.choice(products, size=n, p=weights)
+        count = rng.integers(1, 4, size=n)
+        amount = count * unit_prices[product]
+        is_red = rng.random(n) < red_ratio
+        is_cashless = ~is_red & (rng.random(n) < cashless_ratio)
+        group_name = group_names[product].copy()
+        group_name[rng.random(n) < blank_group_ratio] = ""
+        seconds = np.sort(rng.integers(6 * 3600, 22 * 3600, size=n))
+
+        frame = pd.DataFrame({
+            "レコード区分": "1",
+            "機番": str(machine),
+            "店舗コード": "S01",
+            "端末番号": f"T{machine + 1}",
+            "伝票番号": np.arange(n),
+            "取引番号": np.arange(n),
+            "明細番号": "1",
+            "券種": "A",
+            "予備1": "",
+            "枚数": count,
+            "金額符号": np.where(is_red, "1", "0"),
+            "金額": amount,
+            "カード減算額": np.where(is_cashless, amount, 0),
+            "取引日付": day.strftime("%y%m%d"),
+            "取引時刻": [f"{s // 3600:02d}{s % 3600 // 60:02d}{s % 60:02d}" for s in seconds],
+            "予備2": "",
+            "商品コード": product_codes[product],
+            "論理口座名称": product_names[product],
+            "集計Ｇ番号": group_nums[product],
+            "集計Ｇ名称": group_name,
+            "備考": ""
+        }, columns=COLUMNS)
+
+        path = os.path.join(output_dir, f"KB{machine}_{day.strftime('%y%m%d')}_Count.csv")
+        frame.to_csv(path, index=False, encoding="shift_jis")
+        paths.append(path)
+
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="券売機の集計用CSVを合成データで作成します")
+    parser.add_argument("--output", required=True, help="出力先フォルダ")
+    parser.add_argument("--rows", type=int, default=100000, help="合計行数")
+    parser.add_argument("--days", type=int, default=30, help="日数")
+    parser.add_argument("--machines", type=int, default=2, help="券売機の台数")
+    parser.add_argument("--products", type=int, default=60, help="商品数")
+    parser.add_argument("--groups", type=int, default=8, help="集計グループ数")
+    parser.add_argument("--red-ratio", type=float, default=0.02, help="赤伝の割合")
+    parser.add_argument("--cashless-ratio", type=float, default=0.3, help="キャッシュレス決済の割合")
+    parser.add_argument("--start", default="2025-04-01", help="開始日 (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    args = parser.parse_args(argv)
+
+    paths = generate(
+        args.output, args.rows, days=args.days, machines=args.machines, products=args.products,
+        groups=args.groups, red_ratio=args.red_ratio, cashless_ratio=args.cashless_ratio,
+        start_date=date.fromisoformat(args.start), seed=args.seed
+    )
+    print(f"{len(paths)} ファイル, {args.rows} 行を作成しました: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""取込・絞り込み・集計・エクスポートの処理時間を計測する
+
+generate_csv.py の合成データを行数ごとに作成し、各処理の所要時間をJSONで出力する
+--compare に以前の結果を渡すと、処理ごとの比率を表示し、閾値より遅くなった処理があれば終了コード1を返す
+
+例: python benchmarks/hot_paths.py --rows 10000 100000 --output result.json
+    python benchmarks/hot_paths.py --rows 10000 100000 --compare result.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from PyQt5.QtCore import Qt
+
+from data_handler import DataHandler
+from sales_store import SalesStore
+from sales_aggregator import SLIP_CASH, SLIP_CASHLESS, SLIP_RED
+from widgets import SummaryTableModel
+from pdf_exporter import PDFExporter
+from excel_exporter import ExcelExporter
+
+import generate_csv
+
+RESULT_VERSION = 1
+DEFAULT_ROWS = (10000, 100000, 1000000)
+
+
+def measure(func, repeat):
+    """funcをrepeat回実行し、(最後の戻り値, 各回の所要秒数) を返す（アプリの出力は標準エラーに回す）"""
+    timings = []
+    result = None
+    for _ in range(max(1, repeat)):
+        with contextlib.redirect_stdout(sys.stderr):
+            start_time = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start_time)
+    return result, timings
+
+
+def show_receipt_details(summary):
+    """SalesAnalysisApp.update_receipt_detail と同じ処理を伝票種別ごとに行う（テーブルへの設定とソートまで）"""
+    model = SummaryTableModel(["商品コード", "商品名称", "枚数", "金額"])
+    for slip in (SLIP_CASH, SLIP_CASHLESS, SLIP_RED):
+        product_summary = summary.slip_products(slip)
+        model.set_summary(product_summary, is_red_slip=(slip == SLIP_RED))
+        model.sort(0, Qt.AscendingOrder)
+    return model
+
+
+def run_size(rows, args, work_dir):
+    """1つの行数について合成データを作成し、各処理を計測する"""
+    data_dir = os.path.join(work_dir, f"csv_{rows}")
+    start_date = date.fromisoformat(args.start)
+    generate_csv.generate(
+        data_dir, rows, days=args.days, machines=args.machines, products=args.products, groups=args.groups,
+        red_ratio=args.red_ratio, cashless_ratio=args.cashless_ratio, start_date=start_date, seed=args.seed
+    )
+
+    # 絞り込みは期間の前半（月計表を想定）
+    end_date = start_date + timedelta(days=max(0, args.days // 2 - 1))
+    start_date_str = start_date.strftime("%y%m%d")
+    end_date_str = end_date.strftime("%y%m%d")
+    date_str = f"{start_date:%Y/%m/%d}～{end_date:%Y/%m/%d}"
+    column_indices = DataHandler.COLUMN_INDICES
+    date_col_index = column_indices["date_column_index"]
+
+    stages = {}
+
+    def record(name, func):
+        result, timings = measure(func, args.repeat)
+        stages[name] = {"seconds": min(timings), "runs": timings}
+        print(f"  {name}: {min(timings):.3f}秒", file=sys.stderr)
+        return result
+
+    data = record("load_csv_data", lambda: DataHandler.load_csv_data(data_dir, engine=args.engine))
+    date_col = data.columns[date_col_index]
+    filtered = record("filter_data_by_date", lambda: DataHandler.filter_data_by_date(
+        data, start_date_str, end_date_str, date_col
+    ))
+    summary = record("create_summary", lambda: DataHandler.create_summary(filtered, column_indices))
+    record("update_receipt_detail", lambda: show_receipt_details(summary))
+
+    # GUIの検索と同じ、ストアへの取込（初回）と日別集計からの集計
+    store_dir = os.path.join(work_dir, f"store_{rows}")
+
+    def compile_store():
+        shutil.rmtree(store_dir, ignore_errors=True)
+        sales_store = SalesStore(store_dir)
+        sales_store.compile(data_dir, engine=args.engine)
+        return sales_store
+
+    sales_store = record("store_compile", compile_store)
+    record("store_summary", lambda: sales_store.summary(start_date_str, end_date_str))
+
+    # フォント登録のメッセージもJSONに混ざらないよう標準エラーに回す
+    with contextlib.redirect_stdout(sys.stderr):
+        pdf_exporter = PDFExporter()
+        excel_exporter = ExcelExporter()
+    record("export_to_pdf", lambda: pdf_exporter.export_to_pdf(
+        summary, os.path.join(work_dir, f"report_{rows}.pdf"), "ベンチマーク店", "売上月計表", date_str
+    ))
+    record("export_to_excel", lambda: excel_exporter.export_to_excel(
+        summary, os.path.join(work_dir, f"report_{rows}.xlsx"), "ベンチマーク店", "売上月計表", date_str
+    ))
+
+    return {"rows": rows, "filtered_rows": len(filtered), "stages": stages}
+
+
+def environment():
+    """計測環境（比較時の参考）"""
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "pyarrow": pyarrow_version
+    }
+
+
+def compare(result, baseline, threshold):
+    """以前の結果と処理ごとに比較して表示し、threshold倍より遅くなった処理の数を返す"""
+    baseline_sizes = {entry["rows"]: entry["stages"] for entry in baseline.get("results", [])}
+    regressions = 0
+    print(f"{'行数':>10}  {'処理':<24}{'以前(秒)':>10}{'今回(秒)':>10}{'比率':>8}", file=sys.stderr)
+    for entry in result["results"]:
+        old_stages = baseline_sizes.get(entry["rows"])
+        if old_stages is None:
+            continue
+        for name, stage in entry["stages"].items():
+            if name not in old_stages:
+                continue
+            old_seconds = old_stages[name]["seconds"]
+            ratio = stage["seconds"] / old_seconds if old_seconds > 0 else float("inf")
+            mark = ""
+            if ratio > threshold:
+                mark = "  遅くなりました"
+                regressions += 1
+            print(f"{entry['rows']:>10}  {name:<24}{old_seconds:>10.3f}{stage['seconds']:>10.3f}{ratio:>8.2f}{mark}",
+                  file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="取込・集計・エクスポートの処理時間を計測し、JSONで出力します")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS), help="計測する行数（複数指定可）")
+    parser.add_argument("--days", type=int, default=30, help="日数")
+    parser.add_argument("--machines", type=int, default=2, help="券売機の台数")
+    parser.add_argument("--products", type=int, default=60, help="商品数")
+    parser.add_argument("--groups", type=int, default=8, help="集計グループ数")
+    parser.add_argument("--red-ratio", type=float, default=0.02, help="赤伝の割合")
+    parser.add_argument("--cashless-ratio", type=float, default=0.3, help="キャッシュレス決済の割合")
+    parser.add_argument("--start", default="2025-04-01", help="開始日 (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--engine", choices=DataHandler.CSV_ENGINES, default=DataHandler.CSV_ENGINE,
+                        help="CSV解析エンジン")
+    parser.add_argument("--repeat", type=int, default=3, help="各処理の計測回数（最速の回を結果とする）")
+    parser.add_argument("--work-dir", help="合成データと出力の作業フォルダ（省略時は一時フォルダを作成して削除）")
+    parser.add_argument("--output", help="結果のJSONファイル（省略時は標準出力）")
+    parser.add_argument("--compare", help="比較する以前の結果のJSONファイル")
+    parser.add_argument("--threshold", type=float, default=1.2, help="遅くなったと判定する比率")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="kb_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        results = []
+        for rows in args.rows:
+            print(f"{rows} 行:", file=sys.stderr)
+            results.append(run_size(rows, args, work_dir))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {
+        "version": RESULT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "config": {
+            key: getattr(args, key)
+            for key in ("days", "machines", "products", "groups", "red_ratio", "cashless_ratio",
+                        "start", "seed", "engine", "repeat")
+        },
+        "results": results
+    }
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""アプリの起動時間を計測する
+
+main.py と同じ手順（QApplicationの作成 → app の読み込み → メインウィンドウの作成と表示）を
+新しいプロセスで --runs 回実行し、段階ごとの所要時間（最速の回）と、表示した時点で読み込み済みの
+重いモジュールをJSONで出力する
+--compare に以前の結果を渡すと、段階ごとの比率を表示し、閾値より遅くなった段階があれば終了コード1を返す
+
+例: python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --compare startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+RESULT_VERSION = 1
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 起動時に読み込まれているかを確認するモジュール
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "matplotlib", "reportlab", "openpyxl")
+
+# 計測用のプロセスで実行するコード（結果はJSONで標準出力の最終行に書く）
+CHILD_CODE = r"""
+import time
+start_time = time.perf_counter()
+import os, sys, json, contextlib
+sys.path.insert(0, sys.argv[1])
+stages = {}
+
+def mark(name):
+    global start_time
+    now = time.perf_counter()
+    stages[name] = now - start_time
+    start_time = now
+
+with contextlib.redirect_stdout(sys.stderr):
+    from PyQt5.QtWidgets import QApplication
+    application = QApplication(sys.argv[:1])
+    mark("qt")
+    from app import SalesAnalysisApp
+    mark("import_app")
+    window = SalesAnalysisApp()
+    mark("create_window")
+    window.show()
+    application.processEvents()
+    mark("show_window")
+
+print(json.dumps({
+    "stages": stages,
+    "modules": [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+}))
+"""
+
+
+def run_once(env):
+    """新しいプロセスで1回起動し、(段階ごとの秒数, 読み込み済みのモジュール) を返す"""
+    start_time = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, ROOT_DIR, json.dumps(HEAVY_MODULES)],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8"
+    )
+    elapsed = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(f"起動の計測に失敗しました:\n{completed.stderr}")
+
+    child = json.loads(completed.stdout.strip().splitlines()[-1])
+    stages = child["stages"]
+    stages["total"] = sum(stages.values())
+    # Pythonの起動とプロセスの終了を含む時間
+    stages["process"] = elapsed
+    return stages, child["modules"]
+
+
+def environment():
+    """計測環境（比較時の参考）"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(result, baseline, threshold):
+    """以前の結果と段階ごとに比較して表示し、threshold倍より遅くなった段階の数を返す"""
+    old_stages = baseline.get("stages", {})
+    regressions = 0
+    print(f"{'段階':<16}{'以前(秒)':>10}{'今回(秒)':>10}{'比率':>8}", file=sys.stderr)
+    for name, stage in result["stages"].items():
+        if name not in old_stages:
+            continue
+        old_seconds = old_stages[name]["seconds"]
+        ratio = stage["seconds"] / old_seconds if old_seconds > 0 else float("inf")
+        mark = ""
+        if ratio > threshold:
+            mark = "  遅くなりました"
+            regressions += 1
+        print(f"{name:<16}{old_seconds:>10.3f}{stage['seconds']:>10.3f}{ratio:>8.2f}{mark}", file=sys.stderr)
+    print(f"起動時に読み込み済み: 以前 {', '.join(baseline.get('modules', [])) or 'なし'} / "
+          f"今回 {', '.join(result['modules']) or 'なし'}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="アプリの起動時間を計測し、JSONで出力します")
+    parser.add_argument("--runs", type=int, default=5, help="起動の回数（最速の回を結果とする）")
+    parser.add_argument("--platform", default="offscreen",
+                        help="QT_QPA_PLATFORM（画面に表示して計測する場合は空文字を指定）")
+    parser.add_argument("--output", help="結果のJSONファイル（省略時は標準出力）")
+    parser.add_argument("--compare", help="比較する以前の結果のJSONファイル")
+    parser.add_argument("--threshold", type=float, default=1.2, help="遅くなったと判定する比率")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.platform:
+        env["QT_QPA_PLATFORM"] = args.platform
+    else:
+        env.pop("QT_QPA_PLATFORM", None)
+
+    runs = []
+    modules = []
+    for index in range(max(1, args.runs)):
+        stages, modules = run_once(env)
+        runs.append(stages)
+        print(f"  {index + 1}回目: {stages['total']:.3f}秒（プロセス {stages['process']:.3f}秒）", file=sys.stderr)
+
+    result = {
+        "version": RESULT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "config": {"runs": args.runs, "platform": args.platform},
+        "stages": {
+            name: {"seconds": min(stages[name] for stages in runs), "runs": [stages[name] for stages in runs]}
+            for name in runs[0]
+        },
+        "modules": modules
+    }
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,56 @@
 import os
+import time
+import codecs
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from sales_aggregator import SalesAggregator
+from perf_log import PerfLog
 from PyQt5.QtCore import QDate
 
+# pyarrowのCSVリーダー（インストールされていない場合はpandasで解析する）
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
 class DataHandler:
+    # 券売機CSVの列インデックス
+    COLUMN_INDICES = {
+        "date_column_index": 13,  # 取引日付の列インデックス
+        "group_num_idx": 18,      # 集計G番号
+        "group_name_idx": 19,     # 集計G名称
+        "product_code_idx": 16,   # 商品コード/メニュー番号
+        "product_name_idx": 17,   # 論理口座名称/メニュー名
+        "count_idx": 9,           # 枚数/数量
+        "amount_idx": 11,         # 金額
+        "amount_sign_idx": 10,    # 金額符号（金額・枚数）
+        "card_deduction_idx": 12  # カード減算額
+    }
+    
+    # 整数型で保持する列と型（枚数、金額、カード減算額）
+    NUMERIC_COLUMN_TYPES = {9: 'int32', 11: 'int64', 12: 'int64'}
+    # カテゴリ型で保持する列（金額符号、商品コード、論理口座名称、集計G番号、集計G名称）
+    CATEGORY_COLUMN_INDICES = (10, 16, 17, 18, 19)
+    
+    # このサイズ以上のCSVは分割して読み込み、読んだ分から日別に集計する
+    LARGE_FILE_BYTES = 256 * 1024 * 1024
+    # 分割読み込みの1回あたりの行数
+    CHUNK_ROWS = 200000
+    
+    # CSV解析エンジン（pandas: pandasのCパーサー, pyarrow: pyarrowのマルチスレッドCSVリーダー）
+    CSV_ENGINES = ("pandas", "pyarrow")
+    CSV_ENGINE = "pandas"
+    # 文字コードの判定に読む先頭のバイト数
+    SNIFF_BYTES = 64 * 1024
+    # 先頭がASCIIだけで判定できない場合の文字コード（券売機の出力）
+    DEFAULT_ENCODING = "shift_jis"
+    # 先頭部分より後ろに判定した文字コードで復号できない文字があった場合に読み直す文字コード
+    # （Shift_JISにないCP932の文字（①、㈱など）が後ろの行にだけある場合）
+    FALLBACK_ENCODING = "cp932"
+    
     @staticmethod
     def parse_date(date_str):
         """日付文字列(YYMMDD)をQDateに変換"""
@@ -22,113 +70,447 @@ class DataHandler:
         return f"{date.year() - 2000:02d}{date.month():02d}{date.day():02d}"
     
     @staticmethod
-    def load_csv_data(folder_path):
-        """フォルダから複数のCSVファイルを読み込み結合する"""
-        all_data = []
-        csv_count = 0
+    def find_csv_files(folder_path):
+        """フォルダ内の集計対象CSV（*Count*.csv、Saleを含むものは除く）のパス一覧を返す"""
+        csv_files = []
+        for root, dirs, files in os.walk(folder_path):
+            for file in files:
+                if file.lower().endswith('.csv') and 'Count' in file and 'Sale' not in file:
+                    csv_files.append(os.path.join(root, file))
+        # 並列読み込みでも結合順が変わらないようにパス順に並べる
+        return sorted(csv_files)
+    
+    @staticmethod
+    def column_projection(column_indices=None):
+        """列インデックスの辞書（省略時はCOLUMN_INDICES）から、読み込む列の一覧を昇順で返す"""
+        if column_indices is None:
+            column_indices = DataHandler.COLUMN_INDICES
+        return sorted(set(column_indices.values()))
+    
+    @staticmethod
+    def projected_column_indices(column_indices=None):
+        """column_projectionの列だけを読み込んだデータでの列インデックスの辞書"""
+        if column_indices is None:
+            column_indices = DataHandler.COLUMN_INDICES
+        positions = DataHandler.column_positions(DataHandler.column_projection(column_indices))
+        return {name: positions[idx] for name, idx in column_indices.items()}
+    
+    @staticmethod
+    def column_positions(usecols):
+        """usecolsの列だけを読み込んだ場合の 元の列インデックス -> 列位置"""
+        return {idx: pos for pos, idx in enumerate(usecols)}
+    
+    @staticmethod
+    def schema_positions(column_indices):
+        """dataでの列インデックスの辞書から、apply_schemaに渡す 元の列インデックス -> 列位置 を作成
+        
+        一部の列だけ読み込んだデータ（projected_column_indicesの結果）でも同じ列に型を付ける
+        """
+        return {DataHandler.COLUMN_INDICES[key]: column_indices[key] for key in DataHandler.COLUMN_INDICES}
+    
+    @staticmethod
+    def _pad_projection(data, usecols, available):
+        """列が足りないファイルで読み込めなかった列を空の列として補い、usecolsと同じ並びにする"""
+        if len(available) == len(usecols):
+            return data
+        names = iter(data.columns)
+        return data.reindex(columns=[
+            next(names) if idx in available else f"Unnamed: {idx}" for idx in usecols
+        ])
+    
+    @staticmethod
+    def sniff_encoding(file_path):
+        """ファイル先頭のSNIFF_BYTESだけを読んで文字コードを判定する
         
+        BOM付きUTF-8, UTF-8, Shift_JIS, CP932 の順に、先頭部分をエラーなく復号できるものを返す
+        （末尾で途切れた多バイト文字はエラーにしない）
+        """
+        with open(file_path, 'rb') as f:
+            sample = f.read(DataHandler.SNIFF_BYTES)
+        
+        if sample.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        if sample.isascii():
+            return DataHandler.DEFAULT_ENCODING
+        
+        for encoding in ("utf-8", "shift_jis", "cp932"):
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return DataHandler.DEFAULT_ENCODING
+    
+    @staticmethod
+    def read_with_encoding(file_path, read):
+        """sniff_encodingで判定した文字コードで read(encoding) を呼び、その結果を返す
+        
+        ファイルの途中で復号できない文字があった場合は、FALLBACK_ENCODINGでファイル全体を読み直す
+        """
+        encoding = DataHandler.sniff_encoding(file_path)
         try:
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if file.lower().endswith('.csv') and 'Count' in file and 'Sale' not in file:
-                        file_path = os.path.join(root, file)
-                        try:
-                            df = pd.read_csv(file_path, encoding='shift-jis', dtype=str)
-                            all_data.append(df)
-                            csv_count += 1
-                            print(f"読み込み成功: {file_path}")
-                        except Exception as e:
-                            print(f"ファイル読み込みエラー: {file_path}, エラー: {e}")
-            
-            if not all_data:
-                print("有効なCSVファイルが見つかりませんでした")
-                return None
-            
-            combined_data = pd.concat(all_data, ignore_index=True)
-            print(f"合計 {csv_count} ファイルを読み込みました。合計 {len(combined_data)} 行のデータ。")
-            return combined_data
+            return read(encoding)
+        except UnicodeDecodeError as e:
+            if encoding == DataHandler.FALLBACK_ENCODING:
+                raise
+            print(f"{encoding}で復号できない文字があるため{DataHandler.FALLBACK_ENCODING}で読み込み直します: "
+                  f"{file_path}, {e}")
+            return read(DataHandler.FALLBACK_ENCODING)
+    
+    @staticmethod
+    def available_csv_engines():
+        """この環境で使えるCSV解析エンジンの一覧"""
+        return [engine for engine in DataHandler.CSV_ENGINES if engine != "pyarrow" or pa_csv is not None]
+    
+    @staticmethod
+    def resolve_engine(engine):
+        """CSV解析エンジン名を確定する（省略時はCSV_ENGINE、pyarrowがない場合はpandas）"""
+        engine = engine or DataHandler.CSV_ENGINE
+        if engine not in DataHandler.CSV_ENGINES:
+            raise ValueError(f"未対応のCSV解析エンジンです: {engine}")
+        if engine == "pyarrow" and pa_csv is None:
+            print("pyarrowがインストールされていないため、pandasでCSVを解析します")
+            return "pandas"
+        return engine
+    
+    @staticmethod
+    def _read_header(file_path, encoding):
+        """ヘッダー行の列名一覧（重複した列名はpandasと同じく「名前.1」の形にする）"""
+        return pd.read_csv(file_path, encoding=encoding, dtype=str, nrows=0).columns.tolist()
+    
+    @staticmethod
+    def _available_usecols(file_path, usecols, encoding, header=None):
+        """ヘッダー行の列数から、usecolsのうちファイルに存在する列を返す"""
+        if header is None:
+            header = DataHandler._read_header(file_path, encoding)
+        available = [idx for idx in usecols if idx < len(header)]
+        if len(available) < len(usecols):
+            print(f"警告: 列が不足しています: {file_path} ({len(header)} 列)")
+        return available
+    
+    @staticmethod
+    def read_csv_file(file_path, usecols=None, engine=None):
+        """券売機のCSVファイルを1件読み込む
         
+        文字コードは先頭部分から1回だけ判定する（read_with_encoding）
+        usecols（元の列インデックスの一覧）を指定すると、その列だけを解析して残りは読み捨てる
+        列が足りないファイルは存在する列だけを読み込み、足りない列は空にする
+        engine: CSV解析エンジン（CSV_ENGINESのいずれか、省略時はCSV_ENGINE）
+        """
+        return DataHandler.read_with_encoding(
+            file_path, lambda encoding: DataHandler._read_csv_encoded(file_path, encoding, usecols, engine)
+        )
+    
+    @staticmethod
+    def _read_csv_encoded(file_path, encoding, usecols=None, engine=None):
+        """文字コードを指定してread_csv_fileの読み込みを行う"""
+        if DataHandler.resolve_engine(engine) == "pyarrow":
+            try:
+                return DataHandler._read_csv_pyarrow(file_path, encoding, usecols)
+            except pa.ArrowInvalid as e:
+                # 列数がそろっていない行などpyarrowで読めないファイルはpandasで読み込む
+                print(f"pyarrowで解析できないためpandasで読み込みます: {file_path}, {e}")
+        
+        if usecols is None:
+            return pd.read_csv(file_path, encoding=encoding, dtype=str)
+        
+        try:
+            return pd.read_csv(file_path, encoding=encoding, dtype=str, usecols=list(usecols))
+        except ValueError:
+            # 範囲外の列を指定した場合のエラー（ParserErrorの場合もある）以外はそのまま送出する
+            available = DataHandler._available_usecols(file_path, usecols, encoding)
+            if len(available) == len(usecols):
+                raise
+            data = pd.read_csv(file_path, encoding=encoding, dtype=str, usecols=available)
+            return DataHandler._pad_projection(data, usecols, available)
+    
+    @staticmethod
+    def _read_csv_pyarrow(file_path, encoding, usecols=None):
+        """pyarrowのCSVリーダーで読み込み、pandasで dtype=str を指定した場合と同じDataFrameを返す
+        
+        UTF-8以外のファイルはReadOptionsのencodingで少しずつUTF-8に変換しながら解析する
+        列は位置で指定できるように仮の列名で読み込み、最後にヘッダー行の列名に戻す
+        """
+        header = DataHandler._read_header(file_path, encoding)
+        if usecols is None:
+            usecols = available = list(range(len(header)))
+        else:
+            available = DataHandler._available_usecols(file_path, usecols, encoding, header)
+        
+        column_names = [f"c{idx}" for idx in range(len(header))]
+        include_columns = [column_names[idx] for idx in available]
+        table = pa_csv.read_csv(
+            file_path,
+            read_options=pa_csv.ReadOptions(encoding=encoding, skip_rows=1, column_names=column_names),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=include_columns,
+                column_types={name: pa.string() for name in include_columns},
+                strings_can_be_null=True
+            )
+        )
+        data = table.to_pandas()
+        data.columns = [header[idx] for idx in available]
+        return DataHandler._pad_projection(data, usecols, available)
+    
+    @staticmethod
+    def _read_csv_timed(file_path, usecols=None, engine=None):
+        """CSVを1件読み込み、(パス, データ, 所要秒数, エラー) を返す（プロセスプールから呼ばれる）"""
+        start_time = time.perf_counter()
+        try:
+            df = DataHandler.read_csv_file(file_path, usecols, engine)
+            return file_path, df, time.perf_counter() - start_time, None
+        except Exception as e:
+            return file_path, None, time.perf_counter() - start_time, str(e)
+    
+    @staticmethod
+    def read_csv_files(file_paths, workers=1, use_processes=True, usecols=None, engine=None):
+        """複数のCSVを読み込み、(パス, データ, 所要秒数, エラー) を入力と同じ順に返すジェネレータ
+        
+        workersが2以上の場合はプロセスプール（use_processes=Falseならスレッドプール）で並列に解析する
+        usecolsとengineはread_csv_fileと同じ
+        """
+        if workers <= 1 or len(file_paths) <= 1:
+            for file_path in file_paths:
+                result = DataHandler._read_csv_timed(file_path, usecols, engine)
+                DataHandler._record_read(result)
+                yield result
+            return
+        
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        executor = executor_class(max_workers=min(workers, len(file_paths)))
+        try:
+            # mapは完了順ではなく入力順に結果を返す
+            for result in executor.map(DataHandler._read_csv_timed, file_paths,
+                                       [usecols] * len(file_paths), [engine] * len(file_paths)):
+                DataHandler._record_read(result)
+                yield result
+        finally:
+            # 途中で打ち切られた場合は未着手のファイルを取り消す
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    @staticmethod
+    def _record_read(result):
+        """_read_csv_timedの結果を性能ログに記録（並列解析の場合もワーカーで計測した時間を使う）"""
+        file_path, data, elapsed, error = result
+        PerfLog.record(
+            "read_csv", elapsed, file=os.path.basename(file_path),
+            rows=len(data) if data is not None else None, error=error
+        )
+    
+    @staticmethod
+    def apply_schema(data, positions=None):
+        """文字列で読み込んだデータに型を付ける（数値列は整数、コード・名称列はカテゴリ）
+        
+        読み込み時に1回だけ行い、以降の集計やエクスポートでは数値変換やコピーをしない
+        positions: 一部の列だけ読み込んだ場合の 元の列インデックス -> dataの列位置
+        """
+        data = data.copy()
+        
+        def column_at(idx):
+            pos = positions.get(idx) if positions is not None else idx
+            return data.columns[pos] if pos is not None and len(data.columns) > pos else None
+        
+        for idx, dtype in DataHandler.NUMERIC_COLUMN_TYPES.items():
+            col = column_at(idx)
+            if col is not None:
+                data[col] = pd.to_numeric(data[col], errors='coerce').fillna(0).astype(dtype)
+        
+        for idx in DataHandler.CATEGORY_COLUMN_INDICES:
+            col = column_at(idx)
+            if col is not None:
+                data[col] = data[col].astype('category')
+        
+        return data
+    
+    @staticmethod
+    def rollup_csv_chunked(file_path, chunk_rows=None, column_indices=None):
+        """大きなCSVを分割して読み込み、取引日付ごとの集計表（SalesAggregator.rollupの結果）を返す
+        
+        集計で使う列（column_projection）だけをchunk_rows行ずつ読み込み、読んだ分を
+        日別の集計表に合算していくため、使用メモリはファイルサイズではなく分割の大きさで決まる
+        戻り値: (読み込んだ列の列名一覧, {取引日付: (集計表, 明細行数)}, 取引日付が不正な行数)
+        """
+        return DataHandler.read_with_encoding(
+            file_path,
+            lambda encoding: DataHandler._rollup_csv_encoded(file_path, encoding, chunk_rows, column_indices)
+        )
+    
+    @staticmethod
+    def _rollup_csv_encoded(file_path, encoding, chunk_rows=None, column_indices=None):
+        """文字コードを指定してrollup_csv_chunkedの読み込みと集計を行う"""
+        usecols = DataHandler.column_projection(column_indices)
+        positions = DataHandler.column_positions(usecols)
+        column_indices = DataHandler.projected_column_indices(column_indices)
+        daily = {}
+        invalid_rows = 0
+        
+        header = DataHandler._read_header(file_path, encoding)
+        available = DataHandler._available_usecols(file_path, usecols, encoding, header)
+        columns = [header[idx] if idx in available else f"Unnamed: {idx}" for idx in usecols]
+        
+        reader = pd.read_csv(
+            file_path, encoding=encoding, dtype=str, usecols=available,
+            chunksize=chunk_rows or DataHandler.CHUNK_ROWS, memory_map=True
+        )
+        with reader:
+            for chunk in reader:
+                chunk = DataHandler.apply_schema(DataHandler._pad_projection(chunk, usecols, available), positions)
+                dates = chunk[chunk.columns[column_indices["date_column_index"]]].astype(str)
+                valid = dates.str.fullmatch(r'\d{6}')
+                invalid_rows += int((~valid).sum())
+                
+                for date_str, day_data in chunk[valid].groupby(dates[valid], sort=True):
+                    rollup = SalesAggregator.rollup(day_data, column_indices)
+                    if date_str in daily:
+                        # これまでの集計表の後ろに続く明細として合算する
+                        previous, row_count = daily[date_str]
+                        rollup = SalesAggregator.merge([previous, rollup], [row_count, len(day_data)])
+                        daily[date_str] = (rollup, row_count + len(day_data))
+                    else:
+                        daily[date_str] = (rollup, len(day_data))
+        
+        return columns, daily, invalid_rows
+    
+    @staticmethod
+    def concat_frames(frames):
+        """複数のDataFrameを結合し、カテゴリ型の列を維持する"""
+        combined_data = pd.concat(frames, ignore_index=True)
+        
+        # カテゴリの値が異なるフレーム同士を結合すると文字列型に戻るため再変換
+        for col in frames[0].columns:
+            if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and \
+                    not isinstance(combined_data[col].dtype, pd.CategoricalDtype):
+                combined_data[col] = combined_data[col].astype('category')
+        
+        return combined_data
+    
+    @staticmethod
+    def is_typed(data, column_indices=None):
+        """apply_schemaで型付け済みのデータか（枚数・金額・カード減算額の列がすべて数値型か）
+        
+        column_indices: dataでの列インデックス（一部の列だけ読み込んだ場合はprojected_column_indicesの結果、
+        省略時はCOLUMN_INDICES）
+        """
+        if column_indices is None:
+            column_indices = DataHandler.COLUMN_INDICES
+        positions = [column_indices[key] for key in ("count_idx", "amount_idx", "card_deduction_idx")]
+        return all(
+            len(data.columns) > pos and pd.api.types.is_numeric_dtype(data.iloc[:, pos])
+            for pos in positions
+        )
+    
+    @staticmethod
+    def load_csv_data(folder_path, cache=None, workers=1, use_processes=True, usecols=None, engine=None):
+        """フォルダから複数のCSVファイルを読み込み、型付けして結合する
+        
+        cacheにIngestCacheを渡すと、変更のないファイルは解析済みデータを再利用する
+        workersが2以上の場合は未キャッシュのファイルを並列に解析する
+        usecols（column_projectionの結果）を指定するとその列だけを読み込む
+        （列インデックスはprojected_column_indicesを使う）
+        engine: CSV解析エンジン（read_csv_fileを参照）
+        """
+        try:
+            with PerfLog.span("load_csv_data") as span:
+                return DataHandler._load_csv_data(folder_path, cache, workers, use_processes, usecols, engine, span)
         except Exception as e:
             print(f"フォルダ処理エラー: {e}")
             return None
     
     @staticmethod
-    def filter_data_by_date(data, start_date_str, end_date_str, date_column_name):
-        """日付範囲でデータをフィルタリング"""
-        data[date_column_name] = data[date_column_name].astype(str)
+    def _load_csv_data(folder_path, cache, workers, use_processes, usecols, engine, span):
+        """load_csv_dataの本体（spanには読み込んだファイル数と行数を記録する）"""
+        csv_files = DataHandler.find_csv_files(folder_path)
+        loaded = {}
+        pending_paths = []
+        # 解析前のサイズと更新日時（キャッシュにはこの時点の値で登録する）
+        stats = {}
+        
+        for file_path in csv_files:
+            df = cache.get(file_path, usecols) if cache is not None else None
+            if df is not None:
+                loaded[file_path] = df
+            else:
+                pending_paths.append(file_path)
+                try:
+                    stats[file_path] = os.stat(file_path)
+                except OSError:
+                    pass
+        cached_count = len(loaded)
+        
+        for file_path, df, elapsed, error in DataHandler.read_csv_files(
+                pending_paths, workers, use_processes, usecols, engine):
+            if error is not None:
+                print(f"ファイル読み込みエラー: {file_path}, エラー: {error}")
+                continue
+            loaded[file_path] = df
+            print(f"読み込み成功: {file_path} ({elapsed:.2f}秒)")
+            if cache is not None and file_path in stats:
+                cache.put(file_path, df, usecols, stats[file_path])
+        
+        if cache is not None:
+            cache.prune(folder_path, csv_files)
+            cache.save()
+            print(f"キャッシュ利用: {cached_count} ファイル, 新規解析: {len(loaded) - cached_count} ファイル")
         
-        filtered_data = data[
-            (data[date_column_name] >= start_date_str) & 
-            (data[date_column_name] <= end_date_str)
-        ]
+        # ファイルのパス順に型付けして結合する
+        positions = DataHandler.column_positions(usecols) if usecols is not None else None
+        with PerfLog.span("apply_schema", files=len(loaded)):
+            all_data = [
+                DataHandler.apply_schema(loaded[file_path], positions)
+                for file_path in csv_files if file_path in loaded
+            ]
+        if not all_data:
+            print("有効なCSVファイルが見つかりませんでした")
+            return None
+        
+        with PerfLog.span("concat", files=len(all_data)) as concat_span:
+            combined_data = DataHandler.concat_frames(all_data)
+            concat_span["rows"] = len(combined_data)
+        print(f"合計 {len(all_data)} ファイルを読み込みました。合計 {len(combined_data)} 行のデータ。")
+        span.update(files=len(all_data), cached_files=cached_count, rows=len(combined_data))
+        return combined_data
+    
+    @staticmethod
+    def filter_data_by_date(data, start_date_str, end_date_str, date_column_name):
+        """日付範囲でデータをフィルタリング（渡されたデータは変更しない）"""
+        with PerfLog.span("filter_data_by_date", input_rows=len(data)) as span:
+            dates = data[date_column_name].astype(str)
+            filtered_data = data[(dates >= start_date_str) & (dates <= end_date_str)]
+            span["rows"] = len(filtered_data)
         
         print(f"フィルター後のデータ行数: {len(filtered_data)}")
         return filtered_data
     
     @staticmethod
     def create_summary(filtered_data, column_indices):
-        """商品別およびグループ別の集計を作成"""
-        product_code_index = column_indices["product_code_idx"]
-        product_name_index = column_indices["product_name_idx"]
-        count_index = column_indices["count_idx"]
-        amount_index = column_indices["amount_idx"]
-        group_num_index = column_indices["group_num_idx"]
-        group_name_index = column_indices["group_name_idx"]
-        
-        product_code_col = filtered_data.columns[product_code_index]
-        product_name_col = filtered_data.columns[product_name_index]
-        count_col = filtered_data.columns[count_index]
-        amount_col = filtered_data.columns[amount_index]
-        group_num_col = filtered_data.columns[group_num_index]
-        group_name_col = filtered_data.columns[group_name_index]
-        
-        amount_sign_col = filtered_data.columns[amount_index - 1]
-        card_amount_col = filtered_data.columns[12]
+        """伝票種別・グループ・商品別の集計を1回で作成し、SalesSummaryを返す
+        
+        商品別・グループ別・伝票別の表示とPDF/Excel出力はすべてこの結果から作成する
+        """
+        product_code_col = filtered_data.columns[column_indices["product_code_idx"]]
+        product_name_col = filtered_data.columns[column_indices["product_name_idx"]]
+        count_col = filtered_data.columns[column_indices["count_idx"]]
+        amount_col = filtered_data.columns[column_indices["amount_idx"]]
+        group_num_col = filtered_data.columns[column_indices["group_num_idx"]]
+        group_name_col = filtered_data.columns[column_indices["group_name_idx"]]
+        amount_sign_col = filtered_data.columns[column_indices["amount_sign_idx"]]
+        card_amount_col = filtered_data.columns[column_indices["card_deduction_idx"]]
         
         print(f"使用する列: 商品コード={product_code_col}, 商品名称={product_name_col}, " +
             f"枚数={count_col}, 金額={amount_col}, 集計 G 番号={group_num_col}, 集計 G 名称={group_name_col}, " +
             f"金額符号={amount_sign_col}, カード減算額={card_amount_col}")
         
-        filtered_data = filtered_data.copy()
-        if not pd.api.types.is_numeric_dtype(filtered_data[count_col]):
-            filtered_data[count_col] = pd.to_numeric(filtered_data[count_col], errors='coerce')
-        if not pd.api.types.is_numeric_dtype(filtered_data[amount_col]):
-            filtered_data[amount_col] = pd.to_numeric(filtered_data[amount_col], errors='coerce')
-        if not pd.api.types.is_numeric_dtype(filtered_data[card_amount_col]):
-            filtered_data[card_amount_col] = pd.to_numeric(filtered_data[card_amount_col], errors='coerce')
-        
-        valid_data = filtered_data[filtered_data[amount_sign_col] != '1'].copy()
-        
-        if not valid_data.empty:
-            product_summary = valid_data.groupby([product_code_col, product_name_col], as_index=False).agg({
-                count_col: 'sum',
-                amount_col: 'sum'
-            })
-        else:
-            product_summary = pd.DataFrame(columns=[product_code_col, product_name_col, count_col, amount_col])
-        
-        if not valid_data.empty:
-            group_summary = valid_data.groupby([group_num_col, group_name_col], as_index=False).agg({
-                count_col: 'sum',
-                amount_col: 'sum'
-            })
-        else:
-            group_summary = pd.DataFrame(columns=[group_num_col, group_name_col, count_col, amount_col])
-        
-        total_count = valid_data[count_col].sum() if not valid_data.empty else 0
-        total_amount = valid_data[amount_col].sum() if not valid_data.empty else 0
-        
-        cashless_count = valid_data[valid_data[card_amount_col] > 0][count_col].sum() if not valid_data.empty else 0
-        cashless_amount = valid_data[valid_data[card_amount_col] > 0][card_amount_col].sum() if not valid_data.empty else 0
+        with PerfLog.span("create_summary", rows=len(filtered_data)) as span:
+            # 型付けされていないデータが渡された場合のみ変換する
+            if not DataHandler.is_typed(filtered_data, column_indices):
+                filtered_data = DataHandler.apply_schema(
+                    filtered_data, DataHandler.schema_positions(column_indices)
+                )
+            
+            summary = SalesAggregator.aggregate(filtered_data, column_indices)
+            span["products"] = len(summary.product_summary)
         
-        print(f"商品別集計結果行数: {len(product_summary)}")
-        print(f"グループ別集計結果行数: {len(group_summary)}")
+        print(f"商品別集計結果行数: {len(summary.product_summary)}")
+        print(f"グループ別集計結果行数: {len(summary.group_summary)}")
         
-        return {
-            "product_summary": product_summary,
-            "group_summary": group_summary,
-            "total_count": total_count,
-            "total_amount": total_amount,
-            "cashless_count": cashless_count,
-            "cashless_amount": cashless_amount
-        }
\ No newline at end of file
+        return summary
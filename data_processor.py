@@ -2,17 +2,20 @@ import pandas as pd
 import os
 import re
 
+from data_handler import DataHandler
+
 class DataProcessor:
     """売上データの読み込みと前処理を行うクラス"""
     
     def __init__(self):
         pass
     
-    def load_data(self, file_path):
+    def load_data(self, file_path, engine=None):
         """ファイルからデータを読み込む
         
         Args:
             file_path (str): 読み込むファイルのパス
+            engine (str): CSV解析エンジン（DataHandler.CSV_ENGINESのいずれか、省略時はDataHandler.CSV_ENGINE）
             
         Returns:
             DataFrame: 読み込んだデータ
@@ -23,26 +26,15 @@ class DataProcessor:
         if file_ext == '.csv':
             # CSVファイルの読み込み
             try:
-                # エンコーディングと区切り文字を自動推定
-                with open(file_path, 'rb') as f:
-                    data = f.read()
-                    
-                # 日本語CSVではShift-JISが多い
-                encodings = ['shift_jis', 'utf-8', 'cp932']
+                # エンコーディングはファイル先頭から1回だけ判定する（途中で復号できない場合だけCP932で読み直す）
+                parser_engine = 'pyarrow' if DataHandler.resolve_engine(engine) == 'pyarrow' else 'c'
+                return DataHandler.read_with_encoding(
+                    file_path, lambda encoding: pd.read_csv(file_path, encoding=encoding, engine=parser_engine)
+                )
                 
-                for encoding in encodings:
-                    try:
-                        df = pd.read_csv(file_path, encoding=encoding)
-                        return df
-                    except UnicodeDecodeError:
-                        continue
-                    except Exception as e:
-                        print(f"CSVファイル読み込みエラー: {e}")
-                        
-                # すべてのエンコーディングで失敗した場合
+            except UnicodeDecodeError:
                 print("CSVファイルのエンコーディングを特定できませんでした。")
                 return None
-                
             except Exception as e:
                 print(f"CSVファイル読み込みエラー: {e}")
                 return None
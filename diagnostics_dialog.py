@@ -0,0 +1,198 @@
+import os
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView,
+                             QHeaderView, QSplitter)
+from PyQt5.QtCore import Qt, QTimer, QUrl, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QDesktopServices
+
+from perf_log import PerfLog
+
+
+class RecordTableModel(QAbstractTableModel):
+    """文字列に変換済みの行（リスト）を表示するだけの読み取り専用テーブルモデル
+
+    right_columns に指定した列は右寄せで表示する
+    """
+
+    def __init__(self, headers, right_columns=(), parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.right_columns = set(right_columns)
+        self._rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self._rows[index.row()][index.column()]
+        if role == Qt.TextAlignmentRole and index.column() in self.right_columns:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        return self.headers[section]
+
+
+class DiagnosticsDialog(QDialog):
+    """処理時間の記録（PerfLog）を表示する診断パネル
+
+    上段は処理ごとの回数・合計・平均・最大の所要時間、下段は直近の記録（新しい順）
+    表示中は REFRESH_MS ごとに新しい記録を反映する
+    """
+
+    REFRESH_MS = 1000
+
+    # 記録の基本項目（これ以外の項目は「詳細」にまとめて表示する）
+    BASE_FIELDS = ("time", "span", "seconds", "rows", "rss_mb", "peak_mb", "peak_delta_mb", "parent",
+                   "thread", "pid")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("診断（処理時間）")
+        self.resize(1000, 600)
+        self._shown_count = None
+        self._shown_last = None
+
+        layout = QVBoxLayout(self)
+
+        self.log_path_label = QLabel()
+        self.log_path_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.log_path_label)
+
+        self.summary_model = RecordTableModel(
+            ["処理", "回数", "合計(秒)", "平均(秒)", "最大(秒)", "最大行数", "最大メモリ増加(MB)"],
+            right_columns=range(1, 7)
+        )
+        self.recent_model = RecordTableModel(
+            ["時刻", "処理", "所要(秒)", "行数", "使用メモリ(MB)", "最大メモリ(MB)", "親の処理", "詳細"],
+            right_columns=range(2, 6)
+        )
+
+        splitter = QSplitter(Qt.Vertical)
+        for model in (self.summary_model, self.recent_model):
+            table = QTableView()
+            table.setModel(model)
+            table.setAlternatingRowColors(True)
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+            table.horizontalHeader().setStretchLastSection(True)
+            splitter.addWidget(table)
+        splitter.setStretchFactor(1, 2)
+        layout.addWidget(splitter)
+
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton("更新")
+        refresh_button.clicked.connect(lambda: self.refresh(force=True))
+        clear_button = QPushButton("クリア")
+        clear_button.clicked.connect(self.clear)
+        self.open_folder_button = QPushButton("ログフォルダを開く")
+        self.open_folder_button.clicked.connect(self.open_log_folder)
+        close_button = QPushButton("閉じる")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(clear_button)
+        button_layout.addWidget(self.open_folder_button)
+        button_layout.addStretch()
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh(force=True)
+        self._timer.start()
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self, force=False):
+        """記録が増えた場合（forceの場合は常に）表示を作り直す"""
+        if PerfLog.log_path:
+            self.log_path_label.setText(f"ログファイル: {PerfLog.log_path}")
+        else:
+            self.log_path_label.setText("ログファイル: なし（記録はメモリにのみ保持しています）")
+        self.open_folder_button.setEnabled(bool(PerfLog.log_path))
+
+        entries = PerfLog.recent()
+        last = entries[-1] if entries else None
+        if not force and len(entries) == self._shown_count and last is self._shown_last:
+            return
+        self._shown_count = len(entries)
+        self._shown_last = last
+
+        self.summary_model.set_rows(self._summary_rows(entries))
+        self.recent_model.set_rows([self._recent_row(entry) for entry in reversed(entries)])
+
+    def clear(self):
+        PerfLog.clear_recent()
+        self.refresh(force=True)
+
+    def open_log_folder(self):
+        if PerfLog.log_path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(PerfLog.log_path)))
+
+    @staticmethod
+    def _number(value, digits=0):
+        if value is None:
+            return ""
+        return f"{value:,.{digits}f}"
+
+    def _summary_rows(self, entries):
+        """処理ごとの集計（合計所要時間の長い順）"""
+        totals = {}
+        for entry in entries:
+            total = totals.setdefault(entry["span"], {"count": 0, "seconds": 0.0, "max": 0.0, "rows": None,
+                                                      "peak_delta": None})
+            total["count"] += 1
+            total["seconds"] += entry["seconds"]
+            total["max"] = max(total["max"], entry["seconds"])
+            if isinstance(entry.get("rows"), int):
+                total["rows"] = max(total["rows"] or 0, entry["rows"])
+            if entry.get("peak_delta_mb") is not None:
+                total["peak_delta"] = max(total["peak_delta"] or 0.0, entry["peak_delta_mb"])
+
+        return [
+            [
+                name,
+                str(total["count"]),
+                self._number(total["seconds"], 3),
+                self._number(total["seconds"] / total["count"], 3),
+                self._number(total["max"], 3),
+                self._number(total["rows"]),
+                self._number(total["peak_delta"], 1)
+            ]
+            for name, total in sorted(totals.items(), key=lambda item: -item[1]["seconds"])
+        ]
+
+    def _recent_row(self, entry):
+        details = ", ".join(
+            f"{key}={value}" for key, value in entry.items()
+            if key not in self.BASE_FIELDS and value is not None
+        )
+        return [
+            entry["time"][11:],
+            entry["span"],
+            self._number(entry["seconds"], 3),
+            self._number(entry.get("rows")) if isinstance(entry.get("rows"), int) else "",
+            self._number(entry.get("rss_mb"), 1),
+            self._number(entry.get("peak_mb"), 1),
+            entry.get("parent") or "",
+            details
+        ]
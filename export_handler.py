@@ -3,17 +3,31 @@ from datetime import datetime
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
 from PyQt5.QtCore import QDate
 
-from excel_exporter import ExcelExporter
-from pdf_exporter import PDFExporter
+from perf_log import PerfLog
 
 class ExportHandler:
     def __init__(self, parent=None):
         self.parent = parent
-        self.excel_exporter = ExcelExporter()
-        self.pdf_exporter = PDFExporter()
+        # エクスポーターは最初に使うときに作成する（openpyxl・reportlabの読み込みとフォント登録で起動が遅くなるため）
+        self._excel_exporter = None
+        self._pdf_exporter = None
         # 最後に使用したエクスポート形式を記憶
         self.last_export_filter = "Excel ファイル (*.xlsx)"
     
+    @property
+    def excel_exporter(self):
+        if self._excel_exporter is None:
+            from excel_exporter import ExcelExporter
+            self._excel_exporter = ExcelExporter()
+        return self._excel_exporter
+    
+    @property
+    def pdf_exporter(self):
+        if self._pdf_exporter is None:
+            from pdf_exporter import PDFExporter
+            self._pdf_exporter = PDFExporter()
+        return self._pdf_exporter
+    
     def _format_date(self, date):
         """QDateをYYYY/MM/DD形式の文字列に変換"""
         if isinstance(date, QDate):
@@ -21,10 +35,9 @@ class ExportHandler:
         return str(date)
         
     
-    def export_data(self, data, shop_name, start_date, end_date, export_type=None):
+    def report_names(self, shop_name, start_date, end_date):
         """
-        データをエクスポートするメインメソッド
-        形式を選んでファイルに出力する
+        店舗名と日付範囲から帳票のタイトル・集計日の表記・既定のファイル名（拡張子なし）を作成する
         """
         # 開始日と終了日をフォーマット
         start_date_str = self._format_date(start_date)
@@ -44,6 +57,23 @@ class ExportHandler:
             report_title = "売上月計表"
             file_date_part = f"{safe_start_date}-{safe_end_date}"
         
+        return {
+            "shop_name": safe_shop_name,
+            "title": report_title,
+            "date_range": date_range_str,
+            "file_name": f"{safe_shop_name}_{report_title}_{file_date_part}"
+        }
+    
+    def export_data(self, data, shop_name, start_date, end_date, export_type=None):
+        """
+        データをエクスポートするメインメソッド
+        形式を選んでファイルに出力する
+        """
+        report = self.report_names(shop_name, start_date, end_date)
+        safe_shop_name = report["shop_name"]
+        report_title = report["title"]
+        date_range_str = report["date_range"]
+        
         # export_typeに基づいてデフォルトのフィルターを設定
         if export_type is not None:
             if export_type.lower() == "excel":
@@ -61,7 +91,7 @@ class ExportHandler:
         file_path, selected_filter = QFileDialog.getSaveFileName(
             self.parent,
             "エクスポート",
-            f"{safe_shop_name}_{report_title}_{file_date_part}",
+            report["file_name"],
             export_filter,
             self.last_export_filter
         )
@@ -76,10 +106,12 @@ class ExportHandler:
         if selected_filter == "Excel ファイル (*.xlsx)":
             if not file_path.endswith('.xlsx'):
                 file_path += '.xlsx'
-            return self.excel_exporter.export_to_excel(data, file_path, safe_shop_name, report_title, date_range_str, self.parent)
+            with PerfLog.span("export_excel"):
+                return self.excel_exporter.export_to_excel(data, file_path, safe_shop_name, report_title, date_range_str, self.parent)
         elif selected_filter == "PDF ファイル (*.pdf)":
             if not file_path.endswith('.pdf'):
                 file_path += '.pdf'
-            return self.pdf_exporter.export_to_pdf(data, file_path, safe_shop_name, report_title, date_range_str, self.parent)
+            with PerfLog.span("export_pdf"):
+                return self.pdf_exporter.export_to_pdf(data, file_path, safe_shop_name, report_title, date_range_str, self.parent)
         
         return False
\ No newline at end of file
@@ -0,0 +1,102 @@
+import os
+import time
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from data_handler import DataHandler
+
+
+class FolderWatcher(QObject):
+    """CSVフォルダを監視し、集計対象CSVの追加・更新・削除を通知する
+
+    QFileSystemWatcherでフォルダ（サブフォルダを含む）と、最近（RECENT_SECONDS 以内）更新された集計対象CSVを監視する
+    券売機が書き足すのはその日のCSVだけのため、過去のCSVは監視しない（履歴が増えても監視数は増えない）
+    新しいCSVはフォルダの変更（directoryChanged）で見つけて監視に加える
+    ポーリングはしないため、ファイルが変わらない間はCPUを使わない
+    券売機は書き込みを何回かに分けて行うため、最後の変更から DEBOUNCE_MS だけ
+    待ってから changed を1回だけ通知する
+    """
+
+    # 最後の変更から通知までの待ち時間（ミリ秒）
+    DEBOUNCE_MS = 2000
+    # この秒数より前に更新されたCSVは監視しない（日付をまたいで書き足される分を見込んで2日）
+    RECENT_SECONDS = 2 * 24 * 60 * 60
+
+    # 集計対象CSVが追加・更新・削除された
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.folder_path = None
+        self._csv_files = set()  # フォルダ内のすべての集計対象CSV
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self.changed.emit)
+
+    @property
+    def is_watching(self):
+        return self.folder_path is not None
+
+    def watch(self, folder_path):
+        """フォルダの監視を開始（監視中のフォルダは置き換える）"""
+        if self.folder_path != folder_path:
+            self.stop()
+            self.folder_path = folder_path
+        self.sync()
+
+    def stop(self):
+        """監視を停止"""
+        self._timer.stop()
+        paths = self._watcher.files() + self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+        self.folder_path = None
+        self._csv_files = set()
+
+    def sync(self):
+        """監視対象をフォルダの現在の内容に合わせ、集計対象CSVの一覧が変わった場合はTrueを返す
+
+        置き換えで作り直されたファイルは監視から外れるため、取込後にも呼び出す
+        RECENT_SECONDS より前に更新されたCSV・削除されたCSVは監視から外す
+        """
+        if self.folder_path is None:
+            return False
+
+        directories = []
+        for root, dirs, files in os.walk(self.folder_path):
+            directories.append(root)
+        csv_files = set(DataHandler.find_csv_files(self.folder_path))
+        recent_files = set()
+        threshold = time.time() - self.RECENT_SECONDS
+        for file_path in csv_files:
+            try:
+                if os.path.getmtime(file_path) >= threshold:
+                    recent_files.add(file_path)
+            except OSError:
+                continue
+
+        watched_files = set(self._watcher.files())
+        old_paths = sorted(watched_files - recent_files)
+        if old_paths:
+            self._watcher.removePaths(old_paths)
+        watched = watched_files | set(self._watcher.directories())
+        new_paths = [path for path in directories + sorted(recent_files) if path not in watched]
+        if new_paths:
+            self._watcher.addPaths(new_paths)
+
+        changed = csv_files != self._csv_files
+        self._csv_files = csv_files
+        return changed
+
+    def _on_directory_changed(self, path):
+        """フォルダ内のファイルが追加・削除された（集計対象CSV以外の変更は無視する）"""
+        if self.sync():
+            self._timer.start()
+
+    def _on_file_changed(self, path):
+        """監視中のCSVが更新された"""
+        if path in self._csv_files:
+            self._timer.start()
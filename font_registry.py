@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import threading
+from PyQt5.QtCore import QSettings
+
+from perf_log import PerfLog
+
+
+class FontRegistry:
+    """PDF出力に使う日本語フォントをプロセスで1回だけ登録するクラス
+
+    候補（CIDフォント → OSごとのTrueTypeフォント）を順に試し、登録できたフォントを設定（QSettings）に記録する
+    次回からは記録したフォントを最初に試すため、登録できない候補の読み込み
+    （TrueTypeコレクション(.ttc)は1つで数百ミリ秒かかる）を起動のたびに繰り返さない
+    記録したフォントファイルが更新・削除された場合は候補を順に試し直す
+
+    TrueTypeフォントは、reportlabがPDFで使用した文字だけをサブセットとして埋め込む
+    CIDフォント（HeiseiKakuGo-W5）は埋め込まず、閲覧側の日本語フォントで表示される
+    """
+
+    FALLBACK_FONT = "Helvetica"
+    SETTINGS_KEY = "pdf_font"
+
+    # 候補 (フォント名, 種類, パス, .ttc内のフォント番号)
+    CID_FONTS = [
+        ("HeiseiKakuGo-W5", "cid", None, 0)
+    ]
+    WINDOWS_FONTS = [
+        ("MS Gothic", "ttf", "C:/Windows/Fonts/msgothic.ttc", 0),
+        ("Yu Gothic", "ttf", "C:/Windows/Fonts/YuGothR.ttc", 0),
+        ("Meiryo", "ttf", "C:/Windows/Fonts/meiryo.ttc", 0)
+    ]
+    POSIX_FONTS = [
+        ("IPAGothic", "ttf", "/usr/share/fonts/truetype/ipafont-gothic/ipag.ttf", 0),
+        ("IPAGothic", "ttf", "/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf", 0),
+        ("Hiragino", "ttf", "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc", 0),
+        ("Hiragino", "ttf", "/Library/Fonts/ヒラギノ角ゴシック W3.ttc", 0)
+    ]
+
+    _lock = threading.Lock()
+    _font_name = None
+
+    @staticmethod
+    def candidates():
+        """このOSで試すフォントの候補（試す順）"""
+        if os.name == 'nt':
+            return FontRegistry.CID_FONTS + FontRegistry.WINDOWS_FONTS
+        if os.name == 'posix':
+            return FontRegistry.CID_FONTS + FontRegistry.POSIX_FONTS
+        return list(FontRegistry.CID_FONTS)
+
+    @staticmethod
+    def japanese_font(settings=None):
+        """登録済みの日本語フォント名を返す（最初の呼び出しで登録する、登録できない場合はHelvetica）
+
+        settings: 検索結果を記録するQSettings（省略時はアプリの設定）
+        """
+        with FontRegistry._lock:
+            if FontRegistry._font_name is None:
+                if settings is None:
+                    settings = QSettings("KBSeries", "SalesAnalysis")
+                FontRegistry._font_name = FontRegistry._register(settings)
+            return FontRegistry._font_name
+
+    @staticmethod
+    def _file_stamp(path):
+        """フォントファイルの (サイズ, 更新時刻)（ない場合はNone）"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_size, int(stat.st_mtime)]
+
+    @staticmethod
+    def _load_saved(settings):
+        """前回登録できたフォント（記録がない・ファイルが変わった場合はNone）"""
+        try:
+            saved = json.loads(settings.value(FontRegistry.SETTINGS_KEY, "") or "null")
+            candidate = (saved["name"], saved["kind"], saved["path"], int(saved["index"]))
+        except (ValueError, TypeError, KeyError):
+            return None
+        if candidate[1] == "ttf" and FontRegistry._file_stamp(candidate[2]) != saved.get("stamp"):
+            return None
+        return candidate
+
+    @staticmethod
+    def _save(settings, candidate):
+        name, kind, path, index = candidate
+        settings.setValue(FontRegistry.SETTINGS_KEY, json.dumps({
+            "name": name,
+            "kind": kind,
+            "path": path,
+            "index": index,
+            "stamp": FontRegistry._file_stamp(path) if kind == "ttf" else None
+        }, ensure_ascii=False))
+
+    @staticmethod
+    def _register_font(candidate):
+        """候補のフォントをreportlabに登録する（登録できない場合は例外）"""
+        from reportlab.pdfbase import pdfmetrics
+
+        name, kind, path, index = candidate
+        if kind == "cid":
+            from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+            pdfmetrics.registerFont(UnicodeCIDFont(name))
+        else:
+            from reportlab.pdfbase.ttfonts import TTFont
+            pdfmetrics.registerFont(TTFont(name, path, subfontIndex=index))
+
+    @staticmethod
+    def _register(settings):
+        """記録したフォント → 候補の順に登録を試し、登録できたフォント名を返す"""
+        with PerfLog.span("font_register") as span:
+            saved = FontRegistry._load_saved(settings)
+            candidates = FontRegistry.candidates()
+            if saved in candidates:
+                candidates = [saved] + [candidate for candidate in candidates if candidate != saved]
+            else:
+                saved = None
+
+            for candidate in candidates:
+                name, kind, path, _ = candidate
+                if kind == "ttf" and not os.path.exists(path):
+                    continue
+                start_time = time.perf_counter()
+                try:
+                    FontRegistry._register_font(candidate)
+                except Exception as e:
+                    print(f"{name} フォント登録エラー: {e}")
+                    continue
+
+                print(f"{name} フォントを登録しました ({time.perf_counter() - start_time:.2f}秒)")
+                if candidate != saved:
+                    FontRegistry._save(settings, candidate)
+                span.update(font=name, kind=kind, saved=(candidate == saved))
+                return name
+
+            print(f"日本語フォントが見つからないため {FontRegistry.FALLBACK_FONT} を使用します")
+            settings.remove(FontRegistry.SETTINGS_KEY)
+            span["font"] = FontRegistry.FALLBACK_FONT
+            return FontRegistry.FALLBACK_FONT
@@ -0,0 +1,163 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from PyQt5.QtCore import QSettings, QStandardPaths
+
+try:
+    import pyarrow  # noqa: F401
+    FRAME_FORMAT = "parquet"
+except ImportError:
+    FRAME_FORMAT = "pickle"
+
+
+def write_frame(df, file_path):
+    """DataFrameを列指向形式で保存（一時ファイル経由で置き換え）"""
+    tmp_path = f"{file_path}.tmp"
+    if FRAME_FORMAT == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+def read_frame(file_path, columns=None):
+    """write_frameで保存したDataFrameを読み込む"""
+    if FRAME_FORMAT == "parquet":
+        return pd.read_parquet(file_path, columns=columns)
+    df = pd.read_pickle(file_path)
+    return df[columns] if columns is not None else df
+
+
+class IngestCache:
+    """解析済みCSVを (パス, サイズ, 更新日時) をキーにキャッシュするクラス
+
+    一部の列だけを読み込んだデータは、読み込んだ列（usecols）が一致する場合だけ再利用する
+    """
+
+    CACHE_VERSION = 1
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, self.MANIFEST_NAME)
+        self.entries = {}
+        self._dirty = False
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_manifest()
+
+    @staticmethod
+    def default_cache_dir(settings=None):
+        """QSettingsの保存先と同じ場所にキャッシュディレクトリのパスを返す"""
+        if settings is None:
+            settings = QSettings("KBSeries", "SalesAnalysis")
+
+        if settings.format() == QSettings.NativeFormat and os.name == 'nt':
+            # Windowsではレジストリに保存されるため、ローカルアプリデータを使用
+            base_dir = os.path.join(
+                QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation),
+                settings.organizationName()
+            )
+        else:
+            base_dir = os.path.dirname(settings.fileName())
+
+        return os.path.join(base_dir, f"{settings.applicationName()}_cache")
+
+    def _load_manifest(self):
+        """マニフェストを読み込む（破損やバージョン違いの場合は空にする）"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.CACHE_VERSION and manifest.get("format") == FRAME_FORMAT:
+                self.entries = manifest.get("entries", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """変更があればマニフェストを書き出す"""
+        if not self._dirty:
+            return
+        manifest = {"version": self.CACHE_VERSION, "format": FRAME_FORMAT, "entries": self.entries}
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+        self._dirty = False
+
+    @staticmethod
+    def _file_key(file_path):
+        """ファイルのサイズと更新日時を取得"""
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _cache_file(self, file_path):
+        """CSVパスに対応するキャッシュファイル名"""
+        digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return f"{digest}.{FRAME_FORMAT}"
+
+    def contains(self, file_path, usecols=None):
+        """CSVに対応する有効なキャッシュがあるか（データは読み込まない）"""
+        entry = self.entries.get(os.path.abspath(file_path))
+        if entry is None or entry.get("usecols") != (list(usecols) if usecols is not None else None):
+            return False
+
+        try:
+            size, mtime = self._file_key(file_path)
+        except OSError:
+            return False
+
+        return entry["size"] == size and entry["mtime"] == mtime
+
+    def get(self, file_path, usecols=None):
+        """キャッシュが有効なら解析済みDataFrameを返す。無効ならNone"""
+        if not self.contains(file_path, usecols):
+            return None
+
+        key = os.path.abspath(file_path)
+        entry = self.entries[key]
+        try:
+            df = read_frame(os.path.join(self.cache_dir, entry["file"]))
+        except Exception as e:
+            print(f"キャッシュ読み込みエラー: {file_path}, エラー: {e}")
+            self.entries.pop(key, None)
+            self._dirty = True
+            return None
+
+        return df
+
+    def put(self, file_path, df, usecols=None, stat=None):
+        """解析済みDataFrameをキャッシュに保存（usecolsは読み込んだ列の一覧）
+
+        statには解析を始める前に取得したos.statの結果を渡す
+        （解析中にファイルが書き足された場合に、古い内容を新しいサイズ・更新日時で登録しないため）
+        """
+        key = os.path.abspath(file_path)
+        try:
+            if stat is None:
+                size, mtime = self._file_key(file_path)
+            else:
+                size, mtime = stat.st_size, stat.st_mtime_ns
+            cache_file = self._cache_file(file_path)
+            write_frame(df, os.path.join(self.cache_dir, cache_file))
+        except Exception as e:
+            print(f"キャッシュ書き込みエラー: {file_path}, エラー: {e}")
+            return
+
+        self.entries[key] = {"size": size, "mtime": mtime, "file": cache_file}
+        if usecols is not None:
+            self.entries[key]["usecols"] = list(usecols)
+        self._dirty = True
+
+    def prune(self, folder_path, seen_paths):
+        """フォルダ内で見つからなくなったCSVのキャッシュを削除"""
+        folder_key = os.path.join(os.path.abspath(folder_path), "")
+        seen_keys = {os.path.abspath(p) for p in seen_paths}
+
+        for key in list(self.entries):
+            if key.startswith(folder_key) and key not in seen_keys:
+                entry = self.entries.pop(key)
+                try:
+                    os.remove(os.path.join(self.cache_dir, entry["file"]))
+                except OSError:
+                    pass
+                self._dirty = True
@@ -1,7 +1,13 @@
 import sys
-import streamlit as st
+import time
+
+# 起動時間の計測開始（アプリの読み込みを含める）
+start_time = time.perf_counter()
+
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from app import SalesAnalysisApp
+from perf_log import PerfLog
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -40,4 +46,6 @@ if __name__ == "__main__":
 
     window = SalesAnalysisApp()
     window.show()
+    # イベントループが始まり、ウィンドウが表示された時点までを起動時間として記録する
+    QTimer.singleShot(0, lambda: PerfLog.record("startup", time.perf_counter() - start_time))
     sys.exit(app.exec_())
@@ -1,76 +1,32 @@
 import os
+import time
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QDate
 
-from reportlab.lib import colors
+from data_handler import DataHandler
+from sales_aggregator import SalesSummary, SLIP_CASH, SLIP_CASHLESS, SLIP_RED
+from perf_log import PerfLog
+
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 
 from pdf_footer import PDFFooterCanvas
+from pdf_paged_table import PagedTable, ROW_ITEM, ROW_LABEL, ROW_SUBTOTAL, ROW_TOTAL
+from font_registry import FontRegistry
 
 class PDFExporter:
     def __init__(self):
-        self.jp_font_registered = self._register_japanese_fonts()
-        
-    def _register_japanese_fonts(self):
-        """日本語フォントを登録する"""
-        try:
-            fonts_registered = False
-
-            try:
-                pdfmetrics.registerFont(UnicodeCIDFont('HeiseiKakuGo-W5'))
-                fonts_registered = True
-                print("HeiseiKakuGo-W5 フォントを登録しました")
-                return fonts_registered
-            except Exception as e:
-                print(f"HeiseiKakuGo-W5 フォント登録エラー: {e}")
-                
-            if os.name == 'nt':
-                windows_fonts = [
-                    ('MS Gothic', 'C:/Windows/Fonts/msgothic.ttc'),
-                    ('Yu Gothic', 'C:/Windows/Fonts/YuGothR.ttc'),
-                    ('Meiryo', 'C:/Windows/Fonts/meiryo.ttc')
-                ]
-                for font_name, font_path in windows_fonts:
-                    try:
-                        if os.path.exists(font_path):
-                            pdfmetrics.registerFont(TTFont(font_name, font_path))
-                            fonts_registered = True
-                            print(f"{font_name} フォントを登録しました")
-                            break
-                    except Exception as font_e:
-                        print(f"{font_name} フォント登録エラー: {font_e}")
-            elif os.name == 'posix':
-                font_paths = [
-                    ('/usr/share/fonts/truetype/ipafont-gothic/ipag.ttf', 'IPAGothic'),
-                    ('/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf', 'IPAGothic'),
-                    ('/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc', 'Hiragino'),
-                    ('/Library/Fonts/ヒラギノ角ゴシック W3.ttc', 'Hiragino')
-                ]
-                for path, name in font_paths:
-                    if os.path.exists(path):
-                        try:
-                            pdfmetrics.registerFont(TTFont(name, path))
-                            fonts_registered = True
-                            print(f"{name} フォントを登録しました")
-                            break
-                        except Exception as font_e:
-                            print(f"{name} フォント登録エラー: {font_e}")
-            
-            return fonts_registered
-        except Exception as e:
-            print(f"フォント登録処理全体エラー: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        pass
+    
+    @property
+    def font_name(self):
+        """帳票に使う日本語フォント名（最初のPDF出力時にプロセスで1回だけ登録する）"""
+        return FontRegistry.japanese_font()
     
     def _format_date(self, date):
         """QDateをYYYY/MM/DD形式の文字列に変換"""
@@ -95,7 +51,10 @@ class PDFExporter:
             return str(menu_num)
     
     def export_to_pdf(self, data, file_path, shop_name, title, date_str, parent=None):
-        """データをPDFファイルにエクスポート（日本語対応版）"""
+        """データをPDFファイルにエクスポート（日本語対応版）
+        
+        file_pathにはファイルのパスのほか、書き込み可能なバイナリのファイルオブジェクト（BytesIOなど）も指定できる
+        """
         try:
             if data is None or len(data) == 0:
                 print("エクスポートするデータがありません")
@@ -106,31 +65,22 @@ class PDFExporter:
             if isinstance(title, QDate):
                 title = self._format_date(title)
             
-            try:
-                data_copy = data.copy()
-            except:
-                try:
-                    data_copy = pd.DataFrame(data)
-                except:
-                    print("データをDataFrameに変換できません")
-                    if parent:
-                        QMessageBox.warning(parent, "エラー", "データ形式が不正です")
-                    return False
-            
-            column_mapping = {
-                'T': '集計Ｇ名称',
-                'Q': '商品コード',
-                'R': '論理口座名称',
-                'J': '枚数',
-                'L': '金額',
-                'K': '金額符号',
-                'M': 'カード減算額'
-            }
-            
-            for col_letter, col_name in column_mapping.items():
-                if col_name not in data_copy.columns:
-                    print(f"警告: 列 '{col_name}' がデータに存在しません")
-                    
+            # 集計済みのSalesSummaryはそのまま使い、明細が渡された場合はここで集計する
+            if isinstance(data, SalesSummary):
+                summary = data
+            else:
+                if not isinstance(data, pd.DataFrame):
+                    try:
+                        data = pd.DataFrame(data)
+                    except:
+                        print("データをDataFrameに変換できません")
+                        if parent:
+                            QMessageBox.warning(parent, "エラー", "データ形式が不正です")
+                        return False
+                summary = DataHandler.create_summary(data, DataHandler.COLUMN_INDICES)
+            
+            # 表の作成とPDFの描画に分けて所要時間を記録する
+            build_start = time.perf_counter()
             doc = SimpleDocTemplate(
                 file_path,
                 pagesize=landscape(A4),
@@ -142,7 +92,7 @@ class PDFExporter:
             styles = getSampleStyleSheet()
             elements = []
             
-            jp_font_name = 'HeiseiKakuGo-W5' if self.jp_font_registered else 'Helvetica'
+            jp_font_name = self.font_name
             
             title_style = ParagraphStyle(
                 'TitleJP',
@@ -180,85 +130,76 @@ class PDFExporter:
             
             table_header = ['グループ名', 'メニュー番号', 'メニュー名', '数量', '金額']
             
-            amount_sign_col = '金額符号' if '金額符号' in data_copy.columns else 'K'
-            card_deduction_col = 'カード減算額' if 'カード減算額' in data_copy.columns else 'M'
-
-            normal_data = data_copy[
-                (data_copy[amount_sign_col] == '0') & 
-                (data_copy[card_deduction_col] == '0')
-            ].copy() if amount_sign_col in data_copy.columns and card_deduction_col in data_copy.columns else pd.DataFrame(columns=data_copy.columns)
-
-            red_data = data_copy[
-                (data_copy[amount_sign_col] == '1')
-            ].copy() if amount_sign_col in data_copy.columns else pd.DataFrame(columns=data_copy.columns)
-
-            cashless_data = data_copy[
-                (data_copy[amount_sign_col] == '0') & 
-                (data_copy[card_deduction_col] != '0')
-            ].copy() if amount_sign_col in data_copy.columns and card_deduction_col in data_copy.columns else pd.DataFrame(columns=data_copy.columns)
-            
             from reportlab.platypus import CondPageBreak
             
             elements.append(Paragraph("【現金売上】", normal_style))
             elements.append(Spacer(1, 5*mm))
-            normal_table_data = [table_header]
+            normal_table_data = []
+            normal_row_kinds = []
             normal_total = {'数量': 0, '金額': 0}
-            self._add_group_data_to_table(normal_data, normal_table_data, normal_total)
+            self._add_group_data_to_table(summary.menu_items(SLIP_CASH), normal_table_data, normal_row_kinds, normal_total)
             
-            if len(normal_table_data) == 1:
+            if not normal_table_data:
                 normal_table_data.append(['データなし', '', '', '', ''])
+                normal_row_kinds.append(ROW_LABEL)
             
             normal_table_data.append([
                 '現金売上 計', '', '',
                 f"{normal_total['数量']:,}", f"{normal_total['金額']:,}"
             ])
+            normal_row_kinds.append(ROW_TOTAL)
             
-            normal_table = self._create_table(normal_table_data)
+            normal_table = self._create_table(table_header, normal_table_data, normal_row_kinds)
             elements.append(normal_table)
             elements.append(Spacer(1, 10*mm))
             
             elements.append(PageBreak()) 
             elements.append(Paragraph("【キャッシュレス決済】", normal_style))
             elements.append(Spacer(1, 5*mm))
-            cashless_table_data = [table_header]
+            cashless_table_data = []
+            cashless_row_kinds = []
             cashless_total = {'数量': 0, '金額': 0}
-            self._add_group_data_to_table(cashless_data, cashless_table_data, cashless_total)
+            self._add_group_data_to_table(summary.menu_items(SLIP_CASHLESS), cashless_table_data, cashless_row_kinds, cashless_total)
             
-            if len(cashless_table_data) == 1:
+            if not cashless_table_data:
                 cashless_table_data.append(['データなし', '', '', '', ''])
+                cashless_row_kinds.append(ROW_LABEL)
             
             cashless_table_data.append([
                 'キャッシュレス決済 計', '', '',
                 f"{cashless_total['数量']:,}", f"{cashless_total['金額']:,}"
             ])
+            cashless_row_kinds.append(ROW_TOTAL)
             
-            cashless_table = self._create_table(cashless_table_data)
+            cashless_table = self._create_table(table_header, cashless_table_data, cashless_row_kinds)
             elements.append(cashless_table)
             elements.append(Spacer(1, 10*mm))
             
             elements.append(PageBreak()) 
             elements.append(Paragraph("【赤伝】", normal_style))
             elements.append(Spacer(1, 5*mm))
-            red_table_data = [table_header]
+            red_table_data = []
+            red_row_kinds = []
             red_total = {'数量': 0, '金額': 0}
-            self._add_group_data_to_table(red_data, red_table_data, red_total, is_red_slip=True)
+            self._add_group_data_to_table(summary.menu_items(SLIP_RED), red_table_data, red_row_kinds, red_total, is_red_slip=True)
             
-            if len(red_table_data) == 1:
+            if not red_table_data:
                 red_table_data.append(['データなし', '', '', '', ''])
+                red_row_kinds.append(ROW_LABEL)
             
             red_table_data.append([
                 '赤伝 計', '', '',
                 f"{red_total['数量']:,}", f"{red_total['金額']:,}"
             ])
+            red_row_kinds.append(ROW_TOTAL)
             
-            red_table = self._create_table(red_table_data)
+            red_table = self._create_table(table_header, red_table_data, red_row_kinds)
             elements.append(red_table)
             elements.append(Spacer(1, 10*mm))
             
             elements.append(Paragraph("【総計】", normal_style))
             elements.append(Spacer(1, 5*mm))
             total_table_data = [
-                table_header,
                 [
                     '総計(現金･キャッシュレス)', '', '',
                     f"{normal_total['数量'] + cashless_total['数量']:,}",
@@ -266,11 +207,15 @@ class PDFExporter:
                 ]
             ]
             
-            total_table = self._create_table(total_table_data)
+            total_table = self._create_table(table_header, total_table_data, [ROW_TOTAL])
             elements.append(total_table)
             
-            footer = PDFFooterCanvas()
-            doc.build(elements, onFirstPage=footer, onLaterPages=footer)
+            PerfLog.record("pdf_tables", time.perf_counter() - build_start, rows=len(summary))
+            
+            footer = PDFFooterCanvas(font_name=jp_font_name)
+            with PerfLog.span("pdf_render", file=os.path.basename(file_path) if isinstance(file_path, str) else None) as span:
+                doc.build(elements, onFirstPage=footer, onLaterPages=footer)
+                span["pages"] = doc.page
             
             return True
                 
@@ -282,93 +227,64 @@ class PDFExporter:
                 QMessageBox.critical(parent, "エラー", f"PDF出力に失敗しました:\n{str(e)}")
             return False
 
-    def _add_group_data_to_table(self, data, table_data, total_accumulator, is_red_slip=False):
-        """メニュー名ごとにデータを集計してテーブルに追加する"""
-        if data.empty:
-            return
-        
-        group_name_column = '集計Ｇ名称' if '集計Ｇ名称' in data.columns else 'T'
-        menu_number_column = '商品コード' if '商品コード' in data.columns else 'Q'
-        menu_name_column = '論理口座名称' if '論理口座名称' in data.columns else 'R'
-        quantity_column = '枚数' if '枚数' in data.columns else 'J'
-        amount_column = '金額' if '金額' in data.columns else 'L'
+    def _format_menu_numbers(self, menu_nums):
+        """メニュー番号の列をまとめて変換する（変換はメニュー番号の種類ごとに1回）"""
+        menu_nums = pd.Categorical(menu_nums)
+        formatted = np.array(
+            [self._format_menu_number(menu_num) for menu_num in menu_nums.categories] + [self._format_menu_number(np.nan)],
+            dtype=object
+        )
+        return formatted[menu_nums.codes].tolist()
+
+    def _add_group_data_to_table(self, menu_items, table_data, row_kinds, total_accumulator, is_red_slip=False):
+        """メニューごとの集計結果（SalesSummary.menu_items）をグループ小計付きでテーブルに追加する
         
-        menu_summary = {}
+        menu_itemsはグループ名・メニュー番号順に並んでいるため、グループの境界で区切って
+        グループ名の行・メニュー行・小計行を組み立てる（row_kindsには各行の種類を追加する）
+        """
+        if menu_items.empty:
+            return
         
-        for _, row in data.iterrows():
-            group_name = str(row.get(group_name_column, "")).strip()
-            if not group_name:
-                group_name = "その他"
-                
-            menu_num = row.get(menu_number_column, "")
-            menu_name = row.get(menu_name_column, "")
-            
-            menu_key = (group_name, menu_num, menu_name)
-            
-            try:
-                quantity = int(row.get(quantity_column, 0))
-            except (ValueError, TypeError):
-                quantity = 0
-                
-            try:
-                amount = int(row.get(amount_column, 0))
-            except (ValueError, TypeError):
-                amount = 0
-            
-            if is_red_slip:
-                quantity = -quantity
-                amount = -amount
-            
-            if menu_key in menu_summary:
-                menu_summary[menu_key]['quantity'] += quantity
-                menu_summary[menu_key]['amount'] += amount
-            else:
-                menu_summary[menu_key] = {
-                    'quantity': quantity,
-                    'amount': amount
-                }
+        sign = -1 if is_red_slip else 1
+        quantities = menu_items["count"].to_numpy(dtype=np.int64) * sign
+        amounts = menu_items["amount"].to_numpy(dtype=np.int64) * sign
+        group_labels = menu_items["group_label"].to_numpy(dtype=object)
         
-        current_group = None
-        group_subtotal = {'数量': 0, '金額': 0}
+        # メニュー行（数値の書式化は列単位でまとめて行う）
+        item_rows = [
+            ['', menu_num, menu_name, quantity, amount]
+            for menu_num, menu_name, quantity, amount in zip(
+                self._format_menu_numbers(menu_items["product_code"]),
+                menu_items["product_name"].tolist(),
+                map('{:,}'.format, quantities.tolist()),
+                map('{:,}'.format, amounts.tolist())
+            )
+        ]
         
-        sorted_keys = sorted(menu_summary.keys(), key=lambda x: (x[0], x[1]))
+        # グループの開始位置とグループごとの小計
+        starts = np.flatnonzero(np.r_[True, group_labels[1:] != group_labels[:-1]])
+        ends = np.r_[starts[1:], len(group_labels)]
+        subtotal_quantities = np.add.reduceat(quantities, starts).tolist()
+        subtotal_amounts = np.add.reduceat(amounts, starts).tolist()
         
-        for key in sorted_keys:
-            group_name, menu_num, menu_name = key
-            summary = menu_summary[key]
-            
-            if current_group != group_name:
-                if current_group is not None:
-                    table_data.append([
-                        f"{current_group} 計", '', '',
-                        f"{group_subtotal['数量']:,}", f"{group_subtotal['金額']:,}"
-                    ])
-                    group_subtotal = {'数量': 0, '金額': 0}
-                
-                current_group = group_name
-                table_data.append([group_name, '', '', '', ''])
-            
-            quantity = summary['quantity']
-            amount = summary['amount']
-            
+        for start, end, subtotal_quantity, subtotal_amount in zip(
+                starts.tolist(), ends.tolist(), subtotal_quantities, subtotal_amounts):
+            group_name = group_labels[start]
+            table_data.append([group_name, '', '', '', ''])
+            table_data.extend(item_rows[start:end])
             table_data.append([
-                '', self._format_menu_number(menu_num), menu_name,
-                f"{quantity:,}", f"{amount:,}"
+                f"{group_name} 計", '', '',
+                f"{subtotal_quantity:,}", f"{subtotal_amount:,}"
             ])
-            
-            group_subtotal['数量'] += quantity
-            group_subtotal['金額'] += amount
-            total_accumulator['数量'] += quantity
-            total_accumulator['金額'] += amount
+            row_kinds.append(ROW_LABEL)
+            row_kinds.extend([ROW_ITEM] * (end - start))
+            row_kinds.append(ROW_SUBTOTAL)
         
-        if current_group:
-            table_data.append([
-                f"{current_group} 計", '', '',
-                f"{group_subtotal['数量']:,}", f"{group_subtotal['金額']:,}"
-            ])
+        total_accumulator['数量'] += int(quantities.sum())
+        total_accumulator['金額'] += int(amounts.sum())
     
-    def _create_table(self, table_data):
-        """スタイル付きのテーブルを作成"""
+    def _create_table(self, table_header, table_data, row_kinds):
+        """スタイル付きのテーブルを作成（ページに収まる行数ごとに分けて描画する）"""
         available_width = 257*mm
         
         col_widths = [
@@ -379,56 +295,4 @@ class PDFExporter:
             available_width * 0.15
         ]
         
-        row_heights = [16]
-        for i in range(1, len(table_data)):
-            row_heights.append(12)
-        
-        table = Table(table_data, colWidths=col_widths, rowHeights=row_heights, repeatRows=1)
-        
-        jp_font_name = 'HeiseiKakuGo-W5' if self.jp_font_registered else 'Helvetica'
-        
-        table_style = TableStyle([           
-            ('LINEABOVE', (1,2), (-1,-2), 0.3, colors.black),
-
-            ('TOPPADDING', (0,0), (-1,0), -5),
-            ('BOTTOMPADDING', (0,0), (-1,0), 5),
-            ('LEFTPADDING', (0,0), (-1,-1), 5),
-            ('RIGHTPADDING', (0,0), (-1,-1), 5),
-            
-            ('BACKGROUND', (0,0), (-1,0), colors.white),
-            ('FONT', (0,0), (-1,-1), jp_font_name, 9),
-            ('FONT', (0,0), (-1,0), jp_font_name, 10, True),
-            ('ALIGNMENT', (0,0), (-1,0), 'CENTER'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-
-            ('LINEABOVE', (0,0), (-1,0), 0.8, colors.black),
-            ('LINEBELOW', (0,0), (-1,0), 0.8, colors.black),
-
-            ('ALIGNMENT', (3,1), (4,-1), 'RIGHT'),
-        ])
-        
-        for i, row in enumerate(table_data):
-            if i > 0:
-                if len(str(row[0])) > 0 and all(str(cell).strip() == '' for cell in row[1:]):
-                    table_style.add('FONT', (0,i), (0,i), jp_font_name, 10, True)
-                    table_style.add('ALIGNMENT', (0,i), (0,i), 'LEFT')
-                    table_style.add('VALIGN', (0,i), (0,i), 'MIDDLE')  
-                    table_style.add('TOPPADDING', (0,i), (0,i), -8)
-                    table_style.add('BOTTOMPADDING', (0,i), (0,i), 3)
-
-                elif '計' in str(row[0]):
-                    if '総計' in str(row[0]) or '現金売上 計' in str(row[0]) or '赤伝 計' in str(row[0]) or 'キャッシュレス決済 計' in str(row[0]):
-                        table_style.add('BACKGROUND', (0,i), (-1,i), colors.lightgrey)
-                        table_style.add('FONT', (0,i), (-1,i), jp_font_name, 9, True)
-                        table_style.add('VALIGN', (0,i), (-1,i), 'MIDDLE')
-                        table_style.add('TOPPADDING', (0,i), (-1,i), -8)
-                        table_style.add('BOTTOMPADDING', (0,i), (-1,i), 3)
-                    else:
-                        table_style.add('FONT', (0,i), (-1,i), jp_font_name, 9, True)
-                        table_style.add('VALIGN', (0,i), (-1,i), 'MIDDLE')
-                        table_style.add('TOPPADDING', (0,i), (-1,i), -8)
-                        table_style.add('BOTTOMPADDING', (0,i), (-1,i), 3)
-                        table_style.add('LINEBELOW', (0,i), (-1,i), 0.8, colors.black)
-
-        table.setStyle(table_style)
-        return table
\ No newline at end of file
+        return PagedTable(table_header, table_data, row_kinds, col_widths, self.font_name)
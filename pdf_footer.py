@@ -3,16 +3,20 @@ from datetime import datetime
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 
+from font_registry import FontRegistry
+
 class PDFFooterCanvas:
     """
     PDFのフッターを描画するクラス
     """
-    def __init__(self, total_pages=None):
+    def __init__(self, total_pages=None, font_name=None):
         """
         初期化
         total_pages: PDFの総ページ数（指定した場合は「n/total」形式で表示）
+        font_name: フッターのフォント（省略時は FontRegistry で登録した日本語フォント）
         """
         self.total_pages = total_pages
+        self.font_name = font_name
     
     def __call__(self, canvas, doc):
         """
@@ -22,7 +26,7 @@ class PDFFooterCanvas:
         
         # フォント設定
         try:
-            font_name = 'HeiseiKakuGo-W5'  # 日本語フォント
+            font_name = self.font_name or FontRegistry.japanese_font()  # 日本語フォント
             canvas.setFont(font_name, 8)
         except:
             # フォントが使用できない場合はデフォルトフォントを使用
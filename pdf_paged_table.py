@@ -0,0 +1,140 @@
+# pdf_paged_table.py
+from itertools import groupby
+
+from reportlab.lib import colors
+from reportlab.platypus import Flowable, Table, TableStyle
+
+# 行の種類
+ROW_ITEM = 0  # メニュー行
+ROW_LABEL = 1  # グループ名の行・「データなし」の行
+ROW_SUBTOTAL = 2  # グループの小計行
+ROW_TOTAL = 3  # 伝票種別の合計行・総計行
+
+
+class PagedTable(Flowable):
+    """
+    1ページに収まる行数ごとに小さな表（Table）に分けて描画する表
+
+    reportlabのTableは大きな表をページごとに分割するたびに残りの行とスタイルをすべて作り直すため、
+    行数が多い（年間の月計表など）と行数の2乗に近い時間がかかる
+    この表は行の高さが一定であることを利用して、ページの残りの高さに収まる行数だけのTableを作り、
+    残りの行は同じリストの位置だけを持つ PagedTable として次のページに回す
+    ヘッダーは各ページの表の先頭に付け、行の書式は行の種類（ROW_*）ごとに連続する範囲にまとめて指定する
+    """
+    HEADER_HEIGHT = 16
+    ROW_HEIGHT = 12
+
+    def __init__(self, header, rows, kinds, col_widths, font_name, start=0):
+        """
+        初期化
+        header: ヘッダー行
+        rows: データ行（ヘッダーを除く）
+        kinds: 各データ行の種類（ROW_*）
+        col_widths: 列幅
+        font_name: フォント名
+        start: このページ以降に描画する最初のデータ行（分割後の残りの表で使う）
+        """
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.kinds = kinds
+        self.col_widths = col_widths
+        self.font_name = font_name
+        self.start = start
+        self.hAlign = 'CENTER'
+        self.width = sum(col_widths)
+        self.height = self._height(len(rows) - start)
+        self._table = None
+
+    def _height(self, row_count):
+        return self.HEADER_HEIGHT + self.ROW_HEIGHT * row_count
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        """ページの残りの高さに収まる行数の表と、残りの行の表に分ける（1行も入らない場合は次のページへ）"""
+        row_count = int((availHeight - self.HEADER_HEIGHT) // self.ROW_HEIGHT)
+        if row_count <= 0:
+            return []
+        end = self.start + row_count
+        if end >= len(self.rows):
+            return [self]
+        return [
+            self.page_table(self.start, end),
+            PagedTable(self.header, self.rows, self.kinds, self.col_widths, self.font_name, start=end)
+        ]
+
+    def draw(self):
+        if self._table is None:
+            self._table = self.page_table(self.start, len(self.rows))
+            self._table.wrapOn(self.canv, self.width, self.height)
+        self._table.drawOn(self.canv, 0, 0)
+
+    def page_table(self, begin, end):
+        """データ行 begin～end-1 にヘッダーを付けた表を作成"""
+        data = [self.header] + self.rows[begin:end]
+        row_heights = [self.HEADER_HEIGHT] + [self.ROW_HEIGHT] * (end - begin)
+        table = Table(data, colWidths=self.col_widths, rowHeights=row_heights, repeatRows=1)
+        table.setStyle(TableStyle(self._style_commands(begin, end)))
+        return table
+
+    def _style_commands(self, begin, end):
+        """データ行 begin～end-1 の表の書式（表の行番号はヘッダーが0、データ行は1から）"""
+        font_name = self.font_name
+        commands = []
+
+        # 区切りの細線（先頭のデータ行の上と合計行の上には引かない）
+        line_begin = max(begin, 1)
+        line_end = min(end - 1, len(self.rows) - 2)
+        if line_begin <= line_end:
+            commands.append(('LINEABOVE', (1, line_begin - begin + 1), (-1, line_end - begin + 1), 0.3, colors.black))
+        # 次のページの先頭行の上の細線は、このページの最終行の下にも引く（Tableの分割と同じ）
+        if 1 <= end <= len(self.rows) - 2:
+            commands.append(('LINEBELOW', (1, end - begin), (-1, end - begin), 0.3, colors.black))
+
+        commands += [
+            ('TOPPADDING', (0,0), (-1,0), -5),
+            ('BOTTOMPADDING', (0,0), (-1,0), 5),
+            ('LEFTPADDING', (0,0), (-1,-1), 5),
+            ('RIGHTPADDING', (0,0), (-1,-1), 5),
+
+            ('BACKGROUND', (0,0), (-1,0), colors.white),
+            ('FONT', (0,0), (-1,-1), font_name, 9),
+            ('FONT', (0,0), (-1,0), font_name, 10, True),
+            ('ALIGNMENT', (0,0), (-1,0), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+
+            ('LINEABOVE', (0,0), (-1,0), 0.8, colors.black),
+            ('LINEBELOW', (0,0), (-1,0), 0.8, colors.black),
+
+            ('ALIGNMENT', (3,1), (4,-1), 'RIGHT'),
+        ]
+
+        # 同じ種類の行が続く範囲ごとに書式を指定する
+        position = 1
+        for kind, run in groupby(self.kinds[begin:end]):
+            count = sum(1 for _ in run)
+            first, last = position, position + count - 1
+            position += count
+            if kind == ROW_LABEL:
+                commands += [
+                    ('FONT', (0,first), (0,last), font_name, 10, True),
+                    ('TOPPADDING', (0,first), (0,last), -8),
+                    ('BOTTOMPADDING', (0,first), (0,last), 3),
+                ]
+            elif kind == ROW_SUBTOTAL:
+                commands += [
+                    ('FONT', (0,first), (-1,last), font_name, 9, True),
+                    ('TOPPADDING', (0,first), (-1,last), -8),
+                    ('BOTTOMPADDING', (0,first), (-1,last), 3),
+                    ('LINEBELOW', (0,first), (-1,last), 0.8, colors.black),
+                ]
+            elif kind == ROW_TOTAL:
+                commands += [
+                    ('BACKGROUND', (0,first), (-1,last), colors.lightgrey),
+                    ('FONT', (0,first), (-1,last), font_name, 9, True),
+                    ('TOPPADDING', (0,first), (-1,last), -8),
+                    ('BOTTOMPADDING', (0,first), (-1,last), 3),
+                ]
+        return commands
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def memory_usage():
+    """プロセスの (現在の使用メモリ, これまでの最大使用メモリ) をバイト数で返す（取得できない場合はNone）"""
+    if os.name == 'nt':
+        return _windows_memory_usage()
+
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss はLinuxではKB、macOSではバイト
+        if sys.platform != 'darwin':
+            peak *= 1024
+
+    rss = None
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    return rss, peak
+
+
+def _windows_memory_usage():
+    """WindowsのワーキングセットとピークワーキングセットをGetProcessMemoryInfoで取得"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None, None
+        return counters.WorkingSetSize, counters.PeakWorkingSetSize
+    except Exception:
+        return None, None
+
+
+def _megabytes(value):
+    return round(value / 1024 / 1024, 1) if value is not None else None
+
+
+class PerfLog:
+    """処理時間の計測（スパン）を記録するクラス
+
+    span() で囲んだ処理の所要時間・行数・メモリ使用量を1件の記録として残す
+    記録は直近 RECENT_LIMIT 件をメモリに保持し（診断パネルで表示）、configure() で
+    ログフォルダを指定した場合はJSON Lines形式のファイルにも書き出す
+    （MAX_BYTES を超えるとローテーションし、BACKUP_COUNT 世代まで残す）
+
+    メモリは計測できる範囲でプロセス全体の値を記録する
+        rss_mb: 処理終了時の使用メモリ
+        peak_mb: 処理終了時点までの最大使用メモリ
+        peak_delta_mb: その処理の間に最大使用メモリが増えた量（その処理が最大値を更新した分）
+    """
+
+    LOG_DIR_NAME = "logs"
+    LOG_NAME = "perf.jsonl"
+    MAX_BYTES = 1024 * 1024
+    BACKUP_COUNT = 5
+    RECENT_LIMIT = 1000
+
+    _lock = threading.Lock()
+    _recent = deque(maxlen=RECENT_LIMIT)
+    _local = threading.local()
+    _logger = None
+    log_path = None
+
+    @staticmethod
+    def default_log_dir(cache_dir):
+        """キャッシュディレクトリ（IngestCache.default_cache_dir）配下のログフォルダ"""
+        return os.path.join(cache_dir, PerfLog.LOG_DIR_NAME)
+
+    @staticmethod
+    def configure(log_dir, max_bytes=None, backup_count=None):
+        """ログフォルダを指定してファイルへの書き出しを開始し、ログファイルのパスを返す"""
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, PerfLog.LOG_NAME)
+
+        logger = logging.getLogger("kb_app.perf")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+        handler = RotatingFileHandler(
+            log_path,
+            maxBytes=max_bytes or PerfLog.MAX_BYTES,
+            backupCount=backup_count or PerfLog.BACKUP_COUNT,
+            encoding='utf-8',
+            delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+
+        PerfLog._logger = logger
+        PerfLog.log_path = log_path
+        return log_path
+
+    @staticmethod
+    @contextmanager
+    def span(name, **fields):
+        """with文で囲んだ処理の所要時間を記録する
+
+        with PerfLog.span("create_summary", rows=len(data)) as info:
+            ...
+            info["products"] = len(summary.product_summary)
+
+        infoに設定した値は記録に追加される（処理中に例外が発生した場合は error に例外名を記録する）
+        """
+        stack = PerfLog._stack()
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        info = dict(fields)
+        _, peak_before = memory_usage()
+        start_time = time.perf_counter()
+        try:
+            yield info
+        except BaseException as e:
+            info["error"] = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start_time
+            stack.pop()
+            PerfLog._write(name, elapsed, parent, info, peak_before)
+
+    @staticmethod
+    def record(name, seconds, **fields):
+        """別の場所（並列読み込みのワーカーなど）で計測した所要時間を記録する"""
+        stack = PerfLog._stack()
+        PerfLog._write(name, seconds, stack[-1] if stack else None, fields)
+
+    @staticmethod
+    def recent():
+        """メモリに保持している記録の一覧（古い順）"""
+        with PerfLog._lock:
+            return list(PerfLog._recent)
+
+    @staticmethod
+    def clear_recent():
+        """メモリに保持している記録を消去（ログファイルはそのまま）"""
+        with PerfLog._lock:
+            PerfLog._recent.clear()
+
+    @staticmethod
+    def _stack():
+        """スレッドごとの実行中のスパン名（親子関係の記録に使う）"""
+        stack = getattr(PerfLog._local, "stack", None)
+        if stack is None:
+            stack = PerfLog._local.stack = []
+        return stack
+
+    @staticmethod
+    def _write(name, seconds, parent, fields, peak_before=None):
+        rss, peak = memory_usage()
+        entry = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "span": name,
+            "seconds": round(seconds, 6),
+            "parent": parent,
+            "thread": threading.current_thread().name,
+            "pid": os.getpid(),
+            "rss_mb": _megabytes(rss),
+            "peak_mb": _megabytes(peak),
+            "peak_delta_mb": _megabytes(peak - peak_before) if peak is not None and peak_before is not None else None
+        }
+        entry.update(fields)
+
+        with PerfLog._lock:
+            PerfLog._recent.append(entry)
+            logger = PerfLog._logger
+        if logger is not None:
+            try:
+                logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+            except Exception as e:
+                print(f"性能ログの書き込みエラー: {e}")
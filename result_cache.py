@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """集計結果を保持するLRUキャッシュ
+
+    件数（max_entries）と推定メモリ量（max_bytes）の両方で上限を設け、
+    超えた場合は最後に使われてから最も時間が経ったものから捨てる
+    保持した値は呼び出し側で共有するため、取り出した値は変更しないこと
+    """
+
+    def __init__(self, max_entries=32, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # キー -> (値, 推定バイト数)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """キーに対応する値を返す（ない場合はNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=0):
+        """値を追加する（sizeは値の推定バイト数、上限を超える値は保持しない）"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def discard(self, key):
+        """キーに対応する値を捨てる（ない場合は何もしない）"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+
+    def clear(self):
+        """すべての値を捨てる"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
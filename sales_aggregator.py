@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+
+# 伝票種別
+SLIP_CASH = "現金売上"
+SLIP_CASHLESS = "キャッシュレス決済"
+SLIP_RED = "赤伝"
+SLIP_OTHER = "その他"  # 金額符号が0/1以外の行
+SLIP_TYPES = (SLIP_CASH, SLIP_CASHLESS, SLIP_RED, SLIP_OTHER)
+
+# 集計キーと集計値の列
+BASE_KEYS = ["slip", "group_num", "group_name", "product_code", "product_name"]
+BASE_VALUES = ["count", "amount", "card_amount"]
+
+
+class SalesSummary:
+    """伝票種別 × 集計グループ × 商品 の集計結果
+
+    base は1回のgroupbyで作成した集計表で、商品別・グループ別・伝票別の各表示と
+    PDF/Excelの明細はすべてここから作成する
+    伝票種別ごとの集計は一度作成したものを保持する（返したDataFrameは変更しないこと）
+    """
+
+    def __init__(self, base, row_count):
+        self.base = base
+        self.row_count = row_count
+        self._slip_products = {}
+        self._menu_items = {}
+
+        valid = base[base["slip"] != SLIP_RED]
+        self.product_summary = self._sum_by(valid, ["product_code", "product_name"])
+        self.group_summary = self._sum_by(valid, ["group_num", "group_name"])
+
+        cashless = base[base["slip"] == SLIP_CASHLESS]
+        self.total_count = int(valid["count"].sum())
+        self.total_amount = int(valid["amount"].sum())
+        self.cashless_count = int(cashless["count"].sum())
+        self.cashless_amount = int(cashless["card_amount"].sum())
+
+        self.slip_totals = {
+            slip: {
+                '数量': int(base.loc[base["slip"] == slip, "count"].sum()),
+                '金額': int(base.loc[base["slip"] == slip, "amount"].sum())
+            }
+            for slip in SLIP_TYPES
+        }
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def is_empty(self):
+        return self.row_count == 0
+
+    def build_slip_tables(self):
+        """すべての伝票種別の slip_products と menu_items を作成しておく
+
+        結果キャッシュに入れる前に呼ぶと、memory_bytes が後から作成される表も含めた量になる
+        """
+        for slip in SLIP_TYPES:
+            self.slip_products(slip)
+            self.menu_items(slip)
+
+    def memory_bytes(self):
+        """保持している集計表の推定メモリ量（結果キャッシュの上限の判定に使う）"""
+        frames = [self.base, self.product_summary, self.group_summary]
+        frames += list(self._slip_products.values()) + list(self._menu_items.values())
+        return int(sum(frame.memory_usage(index=True, deep=True).sum() for frame in frames))
+
+    @staticmethod
+    def _sum_by(rows, keys):
+        """指定したキーで枚数と金額を合計（キーが欠損した行は除く）"""
+        return rows.groupby(keys, observed=True, sort=True)[["count", "amount"]].sum().reset_index()
+
+    @staticmethod
+    def _group_labels(group_names):
+        """グループ名を表示用の文字列にする（前後の空白を除き、空の場合は「その他」、欠損は'nan'）
+
+        文字列への変換はカテゴリごとに1回だけ行う
+        """
+        names = pd.Categorical(group_names)
+        labels = np.array([str(name).strip() for name in names.categories] + ["nan"], dtype=object)
+        labels[labels == ""] = "その他"
+        return labels[names.codes]
+
+    def slip_products(self, slip):
+        """伝票種別ごとの商品別集計（商品コード, 商品名称, 枚数, 金額）"""
+        products = self._slip_products.get(slip)
+        if products is None:
+            products = self._sum_by(self.base[self.base["slip"] == slip], ["product_code", "product_name"])
+            self._slip_products[slip] = products
+        return products
+
+    def menu_items(self, slip):
+        """PDF/Excel出力用の伝票種別ごとの明細（グループ名, メニュー番号, メニュー名, 枚数, 金額）
+
+        グループ名が空の場合は「その他」とし、グループ名・メニュー番号順に並べる
+        """
+        items = self._menu_items.get(slip)
+        if items is None:
+            items = self._build_menu_items(slip)
+            self._menu_items[slip] = items
+        return items
+
+    def _build_menu_items(self, slip):
+        rows = self.base[self.base["slip"] == slip]
+        group_label = self._group_labels(rows["group_name"])
+
+        items = rows.assign(group_label=group_label).groupby(
+            ["group_label", "product_code", "product_name"], observed=True, dropna=False, sort=False
+        ).agg(
+            count=("count", "sum"),
+            amount=("amount", "sum"),
+            first_row=("first_row", "min")
+        ).reset_index()
+
+        # 同じグループ名・メニュー番号の中では元データに先に現れた順
+        items["sort_code"] = items["product_code"].astype(str)
+        items = items.sort_values(["group_label", "sort_code", "first_row"], kind="stable")
+        return items[["group_label", "product_code", "product_name", "count", "amount"]].reset_index(drop=True)
+
+    def group_subtotals(self, slip):
+        """menu_itemsのグループ名ごとの小計（グループ名, 枚数, 金額）"""
+        items = self.menu_items(slip)
+        return items.groupby("group_label", sort=False)[["count", "amount"]].sum().reset_index()
+
+
+class SalesAggregator:
+    """型付け済みの明細から SalesSummary を作成する"""
+
+    @staticmethod
+    def slip_codes(data, column_indices):
+        """明細1行ごとの伝票種別（SLIP_TYPESの位置）を返す
+
+        現金売上: 金額符号=0 且つ カード減算額=0
+        キャッシュレス決済: 金額符号=0 且つ カード減算額≠0
+        赤伝: 金額符号=1
+        """
+        amount_sign = data[data.columns[column_indices["amount_sign_idx"]]]
+        card_amount = data[data.columns[column_indices["card_deduction_idx"]]]
+
+        is_normal = (amount_sign == '0').to_numpy()
+        has_card = (card_amount != 0).to_numpy()
+
+        codes = np.full(len(data), SLIP_TYPES.index(SLIP_OTHER), dtype=np.int8)
+        codes[is_normal & ~has_card] = SLIP_TYPES.index(SLIP_CASH)
+        codes[is_normal & has_card] = SLIP_TYPES.index(SLIP_CASHLESS)
+        codes[(amount_sign == '1').to_numpy()] = SLIP_TYPES.index(SLIP_RED)
+        return codes
+
+    @staticmethod
+    def rollup(data, column_indices):
+        """伝票種別 × 集計グループ × 商品 で1回だけ集計した表（SalesSummary.base）を返す
+
+        first_rowは各キーが最初に現れた行の位置（PDF/Excelで同じメニュー番号の並び順に使う）
+        """
+        columns = data.columns
+        frame = pd.DataFrame({
+            "slip": pd.Categorical.from_codes(SalesAggregator.slip_codes(data, column_indices), SLIP_TYPES),
+            "group_num": data[columns[column_indices["group_num_idx"]]].values,
+            "group_name": data[columns[column_indices["group_name_idx"]]].values,
+            "product_code": data[columns[column_indices["product_code_idx"]]].values,
+            "product_name": data[columns[column_indices["product_name_idx"]]].values,
+            "count": data[columns[column_indices["count_idx"]]].to_numpy(),
+            "amount": data[columns[column_indices["amount_idx"]]].to_numpy(),
+            "card_amount": data[columns[column_indices["card_deduction_idx"]]].to_numpy(),
+            "first_row": np.arange(len(data))
+        })
+
+        return frame.groupby(BASE_KEYS, observed=True, dropna=False, sort=True).agg(
+            count=("count", "sum"),
+            amount=("amount", "sum"),
+            card_amount=("card_amount", "sum"),
+            first_row=("first_row", "min")
+        ).reset_index()
+
+    @staticmethod
+    def aggregate(data, column_indices):
+        """伝票種別 × 集計グループ × 商品 で1回だけ集計する"""
+        return SalesSummary(SalesAggregator.rollup(data, column_indices), len(data))
+
+    @staticmethod
+    def combine(rollups, row_counts):
+        """日ごとの集計表（rollupの結果）を日付順に合算して SalesSummary を返す
+
+        row_countsは各集計表の元の明細行数
+        """
+        return SalesSummary(SalesAggregator.merge(rollups, row_counts), int(sum(row_counts)))
+
+    @staticmethod
+    def merge(rollups, row_counts):
+        """明細の順に並んだ複数の集計表（rollupの結果）を1つの集計表にまとめる
+
+        row_countsは各集計表の元の明細行数。first_rowは前の集計表までの行数だけずらし、
+        明細を結合して集計した場合と同じ値にする
+        """
+        offsets = np.concatenate(([0], np.cumsum(row_counts)[:-1])) if len(row_counts) else []
+        frames = [
+            rollup.assign(first_row=rollup["first_row"] + offset)
+            for rollup, offset in zip(rollups, offsets)
+            if len(rollup)
+        ]
+        if not frames:
+            return SalesAggregator.empty_rollup()
+
+        combined = pd.concat(frames, ignore_index=True)
+        # 日によってカテゴリが異なるとobject型になるため、カテゴリ型に戻してから集計する
+        for key in BASE_KEYS:
+            combined[key] = combined[key].astype("category")
+        combined["slip"] = combined["slip"].cat.set_categories(SLIP_TYPES)
+
+        return combined.groupby(BASE_KEYS, observed=True, dropna=False, sort=True).agg(
+            count=("count", "sum"),
+            amount=("amount", "sum"),
+            card_amount=("card_amount", "sum"),
+            first_row=("first_row", "min")
+        ).reset_index()
+
+    @staticmethod
+    def empty_rollup():
+        """行のない集計表"""
+        base = pd.DataFrame({key: pd.Categorical([]) for key in BASE_KEYS})
+        base["slip"] = pd.Categorical([], categories=SLIP_TYPES)
+        for value in BASE_VALUES + ["first_row"]:
+            base[value] = np.empty(0, dtype=np.int64)
+        return base
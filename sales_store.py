@@ -0,0 +1,535 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import time
+from itertools import groupby
+import numpy as np
+import pandas as pd
+
+from data_handler import DataHandler
+from ingest_cache import FRAME_FORMAT, read_frame, write_frame
+from sales_aggregator import SalesAggregator, SLIP_CASH, SLIP_CASHLESS, SLIP_RED
+from perf_log import PerfLog
+from result_cache import ResultCache
+
+
+class SalesStore:
+    """CSVフォルダを取引日付ごとに分割した型付き列指向ストア
+
+    構成:
+        <store_dir>/manifest.json       ... 取込済みCSVの (サイズ, 更新日時) と出力先、日別集計の行数と
+                                          伝票種別ごとの合計（売上推移の表示に使う）
+        <store_dir>/<YYMMDD>/<id>.*     ... CSV 1ファイル分のその日の明細（集計で使う列のみ）
+        <store_dir>/<YYMMDD>/<id>.rollup.*
+                                        ... 分割して読み込んだ大きなCSV 1ファイル分のその日の集計
+                                          （明細は保存しない）
+        <store_dir>/rollup/<YYMMDD>.*   ... その日の 伝票種別 × 集計グループ × 商品 別の集計
+                                          （枚数・金額・カード減算額の合計）
+        <store_dir>/rollup/<YYMM>.*     ... その月の日別集計をまとめた月別集計
+                                          （数か月・1年の範囲を日数ではなく月数の読み込みで集計する）
+
+    明細はcolumn_indicesが参照する列だけを読み込んで保存する（列の並びは元のCSVの順）
+    compile と summary/daily_totals は別スレッドから呼ばれる
+    compile はCSVの解析と集計表の作成をロックの外で行い、集計表とマニフェストを入れ替える間だけロックを取る
+    （取込中も summary/daily_totals は入れ替え前の内容ですぐに返る。compile 同士は順番に行う）
+
+    summary の結果は (data_version, 開始日, 終了日) をキーに SUMMARY_CACHE_* の範囲で保持する
+    取込で内容が変わると data_version を上げて保持した結果を捨てる
+    読み込んだ日別集計は ROLLUP_CACHE_* の範囲で保持する
+    """
+
+    STORE_VERSION = 2
+    MANIFEST_NAME = "manifest.json"
+    ROLLUP_DIR = "rollup"
+    ROLLUP_PART_SUFFIX = "rollup"
+    # 集計結果のキャッシュの上限（件数と推定メモリ量）
+    SUMMARY_CACHE_ENTRIES = 32
+    SUMMARY_CACHE_BYTES = 64 * 1024 * 1024
+    # 読み込んだ日別集計のキャッシュの上限（1年分の範囲を集計しても捨てられない件数）
+    ROLLUP_CACHE_ENTRIES = 400
+    ROLLUP_CACHE_BYTES = 128 * 1024 * 1024
+    # 日別の合計を保持する伝票種別
+    TOTAL_SLIPS = (SLIP_CASH, SLIP_CASHLESS, SLIP_RED)
+
+    def __init__(self, store_dir, column_indices=None):
+        self.store_dir = store_dir
+        # 元のCSVの列インデックスと、読み込む列・読み込んだデータでの列インデックス
+        self.source_column_indices = dict(column_indices or DataHandler.COLUMN_INDICES)
+        self.usecols = DataHandler.column_projection(self.source_column_indices)
+        self.positions = DataHandler.column_positions(self.usecols)
+        self.column_indices = DataHandler.projected_column_indices(self.source_column_indices)
+        self.manifest_path = os.path.join(store_dir, self.MANIFEST_NAME)
+        self.sources = {}
+        self.rollups = {}  # 取引日付 -> その日の明細行数
+        self.day_totals = {}  # 取引日付 -> {伝票種別: [枚数, 金額]}
+        self.month_rollups = {}  # 取引年月(YYMM) -> その月の明細行数
+        self.columns = None
+        # 取引日付・取引年月 -> 日別集計・月別集計
+        self._rollup_frames = ResultCache(self.ROLLUP_CACHE_ENTRIES, self.ROLLUP_CACHE_BYTES)
+        self.data_version = 0  # 取込で内容が変わるたびに増やす
+        self._summary_cache = ResultCache(self.SUMMARY_CACHE_ENTRIES, self.SUMMARY_CACHE_BYTES)
+        self._lock = threading.RLock()  # 集計表の状態（rollups・day_totals・month_rollups）の入れ替え
+        self._compile_lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+        self._load_manifest()
+        # 取り込んだ内容ごとに異なるキー（data_versionはストアを開き直すと0に戻るため、保存した結果のキーにはこれを使う）
+        self.content_key = self._content_key()
+
+    @classmethod
+    def for_folder(cls, folder_path, cache_dir, column_indices=None):
+        """CSVフォルダごとのストアをキャッシュディレクトリ配下に開く"""
+        digest = hashlib.sha1(os.path.abspath(folder_path).encode('utf-8')).hexdigest()[:16]
+        return cls(os.path.join(cache_dir, "store", digest), column_indices)
+
+    def _load_manifest(self):
+        """マニフェストを読み込む（バージョンや読み込む列が違う場合はストアを作り直す）"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if manifest.get("version") != self.STORE_VERSION or manifest.get("format") != FRAME_FORMAT or \
+                manifest.get("usecols") != self.usecols:
+            self.clear()
+            return
+
+        self.sources = manifest.get("sources", {})
+        self.rollups = manifest.get("rollups", {})
+        self.day_totals = manifest.get("day_totals", {})
+        self.month_rollups = manifest.get("month_rollups", {})
+        self.columns = manifest.get("columns")
+
+    def _save_manifest(self):
+        manifest = {
+            "version": self.STORE_VERSION,
+            "format": FRAME_FORMAT,
+            "usecols": self.usecols,
+            "columns": self.columns,
+            "sources": self.sources,
+            "rollups": self.rollups,
+            "day_totals": self.day_totals,
+            "month_rollups": self.month_rollups
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def clear(self):
+        """ストアの内容をすべて削除"""
+        for name in os.listdir(self.store_dir):
+            path = os.path.join(self.store_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        self.sources = {}
+        self.rollups = {}
+        self.day_totals = {}
+        self.month_rollups = {}
+        self.columns = None
+        self._rollup_frames.clear()
+        self._invalidate()
+
+    def _content_key(self):
+        """ストアの形式と取り込んだCSV（パス・サイズ・更新日時）から作成したキー"""
+        sources = sorted((key, entry["size"], entry["mtime"]) for key, entry in self.sources.items())
+        text = json.dumps([self.STORE_VERSION, FRAME_FORMAT, self.usecols, sources], ensure_ascii=False)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _invalidate(self):
+        """内容が変わったため、保持している集計結果を捨てる"""
+        self.data_version += 1
+        self._summary_cache.clear()
+
+    def _remove_parts(self, entry):
+        """CSV 1ファイル分の日付パーティションを削除"""
+        for part in entry.get("parts", []):
+            try:
+                os.remove(os.path.join(self.store_dir, part))
+            except OSError:
+                pass
+
+    def _write_source(self, file_path, data):
+        """型付け済みのデータを取引日付ごとに分けて書き出し、パーティション一覧を返す"""
+        date_col = data.columns[self.column_indices["date_column_index"]]
+        dates = data[date_col].astype(str)
+        valid = dates.str.fullmatch(r'\d{6}')
+        if not valid.all():
+            print(f"取引日付が不正な行を除外: {file_path}, {int((~valid).sum())} 行")
+
+        source_id = self._source_id(file_path)
+        parts = []
+        for date_str, day_data in data[valid].groupby(dates[valid], sort=True):
+            os.makedirs(os.path.join(self.store_dir, date_str), exist_ok=True)
+            part = os.path.join(date_str, f"{source_id}.{FRAME_FORMAT}")
+            write_frame(day_data.reset_index(drop=True), os.path.join(self.store_dir, part))
+            parts.append(part)
+        return parts
+
+    @staticmethod
+    def _source_id(file_path):
+        return hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+
+    def _replace_source(self, file_path, stat, parts, changed_dates, rollup_rows=None):
+        """CSV 1ファイル分のパーティション一覧を登録する（前回取り込んだ分は削除する）"""
+        key = os.path.abspath(file_path)
+        entry = self.sources.get(key)
+        if entry is not None:
+            # 新しいパーティションと同じ名前のものは上書き済みのため残す
+            self._remove_parts({"parts": [part for part in entry.get("parts", []) if part not in parts]})
+            changed_dates.update(entry.get("dates", []))
+
+        dates = [os.path.dirname(part) for part in parts]
+        changed_dates.update(dates)
+        self.sources[key] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "parts": parts,
+            "dates": dates
+        }
+        if rollup_rows is not None:
+            self.sources[key]["rollup_rows"] = rollup_rows
+
+    def _import_source(self, file_path, data, stat, changed_dates):
+        """解析済みCSV 1ファイル分（usecolsの列のみ）を型付けして日付パーティションに書き出す"""
+        data = DataHandler.apply_schema(data, self.positions)
+        if self.columns is None:
+            self.columns = data.columns.tolist()
+
+        parts = self._write_source(file_path, data)
+        self._replace_source(file_path, stat, parts, changed_dates)
+
+    def _import_large_source(self, file_path, stat, changed_dates):
+        """大きなCSV 1ファイル分を分割して読み込み、日別の集計だけを書き出す（明細は保存しない）"""
+        start_time = time.perf_counter()
+        with PerfLog.span("read_csv_chunked", file=os.path.basename(file_path), bytes=stat.st_size) as span:
+            columns, daily, invalid_rows = DataHandler.rollup_csv_chunked(
+                file_path, column_indices=self.source_column_indices
+            )
+            span["rows"] = sum(row_count for _, row_count in daily.values())
+        if invalid_rows:
+            print(f"取引日付が不正な行を除外: {file_path}, {invalid_rows} 行")
+        if self.columns is None:
+            self.columns = columns
+
+        source_id = self._source_id(file_path)
+        parts = []
+        rollup_rows = {}
+        for date_str, (rollup, row_count) in sorted(daily.items()):
+            os.makedirs(os.path.join(self.store_dir, date_str), exist_ok=True)
+            part = os.path.join(date_str, f"{source_id}.{self.ROLLUP_PART_SUFFIX}.{FRAME_FORMAT}")
+            write_frame(rollup, os.path.join(self.store_dir, part))
+            parts.append(part)
+            rollup_rows[part] = row_count
+
+        self._replace_source(file_path, stat, parts, changed_dates, rollup_rows)
+        print(f"分割読み込み成功: {file_path} ({sum(rollup_rows.values())} 行, "
+              f"{time.perf_counter() - start_time:.2f}秒)")
+
+    def compile(self, folder_path, progress_callback=None, is_cancelled=None,
+                workers=1, use_processes=True, engine=None):
+        """CSVフォルダの新規・変更ファイルだけをストアに取り込み、更新された日付の集合を返す
+
+        取込済みのファイルはストアの内容を使うため、解析済みCSVのキャッシュ（IngestCache）は使わない
+        progress_callback(処理済み件数, 総件数, ファイルパス) はファイルごとに呼ばれる
+        is_cancelled() がTrueを返すと、それまでの取込結果を保存して中断する
+        workersが2以上の場合はCSVを並列に解析する
+        engineはCSV解析エンジン（DataHandler.read_csv_fileを参照）
+        """
+        with self._compile_lock, PerfLog.span("store_compile") as span:
+            changed_dates = self._compile(
+                folder_path, progress_callback, is_cancelled, workers, use_processes, engine
+            )
+            span.update(files=len(self.sources), changed_dates=len(changed_dates))
+            return changed_dates
+
+    def _compile(self, folder_path, progress_callback, is_cancelled, workers, use_processes, engine):
+        changed_dates = set()
+        csv_files = DataHandler.find_csv_files(folder_path)
+        cancelled = False
+
+        # 取込済みの内容から変わっていないファイルを除外
+        pending = []
+        for file_path in csv_files:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entry = self.sources.get(os.path.abspath(file_path))
+            if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns:
+                pending.append((file_path, stat))
+
+        # 大きなCSVは後で分割して読み込む
+        parse_paths = [
+            file_path for file_path, stat in pending if stat.st_size < DataHandler.LARGE_FILE_BYTES
+        ]
+
+        results = DataHandler.read_csv_files(parse_paths, workers, use_processes, self.usecols, engine)
+        try:
+            for file_index, (file_path, stat) in enumerate(pending):
+                if is_cancelled is not None and is_cancelled():
+                    cancelled = True
+                    break
+                if progress_callback is not None:
+                    progress_callback(file_index, len(pending), file_path)
+
+                if stat.st_size >= DataHandler.LARGE_FILE_BYTES:
+                    try:
+                        self._import_large_source(file_path, stat, changed_dates)
+                    except Exception as e:
+                        print(f"ファイル取込エラー: {file_path}, エラー: {e}")
+                    continue
+
+                # read_csv_filesは入力順に結果を返す
+                _, data, elapsed, error = next(results)
+                if error is not None:
+                    print(f"ファイル読み込みエラー: {file_path}, エラー: {error}")
+                    continue
+                print(f"読み込み成功: {file_path} ({elapsed:.2f}秒)")
+
+                try:
+                    self._import_source(file_path, data, stat, changed_dates)
+                except Exception as e:
+                    print(f"ファイル取込エラー: {file_path}, エラー: {e}")
+        finally:
+            results.close()
+
+        if progress_callback is not None and not cancelled:
+            progress_callback(len(pending), len(pending), "")
+
+        # フォルダから消えたCSVの分を削除（中断時は未確認のファイルがあるため行わない）
+        if not cancelled:
+            folder_key = os.path.join(os.path.abspath(folder_path), "")
+            seen_keys = {os.path.abspath(file_path) for file_path in csv_files}
+            for key in list(self.sources):
+                if key.startswith(folder_key) and key not in seen_keys:
+                    entry = self.sources.pop(key)
+                    self._remove_parts(entry)
+                    changed_dates.update(entry.get("dates", []))
+
+        # 集計表は入れ替えるまで今の内容を残し、作り直したものは別のファイルに書き出しておく
+        with self._lock:
+            rollups = dict(self.rollups)
+            day_totals = dict(self.day_totals)
+            month_rollups = dict(self.month_rollups)
+        # 更新された日付と、日別集計がまだない日付の集計を作り直す
+        rollup_dates = changed_dates | (set(self.dates()) - set(rollups))
+        frames = self._update_rollups(rollup_dates, rollups, day_totals)
+        # 日別集計を作り直した月と、月別集計がまだない月（以前のストア）の月別集計を作り直す
+        frames.update(self._update_month_rollups(
+            {date_str[:4] for date_str in rollup_dates} |
+            ({date_str[:4] for date_str in rollups} - set(month_rollups)),
+            rollups, month_rollups, frames
+        ))
+
+        with self._lock:
+            self._swap_rollups(rollups, day_totals, month_rollups, frames)
+            if changed_dates:
+                self._invalidate()
+            self.content_key = self._content_key()
+            self._save_manifest()
+        print(f"ストア更新: {len(self.sources)} ファイル取込済み, 更新日付 {len(changed_dates)} 日")
+        return changed_dates
+
+    def _rollup_path(self, date_str):
+        return os.path.join(self.store_dir, self.ROLLUP_DIR, f"{date_str}.{FRAME_FORMAT}")
+
+    def _staged_rollup_path(self, date_str):
+        """作り直した集計表を入れ替えまで置いておくパス"""
+        return f"{self._rollup_path(date_str)}.new"
+
+    def _day_parts(self, date_str):
+        """その日のパーティションを (パス, 分割読み込みの場合は明細行数) の一覧でパス順に返す"""
+        return sorted(
+            (part, entry.get("rollup_rows", {}).get(part))
+            for entry in self.sources.values()
+            for part in entry.get("parts", [])
+            if os.path.dirname(part) == date_str
+        )
+
+    def _update_rollups(self, dates, rollups, day_totals):
+        """指定した日付の日別集計をその日のパーティションから作り直す（明細がなくなった日付は削除）
+
+        明細のパーティションはファイルごとに集計し、分割読み込みした分の集計と
+        パス順に合算する（1日分の明細をまとめて集計した場合と同じ結果になる）
+        作り直した集計は入れ替え用のパスに書き出し、rollups・day_totals（入れ替え前の複製）を更新する
+        戻り値は 取引日付 -> 作り直した日別集計（削除する日付はNone）
+        """
+        frames = {}
+        if not dates:
+            return frames
+        os.makedirs(os.path.join(self.store_dir, self.ROLLUP_DIR), exist_ok=True)
+
+        with PerfLog.span("update_rollups", days=len(dates)):
+            for date_str in sorted(dates):
+                part_rollups = []
+                row_counts = []
+                for part, rollup_rows in self._day_parts(date_str):
+                    frame = read_frame(os.path.join(self.store_dir, part))
+                    if rollup_rows is None:
+                        rollup_rows = len(frame)
+                        frame = SalesAggregator.rollup(frame, self.column_indices)
+                    part_rollups.append(frame)
+                    row_counts.append(rollup_rows)
+
+                if sum(row_counts) == 0:
+                    rollups.pop(date_str, None)
+                    day_totals.pop(date_str, None)
+                    frames[date_str] = None
+                    continue
+
+                rollup = SalesAggregator.merge(part_rollups, row_counts)
+                write_frame(rollup, self._staged_rollup_path(date_str))
+                rollups[date_str] = int(sum(row_counts))
+                day_totals[date_str] = self._rollup_totals(rollup)
+                frames[date_str] = rollup
+
+        print(f"日別集計を更新: {len(dates)} 日")
+        return frames
+
+    def _update_month_rollups(self, months, rollups, month_rollups, day_frames):
+        """指定した月(YYMM)の月別集計をその月の日別集計から作り直す（日別集計がなくなった月は削除）
+
+        day_frames は作り直した日別集計（_update_rollupsの戻り値）で、それ以外の日は今の日別集計を読む
+        作り直した集計は入れ替え用のパスに書き出し、month_rollups（入れ替え前の複製）を更新する
+        戻り値は 取引年月 -> 作り直した月別集計（削除する月はNone）
+        """
+        frames = {}
+        if not months:
+            return frames
+
+        with PerfLog.span("update_month_rollups", months=len(months)):
+            for month in sorted(months):
+                dates = sorted(date_str for date_str in rollups if date_str[:4] == month)
+                if not dates:
+                    month_rollups.pop(month, None)
+                    frames[month] = None
+                    continue
+
+                row_counts = [rollups[date_str] for date_str in dates]
+                day_rollups = [
+                    day_frames[date_str] if date_str in day_frames else self._read_rollup(date_str)
+                    for date_str in dates
+                ]
+                rollup = SalesAggregator.merge(day_rollups, row_counts)
+                write_frame(rollup, self._staged_rollup_path(month))
+                month_rollups[month] = int(sum(row_counts))
+                frames[month] = rollup
+        return frames
+
+    def _swap_rollups(self, rollups, day_totals, month_rollups, frames):
+        """作り直した集計表のファイルと状態に入れ替える（ロックを取って呼ぶ）
+
+        frames は 取引日付・取引年月 -> 作り直した集計表（削除するものはNone）
+        """
+        for key, rollup in frames.items():
+            if rollup is None:
+                self._rollup_frames.discard(key)
+                try:
+                    os.remove(self._rollup_path(key))
+                except OSError:
+                    pass
+                continue
+            os.replace(self._staged_rollup_path(key), self._rollup_path(key))
+            self._cache_rollup(key, rollup)
+        self.rollups = rollups
+        self.day_totals = day_totals
+        self.month_rollups = month_rollups
+
+    @classmethod
+    def _rollup_totals(cls, rollup):
+        """日別集計から伝票種別ごとの [枚数, 金額] を作成"""
+        totals = rollup.groupby("slip", observed=False)[["count", "amount"]].sum()
+        totals = totals.reindex(list(cls.TOTAL_SLIPS), fill_value=0)
+        return {slip: [int(totals.at[slip, "count"]), int(totals.at[slip, "amount"])] for slip in cls.TOTAL_SLIPS}
+
+    def _read_rollup(self, date_str):
+        """日別集計（取引年月を渡した場合は月別集計）を読み込む（読んだものはROLLUP_CACHE_*の範囲でメモリに保持する）"""
+        rollup = self._rollup_frames.get(date_str)
+        if rollup is None:
+            rollup = read_frame(self._rollup_path(date_str))
+            self._cache_rollup(date_str, rollup)
+        return rollup
+
+    def _cache_rollup(self, date_str, rollup):
+        self._rollup_frames.put(date_str, rollup, int(rollup.memory_usage(index=True, deep=True).sum()))
+
+    def dates(self):
+        """ストアに含まれる取引日付(YYMMDD)の一覧"""
+        return sorted({date for entry in self.sources.values() for date in entry.get("dates", [])})
+
+    def daily_totals(self, start_date_str, end_date_str):
+        """日付範囲(YYMMDD)の伝票種別ごとの日別合計を返す
+
+        行はデータのある取引日付（DatetimeIndex）、列は (伝票種別, "count"/"amount")
+        合計は日別集計の作成時にマニフェストへ保存しているため、明細も日別集計も読まない
+        """
+        columns = pd.MultiIndex.from_product([self.TOTAL_SLIPS, ["count", "amount"]])
+        with self._lock:
+            dates = sorted(date_str for date_str in self.rollups if start_date_str <= date_str <= end_date_str)
+            rows = []
+            for date_str in dates:
+                totals = self.day_totals.get(date_str)
+                if totals is None:
+                    # 合計を保存していない以前のストアは日別集計から作成する（次の取込で保存される）
+                    totals = self._rollup_totals(self._read_rollup(date_str))
+                    self.day_totals[date_str] = totals
+                rows.append([value for slip in self.TOTAL_SLIPS for value in totals[slip]])
+
+        return pd.DataFrame(
+            np.array(rows, dtype=np.int64).reshape(len(dates), len(columns)),
+            index=pd.to_datetime(dates, format="%y%m%d"),
+            columns=columns
+        )
+
+    def _range_rollups(self, start_date_str, end_date_str):
+        """日付範囲(YYMMDD)の集計表のキー（取引日付または取引年月）と明細行数を日付順に返す
+
+        その月のデータのある日がすべて範囲に含まれる月は、日別集計の代わりに月別集計を使う
+        """
+        dates = sorted(date_str for date_str in self.rollups if start_date_str <= date_str <= end_date_str)
+        keys = []
+        row_counts = []
+        for month, month_dates in groupby(dates, key=lambda date_str: date_str[:4]):
+            month_dates = list(month_dates)
+            day_counts = [self.rollups[date_str] for date_str in month_dates]
+            # 行数が一致すれば、月別集計はこれらの日の日別集計をまとめたもの
+            if self.month_rollups.get(month) == sum(day_counts):
+                keys.append(month)
+                row_counts.append(sum(day_counts))
+            else:
+                keys += month_dates
+                row_counts += day_counts
+        return dates, keys, row_counts
+
+    def summary(self, start_date_str, end_date_str):
+        """日付範囲(YYMMDD)の集計結果（SalesSummary）を日別集計・月別集計から作成する
+
+        明細は読まずに、範囲内の日数（月全体が含まれる部分は月数） × 商品数 程度の行を合算するだけで済む
+        集計表は読んだものがメモリに残るため、取込後の再集計ではファイルも読まない
+        ストアが空の場合はNoneを返す
+        """
+        with PerfLog.span("store_summary") as span:
+            with self._lock:
+                if self.columns is None:
+                    return None
+                key = (self.data_version, start_date_str, end_date_str)
+                summary = self._summary_cache.get(key)
+                if summary is not None:
+                    span.update(cached=True, rows=len(summary))
+                    return summary
+                dates, keys, row_counts = self._range_rollups(start_date_str, end_date_str)
+                rollups = [self._read_rollup(key) for key in keys]
+
+            summary = SalesAggregator.combine(rollups, row_counts)
+            # 表示・出力で使う伝票種別ごとの表も作成し、それを含めた量でキャッシュの上限を判定する
+            summary.build_slip_tables()
+            span.update(days=len(dates), rollups=len(keys), rows=len(summary), products=len(summary.product_summary))
+            # 集計中に取込が行われた場合は古い版のキーで保持されるため、次の呼び出しでは使われない
+            self._summary_cache.put(key, summary, summary.memory_bytes())
+        print(f"日別集計から集計: {len(dates)} 日, 明細 {len(summary)} 行")
+        return summary
@@ -0,0 +1,274 @@
+"""KB Series 売上集計のWeb版（Streamlit）
+
+起動: streamlit run streamlit_app.py
+
+CSVフォルダのストア（SalesStore）はサーバー上で全セッションが共有する
+各セッションは取込済みの日別集計を合算するだけなので、複数の店長が同時に閲覧しても
+CSVフォルダの解析は最初の1回（以降は新規・変更ファイルのみ）で済む
+帳票（Excel/PDF）はメモリ上で作成し、ダウンロードボタンから取得する
+
+閲覧できるCSVフォルダはサーバーの環境変数で決め、画面からは任意のパスを指定できない
+    KB_CSV_ROOT: このフォルダと直下のフォルダ（店舗ごとのフォルダなど）から選択する
+    KB_CSV_FOLDER: KB_CSV_ROOTがない場合に使う、固定のCSVフォルダ
+    KB_CACHE_DIR: ストアの保存先（省略時はデスクトップ版と同じキャッシュディレクトリ）
+"""
+import os
+import io
+import time
+import threading
+import functools
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+from PyQt5.QtCore import QDate, QSettings
+
+from data_handler import DataHandler
+from export_handler import ExportHandler
+from ingest_cache import IngestCache
+from sales_store import SalesStore
+from sales_aggregator import SLIP_CASH, SLIP_CASHLESS, SLIP_RED
+
+# 共有ストアが新規・変更CSVを確認する間隔（秒）
+REFRESH_SECONDS = 60
+# 同時に保持する共有ストアの数
+MAX_STORES = 32
+
+RECEIPT_TYPES = {
+    "現金売上": SLIP_CASH,
+    "キャッシュレス決済": SLIP_CASHLESS,
+    "赤伝処理": SLIP_RED
+}
+
+# 出力形式 -> (拡張子, MIMEタイプ)
+EXPORT_FORMATS = {
+    "excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": (".pdf", "application/pdf")
+}
+
+
+class SharedStore:
+    """全セッションで共有するCSVフォルダのストア
+
+    表示のたびに取り込むと閲覧者が多い場合にフォルダの確認が重なるため、
+    最後の取込から REFRESH_SECONDS 以上経っている場合だけ新規・変更CSVを取り込む
+    """
+
+    def __init__(self, folder_path, cache_dir):
+        self.folder_path = folder_path
+        self.store = SalesStore.for_folder(folder_path, cache_dir)
+        self.compiled_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, engine=None, force=False):
+        """必要な場合だけ新規・変更CSVを取り込む（同時に呼ばれた場合は1つのセッションだけが取り込む）"""
+        with self._lock:
+            if not force and self.compiled_at is not None and \
+                    time.monotonic() - self.compiled_at < REFRESH_SECONDS:
+                return
+            self.store.compile(self.folder_path, engine=engine)
+            self.compiled_at = time.monotonic()
+
+
+@st.cache_resource
+def cache_dir():
+    """ストアの保存先"""
+    return os.environ.get("KB_CACHE_DIR") or IngestCache.default_cache_dir(QSettings("KBSeries", "SalesAnalysis"))
+
+
+@st.cache_resource(max_entries=MAX_STORES)
+def shared_store(folder_path):
+    """CSVフォルダごとの共有ストア（フォルダのパスごとに1つだけ作成する）"""
+    return SharedStore(folder_path, cache_dir())
+
+
+@st.cache_resource
+def export_handler():
+    """帳票の出力（日本語フォントの登録は最初の1回だけ）"""
+    return ExportHandler()
+
+
+def csv_folders():
+    """閲覧できるCSVフォルダの一覧 {表示名: 絶対パス}（環境変数で設定されていない場合は空）"""
+    root = os.environ.get("KB_CSV_ROOT")
+    if root:
+        root = os.path.realpath(root)
+        if not os.path.isdir(root):
+            return {}
+        folders = {".": root}
+        with os.scandir(root) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                # シンボリックリンクで基準フォルダの外を指すものは除く
+                if entry.is_dir() and is_inside(os.path.realpath(entry.path), root):
+                    folders[entry.name] = os.path.realpath(entry.path)
+        return folders
+
+    folder = os.environ.get("KB_CSV_FOLDER")
+    if folder and os.path.isdir(folder):
+        folder = os.path.realpath(folder)
+        return {os.path.basename(folder) or folder: folder}
+    return {}
+
+
+def is_inside(path, root):
+    return os.path.commonpath([path, root]) == root
+
+
+def to_qdate(value):
+    return QDate(value.year, value.month, value.day)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def report_bytes(folder_path, content_key, start_date, end_date, shop_name, export_format):
+    """帳票をメモリ上に作成してバイト列で返す
+
+    content_key（SalesStore.content_key）はキャッシュのキーにだけ使う（取込で内容が変わると作り直す）
+    共有ストアが作り直されても同じ内容なら同じキーになり、違う内容で同じキーになることはない
+    """
+    summary = shared_store(folder_path).store.summary(
+        start_date.strftime("%y%m%d"), end_date.strftime("%y%m%d")
+    )
+
+    handler = export_handler()
+    report = handler.report_names(shop_name, to_qdate(start_date), to_qdate(end_date))
+    buffer = io.BytesIO()
+    if export_format == "excel":
+        success = handler.excel_exporter.export_to_excel(
+            summary, buffer, report["shop_name"], report["title"], report["date_range"]
+        )
+    else:
+        success = handler.pdf_exporter.export_to_pdf(
+            summary, buffer, report["shop_name"], report["title"], report["date_range"]
+        )
+    if not success:
+        raise RuntimeError("帳票の作成に失敗しました")
+    return buffer.getvalue()
+
+
+def table_frame(summary, headers, is_red_slip=False):
+    """集計結果（コード, 名称, 枚数, 金額）を表示用の表にする
+
+    数字だけのコードは先頭の0を除き、赤伝は枚数と金額をマイナスで表示する（Excel出力と同じ）
+    """
+    codes = summary.iloc[:, 0].astype(object).map(str)
+    sign = -1 if is_red_slip else 1
+    return pd.DataFrame({
+        headers[0]: [str(int(code)) if code.isdigit() else code for code in codes],
+        headers[1]: summary.iloc[:, 1].astype(object).map(str).to_numpy(),
+        headers[2]: summary.iloc[:, 2].to_numpy(dtype="int64") * sign,
+        headers[3]: summary.iloc[:, 3].to_numpy(dtype="int64") * sign
+    })
+
+
+def show_table(frame):
+    st.dataframe(
+        frame,
+        hide_index=True,
+        width="stretch",
+        column_config={
+            column: st.column_config.NumberColumn(format="localized")
+            for column in frame.columns[2:]
+        }
+    )
+
+
+def set_date_range(preset):
+    """日付範囲のボタン（当日・今月・年間）"""
+    today = date.today()
+    if preset == "today":
+        start_date = today
+    elif preset == "month":
+        start_date = today.replace(day=1)
+    else:
+        start_date = today.replace(month=1, day=1)
+    st.session_state["date_range"] = (start_date, today)
+
+
+def sidebar():
+    """検索条件の入力欄を表示し、(CSVフォルダ, 店舗名, 開始日, 終了日, 解析エンジン, 再取込) を返す"""
+    with st.sidebar:
+        st.header("検索条件")
+        folders = csv_folders()
+        folder_name = st.selectbox("CSVフォルダ", list(folders)) if folders else None
+        folder_path = folders.get(folder_name)
+        shop_name = st.text_input("店舗名", value="KB Series") or "KB Series"
+
+        st.session_state.setdefault("date_range", (date.today(), date.today()))
+        columns = st.columns(3)
+        columns[0].button("当日", on_click=set_date_range, args=("today",), width="stretch")
+        columns[1].button("今月", on_click=set_date_range, args=("month",), width="stretch")
+        columns[2].button("年間", on_click=set_date_range, args=("year",), width="stretch")
+        date_range = st.date_input("日付範囲", key="date_range", format="YYYY/MM/DD")
+
+        engines = DataHandler.available_csv_engines()
+        engine = st.selectbox("CSV解析", engines, index=engines.index(DataHandler.CSV_ENGINE))
+        force = st.button("最新のCSVを取り込む")
+
+    # 範囲の終了日を選択中の場合は開始日だけが入っている
+    start_date = date_range[0] if date_range else date.today()
+    end_date = date_range[1] if len(date_range) > 1 else start_date
+    return folder_path, shop_name, start_date, end_date, engine, force
+
+
+def main():
+    st.set_page_config(page_title="KB Series 売上集計", layout="wide")
+    st.title("券売機システム")
+
+    folder_path, shop_name, start_date, end_date, engine, force = sidebar()
+    if not folder_path:
+        st.error("CSVフォルダが設定されていません（環境変数 KB_CSV_ROOT または KB_CSV_FOLDER を設定してください）")
+        return
+
+    shared = shared_store(folder_path)
+    with st.spinner("CSVファイルを取り込んでいます..."):
+        shared.refresh(engine, force)
+
+    start_date_str = start_date.strftime("%y%m%d")
+    end_date_str = end_date.strftime("%y%m%d")
+    summary = shared.store.summary(start_date_str, end_date_str)
+    if summary is None:
+        st.warning("有効なCSVファイルが見つかりませんでした")
+        return
+
+    st.caption(f"集計日: {start_date:%Y/%m/%d}～{end_date:%Y/%m/%d}（明細 {len(summary):,} 行）")
+    metrics = st.columns(4)
+    metrics[0].metric("合計枚数", f"{summary.total_count:,}")
+    metrics[1].metric("合計金額", f"{summary.total_amount:,}円")
+    metrics[2].metric("キャッシュレス枚数", f"{summary.cashless_count:,}")
+    metrics[3].metric("キャッシュレス金額", f"{summary.cashless_amount:,}円")
+
+    product_tab, group_tab, receipt_tab = st.tabs(["商品別", "グループ別", "伝票別"])
+    with product_tab:
+        show_table(table_frame(summary.product_summary, ["商品コード", "商品名称", "枚数", "金額"]))
+    with group_tab:
+        show_table(table_frame(summary.group_summary, ["グループ番号", "グループ名称", "枚数", "金額"]))
+    with receipt_tab:
+        receipt_type = st.selectbox("伝票種別", list(RECEIPT_TYPES))
+        slip = RECEIPT_TYPES[receipt_type]
+        totals = summary.slip_totals[slip]
+        st.write(f"合計枚数: {totals['数量']:,}　合計金額: {totals['金額']:,}円")
+        show_table(table_frame(
+            summary.slip_products(slip), ["商品コード", "商品名称", "枚数", "金額"], is_red_slip=(slip == SLIP_RED)
+        ))
+
+    if summary.is_empty:
+        return
+
+    st.subheader("データエクスポート")
+    file_name = export_handler().report_names(shop_name, to_qdate(start_date), to_qdate(end_date))["file_name"]
+    buttons = st.columns(len(EXPORT_FORMATS))
+    for column, (export_format, (extension, mime)) in zip(buttons, EXPORT_FORMATS.items()):
+        # 帳票はボタンが押されたときに作成する（同じ条件の帳票はセッション間で使い回す）
+        column.download_button(
+            f"{'Excel' if export_format == 'excel' else 'PDF'} をダウンロード",
+            data=functools.partial(
+                report_bytes, folder_path, shared.store.content_key, start_date, end_date, shop_name, export_format
+            ),
+            file_name=file_name + extension,
+            mime=mime,
+            on_click="ignore"
+        )
+
+
+if __name__ == "__main__":
+    main()
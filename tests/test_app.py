@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QDate, QSettings
+from PyQt5.QtWidgets import QApplication
+
+from test_sales_store import HEADER, csv_rows, write_csv
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    """設定とキャッシュを一時フォルダに置いたメインウィンドウ"""
+    application = QApplication.instance() or QApplication(sys.argv[:1])
+    QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope, str(tmp_path / "settings"))
+    from app import SalesAnalysisApp
+    window = SalesAnalysisApp()
+    yield window
+    window.close()
+    application.processEvents()
+
+
+def search(window):
+    """検索してワーカーの完了を待つ"""
+    window.search_data()
+    while window.load_thread is not None:
+        QApplication.processEvents()
+
+
+def test_repeated_search_reuses_store_and_summary(window, tmp_path):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    write_csv(str(folder / "KB1_260101_Count.csv"), HEADER + csv_rows(0, 10))
+    write_csv(str(folder / "KB1_260102_Count.csv"), HEADER + csv_rows(10, 5, "260102"))
+    window.folder_path.setText(str(folder))
+    window.start_date.setDate(QDate(2026, 1, 1))
+    window.end_date.setDate(QDate(2026, 1, 2))
+
+    search(window)
+    sales_store = window.sales_store
+    first_summary = window.last_summary
+    assert first_summary.total_count == 15
+
+    # 同じフォルダ・同じ範囲の再検索はストアが保持している集計結果を返す
+    search(window)
+    assert window.sales_store is sales_store
+    assert window.last_summary is first_summary
+    assert sales_store._summary_cache.hits == 1
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_handler import DataHandler
+
+HEADER = ("レコード区分,機番,店舗コード,端末番号,伝票番号,取引番号,明細番号,券種,予備,枚数,金額符号,金額,"
+          "カード減算額,取引日付,取引時刻,予備2,商品コード,論理口座名称,集計Ｇ番号,集計Ｇ名称,備考\n")
+ROW = "1,1,S01,T1,0,0,1,A,,1,0,500,0,260101,120000,,0001,{name},01,グループ1,\n"
+
+
+@pytest.fixture
+def cp932_only_after_sniff(tmp_path):
+    """文字コードの判定に読む範囲より後ろの行にだけCP932の文字（①）があるCSV"""
+    path = tmp_path / "KB1_260101_Count.csv"
+    row_count = DataHandler.SNIFF_BYTES // len(ROW.format(name="メニュー1").encode("cp932")) + 1
+    text = HEADER + ROW.format(name="メニュー1") * row_count + ROW.format(name="メニュー①")
+    path.write_text(text, encoding="cp932", newline="")
+    assert DataHandler.sniff_encoding(str(path)) == "shift_jis"
+    return str(path), row_count + 1
+
+
+@pytest.mark.parametrize("engine", DataHandler.CSV_ENGINES)
+def test_read_csv_file_rereads_in_cp932(cp932_only_after_sniff, engine):
+    path, row_count = cp932_only_after_sniff
+    data = DataHandler.read_csv_file(path, DataHandler.column_projection(), engine)
+    assert len(data) == row_count
+    assert data["論理口座名称"].iloc[-1] == "メニュー①"
+
+
+def test_rollup_csv_chunked_rereads_in_cp932(cp932_only_after_sniff):
+    path, row_count = cp932_only_after_sniff
+    _, daily, invalid_rows = DataHandler.rollup_csv_chunked(path, chunk_rows=500)
+    assert invalid_rows == 0
+    assert daily["260101"][1] == row_count
+
+
+def test_is_typed_checks_projected_columns(tmp_path):
+    path = tmp_path / "KB1_260101_Count.csv"
+    path.write_text(HEADER + ROW.format(name="メニュー1") * 3, encoding="cp932", newline="")
+    usecols = DataHandler.column_projection()
+    column_indices = DataHandler.projected_column_indices(None)
+
+    data = DataHandler.read_csv_file(str(path), usecols)
+    assert not DataHandler.is_typed(data, column_indices)
+    assert DataHandler.is_typed(DataHandler.apply_schema(data, DataHandler.column_positions(usecols)), column_indices)
+
+
+def test_filter_data_by_date_keeps_input_unchanged():
+    data = pd.DataFrame({"取引日付": [260101, 260102, 260103], "金額": [1, 2, 3]})
+    filtered = DataHandler.filter_data_by_date(data, "260102", "260103", "取引日付")
+    assert filtered["金額"].tolist() == [2, 3]
+    assert data["取引日付"].dtype == np.int64
+
+
+def test_create_summary_types_projected_frame(tmp_path):
+    path = tmp_path / "KB1_260101_Count.csv"
+    path.write_text(HEADER + ROW.format(name="メニュー1") * 3, encoding="cp932", newline="")
+    data = DataHandler.read_csv_file(str(path), DataHandler.column_projection())
+
+    summary = DataHandler.create_summary(data, DataHandler.projected_column_indices(None))
+    assert summary.total_count == 3
+    assert summary.total_amount == 1500
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication
+
+from folder_watcher import FolderWatcher
+from test_sales_store import HEADER, csv_rows, write_csv
+
+
+def age(path, seconds):
+    """更新日時を seconds 秒前にする"""
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_watches_only_recent_csv_files(tmp_path):
+    application = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    folder = tmp_path / "csv"
+    (folder / "sub").mkdir(parents=True)
+    old_path = str(folder / "KB1_250101_Count.csv")
+    recent_path = str(folder / "sub" / "KB1_260101_Count.csv")
+    write_csv(old_path, HEADER + csv_rows(0, 1, "250101"))
+    write_csv(recent_path, HEADER + csv_rows(0, 1))
+    age(old_path, FolderWatcher.RECENT_SECONDS + 60)
+
+    watcher = FolderWatcher()
+    watcher.watch(str(folder))
+    assert sorted(watcher._watcher.directories()) == [str(folder), str(folder / "sub")]
+    assert watcher._watcher.files() == [recent_path]
+
+    # 追加されたCSVは監視に加え、古くなったCSVは監視から外す
+    new_path = str(folder / "KB1_260102_Count.csv")
+    write_csv(new_path, HEADER + csv_rows(0, 1, "260102"))
+    age(recent_path, FolderWatcher.RECENT_SECONDS + 60)
+    assert watcher.sync()
+    assert watcher._watcher.files() == [new_path]
+    assert not watcher.sync()
+
+    watcher.stop()
+    assert watcher._watcher.files() == [] and watcher._watcher.directories() == []
+    application.processEvents()
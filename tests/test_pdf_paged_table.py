@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_paged_table import PagedTable, ROW_ITEM, ROW_LABEL, ROW_SUBTOTAL, ROW_TOTAL
+
+HEADER = ['グループ名', 'メニュー番号', 'メニュー名', '枚数', '金額']
+
+
+def paged_table(row_count):
+    rows = [[f"グループ{index}", str(index), f"メニュー{index}", "1", "500"] for index in range(row_count)]
+    kinds = [(ROW_LABEL, ROW_ITEM, ROW_ITEM, ROW_SUBTOTAL)[index % 4] for index in range(row_count - 1)] + [ROW_TOTAL]
+    return PagedTable(HEADER, rows, kinds, [100, 50, 200, 50, 50], "Helvetica"), rows
+
+
+def test_split_repeats_header_and_draws_every_row_once():
+    table, rows = paged_table(100)
+    # 1ページ目は残りの高さが少なく、以降は30行ずつ入るページ
+    heights = [PagedTable.HEADER_HEIGHT + PagedTable.ROW_HEIGHT * 10 + 5] + \
+              [PagedTable.HEADER_HEIGHT + PagedTable.ROW_HEIGHT * 30] * 10
+
+    pages = []
+    for height in heights:
+        pieces = table.split(table.width, height)
+        if pieces == [table]:
+            # 残りがすべて入るページはそのまま描画する
+            pages.append((table.page_table(table.start, len(rows)), height))
+            break
+        page, table = pieces
+        assert isinstance(table, PagedTable)
+        pages.append((page, height))
+
+    page_rows = []
+    for page, height in pages:
+        assert page._cellvalues[0] == HEADER
+        assert sum(page._rowHeights) <= height
+        page_rows.append(page._cellvalues[1:])
+    assert [len(data) for data in page_rows] == [10, 30, 30, 30]
+    assert [row for data in page_rows for row in data] == rows
+
+
+def test_split_moves_to_next_page_when_no_row_fits():
+    table, _ = paged_table(5)
+    assert table.split(table.width, PagedTable.HEADER_HEIGHT + PagedTable.ROW_HEIGHT - 1) == []
+    assert table.split(table.width, table.height) == [table]
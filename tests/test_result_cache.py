@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_cache import ResultCache
+
+
+def test_evicts_least_recently_used_by_entry_count():
+    cache = ResultCache(max_entries=2, max_bytes=1000)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 10)
+    # 最後に使われてから最も時間が経った b を捨てる
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2 and cache.total_bytes == 20
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ResultCache(max_entries=10, max_bytes=100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    cache.put("c", 3, 40)
+    assert cache.get("a") is None
+    assert len(cache) == 2 and cache.total_bytes == 80
+
+    # 上限を超えなくなるまで古いものから捨てる
+    cache.put("d", 4, 90)
+    assert len(cache) == 1 and cache.total_bytes == 90
+    assert cache.get("d") == 4
+
+
+def test_rejects_value_larger_than_max_bytes():
+    cache = ResultCache(max_entries=10, max_bytes=100)
+    cache.put("a", 1, 50)
+    cache.put("b", 2, 101)
+    assert cache.get("b") is None
+    # 保持していた値は捨てない
+    assert cache.get("a") == 1 and cache.total_bytes == 50
+
+    # 同じキーの値を上限を超える値で置き換えた場合は、前の値も捨てる
+    cache.put("a", 3, 101)
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.total_bytes == 0
+
+
+def test_put_replaces_existing_key():
+    cache = ResultCache(max_entries=2, max_bytes=100)
+    cache.put("a", 1, 30)
+    cache.put("b", 2, 30)
+    cache.put("a", 3, 60)
+    assert len(cache) == 2 and cache.total_bytes == 90
+
+    # 置き換えたキーは最後に使われたものになる
+    cache.put("c", 4, 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == 3 and cache.get("c") == 4
+
+    cache.discard("a")
+    cache.discard("x")
+    assert len(cache) == 1 and cache.total_bytes == 10
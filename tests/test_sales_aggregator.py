@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_handler import DataHandler
+from sales_aggregator import SalesAggregator, SLIP_CASH, SLIP_CASHLESS, SLIP_RED, SLIP_OTHER, SLIP_TYPES
+from test_sales_store import HEADER
+
+COLUMNS = HEADER.strip().split(",")
+
+
+def sales_rows(rows):
+    """(金額符号, カード減算額, 商品コード, 商品名, 集計G名称, 枚数, 金額) の一覧から型付けした明細を作成する"""
+    records = []
+    for sign, card, code, name, group_name, count, amount in rows:
+        record = dict.fromkeys(COLUMNS, "")
+        record.update({
+            "枚数": str(count), "金額符号": sign, "金額": str(amount), "カード減算額": str(card),
+            "取引日付": "260101", "商品コード": code, "論理口座名称": name, "集計Ｇ番号": "01",
+            "集計Ｇ名称": group_name
+        })
+        records.append(record)
+    return DataHandler.apply_schema(pd.DataFrame(records, columns=COLUMNS))
+
+
+def normalized(base):
+    """カテゴリの違いを除いて行をキー順に並べた集計表"""
+    base = base.astype({key: str for key in ["slip", "group_num", "group_name", "product_code", "product_name"]})
+    return base.sort_values(["slip", "group_num", "group_name", "product_code", "product_name"]).reset_index(drop=True)
+
+
+def test_combine_of_day_rollups_equals_aggregate_of_all_rows():
+    days = [
+        sales_rows([("0", 0, "0002", "B", "グループ1", 1, 500), ("0", 100, "0001", "A", "グループ1", 2, 600)]),
+        sales_rows([("0", 0, "0002", "A", "グループ1", 1, 400), ("1", 0, "0001", "A", "グループ1", 1, 300),
+                    ("0", 0, "0002", "B", "グループ1", 3, 1500)]),
+        sales_rows([]),
+        sales_rows([("0", 0, "0003", "C", "グループ2", 1, 200), ("0", 0, "0002", "A", "グループ1", 1, 400)]),
+    ]
+    column_indices = DataHandler.COLUMN_INDICES
+    rows = pd.concat(days, ignore_index=True)
+    expected = SalesAggregator.aggregate(rows, column_indices)
+
+    rollups = [SalesAggregator.rollup(day, column_indices) for day in days]
+    row_counts = [len(day) for day in days]
+    pd.testing.assert_frame_equal(
+        normalized(SalesAggregator.merge(rollups, row_counts)), normalized(expected.base)
+    )
+    # 合算の順序によらず同じ結果になる
+    merged = SalesAggregator.merge(
+        [SalesAggregator.merge(rollups[:2], row_counts[:2]), SalesAggregator.merge(rollups[2:], row_counts[2:])],
+        [sum(row_counts[:2]), sum(row_counts[2:])]
+    )
+    pd.testing.assert_frame_equal(normalized(merged), normalized(expected.base))
+
+    summary = SalesAggregator.combine(rollups, row_counts)
+    assert len(summary) == len(expected) == 7
+    assert summary.slip_totals == expected.slip_totals
+    for slip in SLIP_TYPES:
+        pd.testing.assert_frame_equal(
+            summary.menu_items(slip).astype(str), expected.menu_items(slip).astype(str)
+        )
+    # 同じメニュー番号の中では元データに先に現れた順（B が先）
+    assert summary.menu_items(SLIP_CASH)["product_name"].astype(str).tolist() == ["B", "A", "C"]
+
+
+def test_slip_codes_by_amount_sign_and_card_amount():
+    data = sales_rows([
+        (sign, card, "0001", "A", "グループ1", 1, 500)
+        for sign in ("0", "1", "2")
+        for card in (0, 100)
+    ])
+    codes = SalesAggregator.slip_codes(data, DataHandler.COLUMN_INDICES)
+    assert [SLIP_TYPES[code] for code in codes] == [
+        SLIP_CASH, SLIP_CASHLESS, SLIP_RED, SLIP_RED, SLIP_OTHER, SLIP_OTHER
+    ]
+
+
+def test_menu_items_group_labels_for_empty_and_missing_names():
+    data = sales_rows([
+        ("0", 0, "0001", "A", " グループ1 ", 1, 500),
+        ("0", 0, "0002", "B", "", 1, 500),
+        ("0", 0, "0003", "C", "  ", 1, 500),
+        ("0", 0, "0004", "D", None, 1, 500),
+    ])
+    summary = SalesAggregator.aggregate(data, DataHandler.COLUMN_INDICES)
+    items = summary.menu_items(SLIP_CASH)
+    # 前後の空白を除き、空の名前は「その他」、欠損は'nan'
+    assert dict(zip(items["product_name"].astype(str), items["group_label"])) == {
+        "A": "グループ1", "B": "その他", "C": "その他", "D": "nan"
+    }
+    assert summary.group_subtotals(SLIP_CASH).set_index("group_label")["count"].to_dict() == {
+        "グループ1": 1, "nan": 1, "その他": 2
+    }
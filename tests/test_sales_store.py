@@ -0,0 +1,182 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_handler import DataHandler
+from sales_aggregator import SalesAggregator, SLIP_TYPES
+from sales_store import SalesStore
+
+HEADER = ("レコード区分,機番,店舗コード,端末番号,伝票番号,取引番号,明細番号,券種,予備,枚数,金額符号,金額,"
+          "カード減算額,取引日付,取引時刻,予備2,商品コード,論理口座名称,集計Ｇ番号,集計Ｇ名称,備考\n")
+
+
+def csv_rows(first, count, date_str="260101"):
+    """1枚500円の明細行を count 行作成する"""
+    return "".join(
+        f"1,1,S01,T1,{slip},{slip},1,A,,1,0,500,0,{date_str},120000,,0001,メニュー1,01,グループ1,\n"
+        for slip in range(first, first + count)
+    )
+
+
+def write_csv(path, text, mode="w"):
+    with open(path, mode, encoding="cp932", newline="") as f:
+        f.write(text)
+    # 同じ秒のうちに書き足しても更新日時が変わるようにする
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def grow_while_parsing(monkeypatch, path, text):
+    """最初の解析が終わった直後に path へ text を書き足す（書き込み途中のCSVを取り込んだ状態）"""
+    read_csv_file = DataHandler.read_csv_file
+
+    def read_and_append(file_path, *args, **kwargs):
+        data = read_csv_file(file_path, *args, **kwargs)
+        monkeypatch.setattr(DataHandler, "read_csv_file", read_csv_file)
+        write_csv(path, text, mode="a")
+        return data
+
+    monkeypatch.setattr(DataHandler, "read_csv_file", read_and_append)
+
+
+def test_compile_rereads_file_changed_during_compile(tmp_path, monkeypatch):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    path = str(folder / "KB1_260101_Count.csv")
+    write_csv(path, HEADER + csv_rows(0, 10))
+    grow_while_parsing(monkeypatch, path, csv_rows(10, 5))
+
+    store = SalesStore(str(tmp_path / "store"))
+    store.compile(str(folder), use_processes=False)
+    assert store.summary("260101", "260101").total_count == 10
+
+    # 取込後に書き足された行は次の取込で読み込む
+    assert store.compile(str(folder), use_processes=False) == {"260101"}
+    summary = store.summary("260101", "260101")
+    assert summary.total_count == 15
+    assert summary.total_amount == 7500
+
+
+def test_compile_only_writes_the_store(tmp_path):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    path = str(folder / "KB1_260101_Count.csv")
+    write_csv(path, HEADER + csv_rows(0, 10))
+
+    store = SalesStore.for_folder(str(folder), str(tmp_path / "cache"))
+    store.compile(str(folder), use_processes=False)
+    # 解析したCSVはストアのパーティションとしてだけ保存する
+    assert os.listdir(tmp_path / "cache") == ["store"]
+
+    # フォルダから消えたCSVの行はストアからも削除する
+    os.remove(path)
+    store.compile(str(folder), use_processes=False)
+    assert store.summary("260101", "260101").is_empty
+
+
+def test_summary_returns_while_compile_is_parsing(tmp_path, monkeypatch):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    write_csv(str(folder / "KB1_260101_Count.csv"), HEADER + csv_rows(0, 10))
+    store = SalesStore(str(tmp_path / "store"))
+    store.compile(str(folder), use_processes=False)
+
+    # 2回目の取込はCSVの解析中に止めておく
+    write_csv(str(folder / "KB1_260102_Count.csv"), HEADER + csv_rows(10, 5, "260102"))
+    parsing = threading.Event()
+    resume = threading.Event()
+    read_csv_file = DataHandler.read_csv_file
+
+    def blocked_read(*args, **kwargs):
+        parsing.set()
+        resume.wait(10)
+        return read_csv_file(*args, **kwargs)
+
+    monkeypatch.setattr(DataHandler, "read_csv_file", blocked_read)
+    thread = threading.Thread(target=store.compile, args=(str(folder),), kwargs={"use_processes": False})
+    thread.start()
+    try:
+        assert parsing.wait(10)
+        # 取込中も入れ替え前の内容ですぐに集計できる
+        result = []
+        reader = threading.Thread(target=lambda: result.append(store.summary("260101", "260102")))
+        reader.start()
+        reader.join(5)
+        assert not reader.is_alive()
+        assert result[0].total_count == 10
+    finally:
+        resume.set()
+        thread.join(10)
+
+    assert store.summary("260101", "260102").total_count == 15
+    assert store.daily_totals("260101", "260102").shape[0] == 2
+
+
+def test_content_key_identifies_contents_across_reopen(tmp_path):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    path = str(folder / "KB1_260101_Count.csv")
+    write_csv(path, HEADER + csv_rows(0, 10))
+    store = SalesStore(str(tmp_path / "store"))
+    empty_key = store.content_key
+    store.compile(str(folder), use_processes=False)
+    assert store.content_key != empty_key
+
+    # 開き直すとdata_versionは0に戻るが、内容が同じならキーは同じ
+    reopened = SalesStore(str(tmp_path / "store"))
+    assert reopened.data_version == 0
+    assert reopened.content_key == store.content_key
+
+    write_csv(path, csv_rows(10, 5), mode="a")
+    reopened.compile(str(folder), use_processes=False)
+    assert reopened.content_key != store.content_key
+
+
+def test_summary_cache_size_includes_slip_tables(tmp_path):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    write_csv(str(folder / "KB1_260101_Count.csv"), HEADER + csv_rows(0, 10))
+
+    store = SalesStore(str(tmp_path / "store"))
+    store.compile(str(folder), use_processes=False)
+    summary = store.summary("260101", "260101")
+    cached_bytes = store._summary_cache.total_bytes
+
+    # 表示・出力で伝票種別ごとの表を使っても、キャッシュに記録した量は変わらない
+    for slip in SLIP_TYPES:
+        summary.slip_products(slip)
+        summary.menu_items(slip)
+    assert summary.memory_bytes() == cached_bytes
+
+
+def test_summary_uses_month_rollups_for_whole_months(tmp_path):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    dates = ["260130", "260131", "260201", "260202", "260301"]
+    for index, date_str in enumerate(dates):
+        write_csv(str(folder / f"KB1_{date_str}_Count.csv"), HEADER + csv_rows(index * 10, index + 1, date_str))
+
+    store = SalesStore(str(tmp_path / "store"))
+    store.compile(str(folder), use_processes=False)
+    assert store.month_rollups == {"2601": 3, "2602": 7, "2603": 5}
+
+    # 1月・2月は月別集計、3月は範囲に含まれない日があるため日別集計を使う
+    _, keys, row_counts = store._range_rollups("260101", "260228")
+    assert keys == ["2601", "2602"]
+    assert row_counts == [3, 7]
+
+    summary = store.summary("260131", "260301")
+    _, keys, _ = store._range_rollups("260131", "260301")
+    assert keys == ["260131", "2602", "2603"]
+    assert summary.total_count == 2 + 3 + 4 + 5
+    day_summary = SalesAggregator.combine(
+        [store._read_rollup(date_str) for date_str in dates[1:]], [store.rollups[date_str] for date_str in dates[1:]]
+    )
+    assert summary.base.equals(day_summary.base)
+
+    # 日付がなくなった月は月別集計も削除する
+    os.remove(str(folder / "KB1_260301_Count.csv"))
+    store.compile(str(folder), use_processes=False)
+    assert "2603" not in store.month_rollups
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+from sales_aggregator import SLIP_CASH
+from sales_store import SalesStore
+from test_sales_store import HEADER, csv_rows, write_csv
+
+
+@pytest.fixture
+def tab(tmp_path):
+    """2日分のストアを表示した売上推移タブ"""
+    application = QApplication.instance() or QApplication(sys.argv[:1])
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    write_csv(str(folder / "KB1_260101_Count.csv"), HEADER + csv_rows(0, 10))
+    write_csv(str(folder / "KB1_260102_Count.csv"), HEADER + csv_rows(10, 5, "260102"))
+    store = SalesStore(str(tmp_path / "store"))
+    store.compile(str(folder), use_processes=False)
+
+    from time_series_tab import TimeSeriesTab
+    tab = TimeSeriesTab()
+    tab.resize(800, 400)
+    tab.show()
+    application.processEvents()
+    tab.set_sales_store(store)
+    tab.set_date_filter("260101", "260102")
+    yield tab
+    tab.close()
+
+
+def test_same_axis_range_blits_lines_without_full_draw(tab, monkeypatch):
+    draws = []
+    draw = tab.canvas.draw
+    monkeypatch.setattr(tab.canvas, "draw", lambda: draws.append(1) or draw())
+
+    # 表示項目を変えると縦軸の範囲が変わるため全体を描き直す
+    tab.measure_combo.setCurrentText("枚数")
+    assert len(draws) == 1
+    assert tab.axes.get_ylim() == (0, 12)
+
+    # 描いたことのある範囲に戻す・同じ内容を取り込み直す場合は折れ線だけを描く
+    tab.measure_combo.setCurrentText("金額")
+    tab.refresh()
+    assert len(draws) == 1
+    assert tab.lines[SLIP_CASH].get_ydata().tolist() == [5000, 2500]
+
+
+def test_nice_limit_rounds_up_to_two_digits():
+    from time_series_tab import TimeSeriesTab
+    assert TimeSeriesTab.nice_limit(1_296_295) == 1_400_000
+    assert TimeSeriesTab.nice_limit(10.5) == 12
+    assert TimeSeriesTab.nice_limit(0) == 1
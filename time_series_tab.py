@@ -0,0 +1,337 @@
+import numpy as np
+import pandas as pd
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+
+from sales_aggregator import SLIP_CASH, SLIP_CASHLESS, SLIP_RED
+from perf_log import PerfLog
+
+# グラフの日本語表示に使うフォントの候補（インストールされているものだけを使う）
+CHART_FONT_CANDIDATES = ["Yu Gothic", "Meiryo", "MS Gothic", "Hiragino Sans", "IPAGothic", "IPAexGothic",
+                         "Noto Sans CJK JP"]
+
+
+def chart_fonts():
+    """グラフに使うフォント名の一覧（見つからない名前を指定するとmatplotlibが警告を出すため絞り込む）"""
+    from matplotlib import font_manager
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    return [name for name in CHART_FONT_CANDIDATES if name in installed] + ["DejaVu Sans"]
+
+
+class TimeSeriesTab(QWidget):
+    """売上推移タブ（伝票種別ごとの金額・枚数を日別・週別・月別に集計して折れ線で表示する）
+
+    日別の合計はストア（SalesStore.daily_totals）から取得し、週別・月別はresampleで全列まとめて集計する
+    点の数が MAX_POINTS を超える場合は区間ごとの最小値・最大値の点だけを描画する
+    （グラフの幅は1000ピクセル程度のため、2ピクセルに1区間あれば見た目は変わらない）
+    描き直しを軽くするため余白は tight_layout で計算せず、ピクセル単位の固定値（MARGINS）にする
+    折れ線はblittingで描く: 軸・目盛り・凡例だけの画像を軸の範囲ごとに保持し（BACKGROUND_CACHE 件）、
+    同じ範囲に戻った場合はその画像に折れ線だけを重ねる（縦軸の上限はきりのよい値に切り上げて範囲をそろえる）
+    マウス位置の値の表示も同じように重ねて描画し、グラフ全体は描き直さない
+
+    matplotlibの読み込みとグラフの作成はタブを最初に表示したときに行い（起動を速くするため）、
+    非表示の間に日付範囲が変わった場合は次に表示したときに描き直す
+    """
+
+    # 集計単位 -> resampleの規則（週は月曜始まり、月は月初の日付で表示）
+    PERIODS = {"日別": "D", "週別": "W-MON", "月別": "MS"}
+    MEASURES = {"金額": "amount", "枚数": "count"}
+    # (伝票種別, 凡例, 色)
+    SERIES = (
+        (SLIP_CASH, "現金", "#4a86e8"),
+        (SLIP_CASHLESS, "キャッシュレス", "#34a853"),
+        (SLIP_RED, "赤伝", "#e53935")
+    )
+    MAX_POINTS = 400
+    # 保持する軸・目盛り・凡例だけの画像の数（集計単位 × 表示項目 の組み合わせ程度）
+    BACKGROUND_CACHE = 8
+    # グラフの余白（左, 右, 上, 下）ピクセル（左は金額の目盛り「1,000,000」が入る幅、上は凡例の高さ）
+    MARGINS = (80, 15, 30, 30)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sales_store = None
+        self.date_range = None  # (開始, 終了) YYMMDD
+        self._daily = None  # 日付範囲の日別合計（データのない日は0）
+        self._x = np.empty(0)  # 表示中の集計単位の日付（matplotlibの日付値）
+        self._values = {}  # 伝票種別 -> 表示中の値（間引く前）
+        self._background = None  # 折れ線まで描いた画像（マウス位置の表示に使う）
+        self._static_backgrounds = {}  # 軸の範囲 -> 折れ線を除いた画像
+        self.figure = None  # 最初に表示したときに作成
+        self._stale = False  # 非表示の間に表示内容が変わった
+
+        layout = QVBoxLayout(self)
+
+        control_layout = QHBoxLayout()
+        self.period_combo = QComboBox()
+        self.period_combo.addItems(list(self.PERIODS))
+        self.period_combo.currentTextChanged.connect(self._update_series)
+        self.measure_combo = QComboBox()
+        self.measure_combo.addItems(list(self.MEASURES))
+        self.measure_combo.currentTextChanged.connect(self._update_series)
+        self.info_label = QLabel("")
+        control_layout.addWidget(QLabel("集計単位:"))
+        control_layout.addWidget(self.period_combo)
+        control_layout.addWidget(QLabel("表示項目:"))
+        control_layout.addWidget(self.measure_combo)
+        control_layout.addWidget(self.info_label)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.figure is None:
+            self._create_chart()
+            self._stale = True
+        if self._stale:
+            self._update_series()
+
+    def _create_chart(self):
+        """matplotlibを読み込んでグラフを作成"""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+        self.figure = Figure(figsize=(10, 4))
+        self.canvas = FigureCanvas(self.figure)
+        self.axes = self.figure.add_subplot(111)
+        self._init_axes()
+        self.layout().addWidget(self.canvas)
+
+        self.canvas.mpl_connect("resize_event", self._on_resize)
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("motion_notify_event", self._on_motion)
+        self.canvas.mpl_connect("figure_leave_event", self._on_leave)
+
+    def _init_axes(self):
+        """折れ線・凡例・軸の書式とマウス位置の表示を作成（以降はデータだけを入れ替える）"""
+        from matplotlib.lines import Line2D
+        from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+        from matplotlib.ticker import FuncFormatter
+
+        axes = self.axes
+        fonts = chart_fonts()
+        self.lines = {}
+        for slip, label, color in self.SERIES:
+            # 折れ線はblittingで描く（通常の描画では描かれず、_on_drawで重ねる）
+            self.lines[slip], = axes.plot([], [], label=label, color=color, linewidth=1.2, animated=True)
+        # 凡例は折れ線と重ならないようにグラフの上の余白に横並びで置く（軸・目盛りと一緒の画像に含める）
+        legend = axes.legend(loc="lower right", bbox_to_anchor=(1, 1), ncols=len(self.SERIES), frameon=False,
+                             borderaxespad=0.1)
+        for text in legend.get_texts():
+            text.set_fontfamily(fonts)
+
+        locator = AutoDateLocator()
+        axes.xaxis.set_major_locator(locator)
+        axes.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+        axes.yaxis.set_major_formatter(FuncFormatter(lambda value, pos: f"{value:,.0f}"))
+        axes.grid(True, color="#e0e0e0")
+        # 軸ラベルは使わないため位置を固定する（描画のたびに目盛りの文字の大きさから位置を計算しない）
+        axes.xaxis.set_label_coords(0.5, 0)
+        axes.yaxis.set_label_coords(0, 0.5)
+
+        self.empty_text = axes.text(0.5, 0.5, "データなし", transform=axes.transAxes, ha="center", va="center",
+                                    color="#888888", fontfamily=fonts)
+
+        # blittingで重ねる要素（animated=Trueの要素は通常の描画では描かれない）
+        self.cursor = Line2D([0, 0], [0, 1], transform=axes.get_xaxis_transform(), color="#888888",
+                             linewidth=0.8, animated=True, visible=False)
+        axes.add_artist(self.cursor)
+        self.cursor_text = axes.text(0.01, 0.97, "", transform=axes.transAxes, va="top", fontfamily=fonts,
+                                     animated=True, visible=False,
+                                     bbox={"boxstyle": "round", "facecolor": "white", "alpha": 0.85})
+
+    def set_sales_store(self, sales_store):
+        """表示するストアを設定"""
+        self.sales_store = sales_store
+
+    def set_date_filter(self, start_date_str, end_date_str):
+        """日付範囲(YYMMDD)を設定して表示を更新"""
+        self.date_range = (start_date_str, end_date_str)
+        self.refresh()
+
+    def clear(self):
+        """表示をクリア"""
+        self._daily = None
+        self._update_series()
+
+    def refresh(self):
+        """ストアから日別合計を取得し直して表示を更新（フォルダ監視による取込後にも呼ぶ）"""
+        if self.sales_store is None or self.date_range is None:
+            self.clear()
+            return
+
+        start_date_str, end_date_str = self.date_range
+        daily = self.sales_store.daily_totals(start_date_str, end_date_str)
+        # データのない日も0として並べる（週別・月別の区切りと折れ線の間隔をそろえる）
+        all_days = pd.date_range(
+            pd.to_datetime(start_date_str, format="%y%m%d"), pd.to_datetime(end_date_str, format="%y%m%d"), freq="D"
+        )
+        self._daily = daily.reindex(all_days, fill_value=0)
+        self._update_series()
+
+    def _resample(self):
+        """日別合計を選択中の集計単位にまとめる（全列を1回で集計する）"""
+        rule = self.PERIODS[self.period_combo.currentText()]
+        if rule == "D":
+            return self._daily
+        if rule == "W-MON":
+            # 月曜から日曜までを1週とし、月曜の日付で表示
+            return self._daily.resample(rule, label="left", closed="left").sum()
+        return self._daily.resample(rule).sum()
+
+    def _update_series(self):
+        """集計単位・表示項目に合わせて折れ線のデータを入れ替えて描き直す（非表示の場合は表示したときに行う）"""
+        if self.figure is None or not self.isVisible():
+            self._stale = True
+            return
+        self._stale = False
+
+        from matplotlib.dates import date2num
+
+        with PerfLog.span("time_series_draw") as span:
+            if self._daily is None or self._daily.empty:
+                self._x = np.empty(0)
+                self._values = {}
+            else:
+                frame = self._resample()
+                measure = self.MEASURES[self.measure_combo.currentText()]
+                # datetime64のまま渡す（to_pydatetimeを経由すると日別10年分で約10ms）
+                self._x = date2num(frame.index.to_numpy())
+                self._values = {
+                    slip: frame[(slip, measure)].to_numpy(dtype=np.float64) for slip, _, _ in self.SERIES
+                }
+            span["points"] = len(self._x)
+            span["drawn_points"] = self._set_line_data()
+            # 同じ軸の範囲を描いたことがあれば、その画像に折れ線だけを重ねる
+            background = self._static_backgrounds.get(self._background_key())
+            span["full_draw"] = background is None
+            if background is None:
+                self.canvas.draw()
+            else:
+                self._draw_lines(background)
+                self.canvas.blit(self.figure.bbox)
+
+    def _set_line_data(self):
+        """折れ線に間引いたデータを設定し、軸の範囲を合わせる（描画した点の数を返す）"""
+        drawn_points = 0
+        for slip, line in self.lines.items():
+            if len(self._x):
+                x, y = self.downsample(self._x, self._values[slip], self.MAX_POINTS)
+            else:
+                x, y = [], []
+            line.set_data(x, y)
+            drawn_points += len(x)
+
+        self.empty_text.set_visible(len(self._x) == 0)
+        if len(self._x):
+            # 全データの範囲を直接設定する（relimで全点を走査しない）
+            left, right = self._x[0], self._x[-1]
+            if left == right:
+                left, right = left - 1, right + 1
+            top = max(float(values.max()) for values in self._values.values())
+            self.axes.set_xlim(left, right)
+            self.axes.set_ylim(0, self.nice_limit(top * 1.05))
+            self.info_label.setText(
+                f"{len(self._x):,} 点" + ("（間引いて表示）" if len(self._x) > self.MAX_POINTS else "")
+            )
+        else:
+            self.info_label.setText("")
+        return drawn_points
+
+    @staticmethod
+    def nice_limit(value):
+        """縦軸の上限（値を上位2桁の偶数にそろえて切り上げる、例: 1,296,295 -> 1,400,000）
+
+        多少の値の変化では上限が変わらないため、取込後の描き直しでも保持した画像を使える
+        """
+        if value <= 0:
+            return 1
+        step = 10 ** np.floor(np.log10(value)) / 5
+        return float(np.ceil(value / step) * step)
+
+    @staticmethod
+    def downsample(x, y, max_points):
+        """点の数をmax_points程度に減らす（一定の区間ごとに最小値と最大値の点を元の順に残す）
+
+        間引いても山と谷は残るため、日別の長期間のグラフでも形が変わらない
+        """
+        n = len(x)
+        if n <= max_points:
+            return x, y
+        bucket = int(np.ceil(n / max(1, max_points // 2)))
+        buckets = int(np.ceil(n / bucket))
+        values = np.concatenate([y, np.full(buckets * bucket - n, np.nan)]).reshape(buckets, bucket)
+        offsets = np.arange(buckets) * bucket
+        index = np.unique(np.concatenate([
+            np.nanargmin(values, axis=1) + offsets,
+            np.nanargmax(values, axis=1) + offsets
+        ]))
+        return x[index], y[index]
+
+    def _on_resize(self, event):
+        """ウィンドウの大きさが変わっても余白のピクセル数を保つ"""
+        width, height = self.canvas.get_width_height()
+        if width <= 0 or height <= 0:
+            return
+        # 大きさの違う画像は使えないため捨てる
+        self._static_backgrounds = {}
+        left, right, top, bottom = self.MARGINS
+        self.figure.subplots_adjust(
+            left=min(left / width, 0.4), right=max(1 - right / width, 0.6),
+            top=max(1 - top / height, 0.6), bottom=min(bottom / height, 0.4)
+        )
+
+    def _background_key(self):
+        """折れ線を除いた画像が同じになる条件（軸の範囲・グラフの大きさ・「データなし」の表示）"""
+        return (self.axes.get_xlim(), self.axes.get_ylim(), self.canvas.get_width_height(),
+                self.empty_text.get_visible())
+
+    def _on_draw(self, event):
+        """グラフ全体（折れ線を除く）を描いた後の画像を保存し、折れ線を重ねる"""
+        background = self.canvas.copy_from_bbox(self.figure.bbox)
+        if len(self._static_backgrounds) >= self.BACKGROUND_CACHE:
+            self._static_backgrounds.pop(next(iter(self._static_backgrounds)))
+        self._static_backgrounds[self._background_key()] = background
+        self._draw_lines(None)
+
+    def _draw_lines(self, background):
+        """backgroundに折れ線を重ね、その画像を保存（マウス位置の表示はこの上に重ねる）"""
+        if background is not None:
+            self.canvas.restore_region(background)
+        for line in self.lines.values():
+            self.axes.draw_artist(line)
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def _on_motion(self, event):
+        """マウス位置に最も近い日付の値を表示（blittingで重ねて描くだけでグラフは描き直さない）"""
+        if self._background is None or event.inaxes is not self.axes or not len(self._x):
+            self._on_leave(event)
+            return
+
+        from matplotlib.dates import num2date
+
+        position = int(np.clip(np.searchsorted(self._x, event.xdata), 1, len(self._x) - 1)) if len(self._x) > 1 else 0
+        if position > 0 and event.xdata - self._x[position - 1] < self._x[position] - event.xdata:
+            position -= 1
+
+        self.cursor.set_xdata([self._x[position], self._x[position]])
+        self.cursor.set_visible(True)
+        lines = [f"{num2date(self._x[position]):%Y/%m/%d}"]
+        unit = "円" if self.MEASURES[self.measure_combo.currentText()] == "amount" else "枚"
+        lines += [f"{label}: {self._values[slip][position]:,.0f}{unit}" for slip, label, _ in self.SERIES]
+        self.cursor_text.set_text("\n".join(lines))
+        self.cursor_text.set_visible(True)
+        self._blit()
+
+    def _on_leave(self, event):
+        if self.cursor.get_visible():
+            self.cursor.set_visible(False)
+            self.cursor_text.set_visible(False)
+            self._blit()
+
+    def _blit(self):
+        if self._background is None:
+            return
+        self.canvas.restore_region(self._background)
+        self.axes.draw_artist(self.cursor)
+        self.axes.draw_artist(self.cursor_text)
+        self.canvas.blit(self.figure.bbox)
@@ -1,17 +1,143 @@
-from PyQt5.QtWidgets import QTableWidgetItem
-from PyQt5.QtCore import Qt
-
-class NumericTableWidgetItem(QTableWidgetItem):
-    def __init__(self, value, formatted_text=None):
-        # 表示用のテキストが指定されていれば、それを使用。なければ値をそのまま使用
-        display_text = formatted_text if formatted_text is not None else str(value)
-        super().__init__(display_text)
-        
-        # 数値データを保持（ソート用）
-        self.value = float(value)
-    
-    def __lt__(self, other):
-        # 数値比較でソートするためのメソッド
-        if isinstance(other, NumericTableWidgetItem):
-            return self.value < other.value
-        return super().__lt__(other)
\ No newline at end of file
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+
+
+class SummaryTableModel(QAbstractTableModel):
+    """集計結果（コード, 名称, 枚数, 金額 の4列）を表示するテーブルモデル
+
+    値は列ごとのNumPy配列で保持し、表示用の文字列はdata()で必要な行だけ作成する
+    並べ替えは行の順番（配列の添字）を入れ替えるだけで、元の配列はそのまま使う
+    """
+
+    CODE_COLUMN = 0
+    NAME_COLUMN = 1
+    COUNT_COLUMN = 2
+    AMOUNT_COLUMN = 3
+
+    RED_COLOR = QColor(255, 0, 0)
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.is_red_slip = False
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+        self._set_columns([], [], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    def _set_columns(self, codes, names, counts, amounts):
+        self._codes = np.asarray(codes, dtype=object)
+        self._names = np.asarray(names, dtype=object)
+        self._counts = counts
+        self._amounts = amounts
+        self._order = np.arange(len(counts))
+        self._sort_keys = {}
+
+    def set_summary(self, summary, is_red_slip=False):
+        """集計結果のDataFrame（コード, 名称, 枚数, 金額 の順の4列）を表示する
+
+        is_red_slip: 赤伝の場合はTrue（枚数と金額を赤文字・括弧付きで表示）
+        """
+        self.beginResetModel()
+        self.is_red_slip = is_red_slip
+        self._set_columns(
+            summary.iloc[:, 0].astype(object).map(str).to_numpy(),
+            summary.iloc[:, 1].astype(object).map(str).to_numpy(),
+            summary.iloc[:, 2].to_numpy(dtype=np.int64),
+            summary.iloc[:, 3].to_numpy(dtype=np.int64)
+        )
+        self.endResetModel()
+
+    def clear(self):
+        """表示をクリア"""
+        self.beginResetModel()
+        self.is_red_slip = False
+        self._set_columns([], [], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self._order[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == self.CODE_COLUMN:
+                # 数字だけのコードは先頭の0を除いて表示
+                code = self._codes[row]
+                return str(int(code)) if code.isdigit() else code
+            if column == self.NAME_COLUMN:
+                return self._names[row]
+            if column == self.COUNT_COLUMN:
+                count = int(self._counts[row])
+                return f"({count})" if self.is_red_slip else str(count)
+            if column == self.AMOUNT_COLUMN:
+                amount = int(self._amounts[row])
+                return f"({amount:,})" if self.is_red_slip else f"{amount:,}"
+        elif role == Qt.TextAlignmentRole:
+            if column in (self.COUNT_COLUMN, self.AMOUNT_COLUMN):
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+        elif role == Qt.ForegroundRole:
+            # 赤伝処理の場合は赤文字で表示
+            if self.is_red_slip and column in (self.COUNT_COLUMN, self.AMOUNT_COLUMN):
+                return self.RED_COLOR
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+
+        header_text = self.headers[section]
+        if section == self.sort_column:
+            # ソート方向を表示
+            direction = "▼" if self.sort_order == Qt.DescendingOrder else "▲"
+            return f"{header_text} {direction}"
+        return header_text
+
+    def _sort_key(self, column):
+        """列の値の大小を表す整数（同じ値は同じ順位）の配列"""
+        if column not in self._sort_keys:
+            if column == self.COUNT_COLUMN:
+                key = self._counts
+            elif column == self.AMOUNT_COLUMN:
+                key = self._amounts
+            else:
+                values = self._codes if column == self.CODE_COLUMN else self._names
+                key = np.unique(values.astype(str), return_inverse=True)[1] if len(values) else np.empty(0, dtype=np.int64)
+                if column == self.CODE_COLUMN:
+                    # 数字だけのコードは数値順、それ以外のコードはその後ろに文字列順
+                    is_numeric = pd.Series(values, dtype=object).str.isdigit().to_numpy(dtype=bool)
+                    numeric_rank = np.unique(values[is_numeric].astype(np.int64), return_inverse=True)[1]
+                    key = key + is_numeric.sum()
+                    key[is_numeric] = numeric_rank
+            self._sort_keys[column] = np.asarray(key, dtype=np.int64)
+        return self._sort_keys[column]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """列の値で行を並べ替える（同じ値の行は現在の順番を保つ）"""
+        if column < 0 or column >= len(self.headers):
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        key = self._sort_key(column)[self._order]
+        if order == Qt.DescendingOrder:
+            key = -key
+        self._order = self._order[np.argsort(key, kind='stable')]
+        self.sort_column = column
+        self.sort_order = order
+        self.layoutChanged.emit()
+        self.headerDataChanged.emit(Qt.Horizontal, 0, len(self.headers) - 1)
@@ -0,0 +1,100 @@
+import os
+import traceback
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from sales_store import SalesStore
+
+
+class DataLoadWorker(QObject):
+    """CSVの取込と日付範囲の集計をバックグラウンドスレッドで実行するワーカー
+
+    QThreadにmoveToThreadして使い、結果はシグナルでGUIスレッドに返す
+    sales_storeに取込済みのストアを渡すと、そのストアに新規・変更ファイルだけを取り込む
+    （同じフォルダの再検索とフォルダ監視からの再集計で使う）
+    column_indicesは新しく開くストアが読み込む列（省略時はDataHandler.COLUMN_INDICES）
+    engineはCSV解析エンジン（省略時はDataHandler.CSV_ENGINE）
+    """
+
+    # 進捗（0～100）とメッセージ
+    progress = pyqtSignal(int, str)
+    # 読み込み結果（dict）。有効なデータがない場合はNone
+    finished = pyqtSignal(object)
+    # エラーメッセージ
+    failed = pyqtSignal(str)
+    # キャンセルされた
+    cancelled = pyqtSignal()
+
+    # 進捗のうちCSV取込に割り当てる割合
+    COMPILE_PROGRESS = 70
+
+    def __init__(self, folder_path, start_date_str, end_date_str, cache_dir, workers=1, sales_store=None,
+                 column_indices=None, engine=None):
+        super().__init__()
+        self.folder_path = folder_path
+        self.start_date_str = start_date_str
+        self.end_date_str = end_date_str
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.sales_store = sales_store
+        self.column_indices = column_indices
+        self.engine = engine
+        self._cancel_requested = False
+
+    def cancel(self):
+        """キャンセルを要求（GUIスレッドから直接呼び出す）"""
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def _report_file_progress(self, done, total, file_path):
+        """CSV 1ファイルごとの進捗を通知"""
+        percent = self.COMPILE_PROGRESS * done // total if total else self.COMPILE_PROGRESS
+        if file_path:
+            message = f"CSVファイルを読み込んでいます... ({done + 1}/{total})\n{os.path.basename(file_path)}"
+        else:
+            message = f"CSVファイルを読み込みました ({total} ファイル)"
+        self.progress.emit(percent, message)
+
+    def run(self):
+        """取込から集計までを実行"""
+        try:
+            self.progress.emit(0, "CSVファイルを確認しています...")
+
+            # CSVフォルダをストアに取り込み（新規・変更ファイルのみ解析）
+            sales_store = self.sales_store
+            if sales_store is None:
+                sales_store = SalesStore.for_folder(
+                    self.folder_path, self.cache_dir, self.column_indices
+                )
+            changed_dates = sales_store.compile(
+                self.folder_path,
+                progress_callback=self._report_file_progress,
+                is_cancelled=self.is_cancelled,
+                workers=self.workers,
+                engine=self.engine
+            )
+            if self.is_cancelled():
+                self.cancelled.emit()
+                return
+
+            self.progress.emit(80, "集計中...")
+
+            # 範囲内の日別集計を合算する（明細は読まない）
+            summary_data = sales_store.summary(self.start_date_str, self.end_date_str)
+            if summary_data is None:
+                print("有効なCSVファイルが見つかりませんでした")
+                self.finished.emit(None)
+                return
+
+            self.finished.emit({
+                "sales_store": sales_store,
+                "loaded_range": (self.start_date_str, self.end_date_str),
+                "changed_dates": changed_dates,
+                "summary": None if summary_data.is_empty else summary_data
+            })
+
+        except Exception as e:
+            print(f"データ処理エラー: {e}")
+            print(traceback.format_exc())
+            self.failed.emit(str(e))